@@ -1,4 +1,6 @@
 import sys
+import types
+import importlib
 
 
 def bytes_to_string(bytes_obj):
@@ -17,4 +19,42 @@ def bytes_to_string(bytes_obj):
         return bytes_obj
 
 
+class LazyModule(types.ModuleType):
+    """A module that is only imported when one of its attributes is first used.
+
+    Attributes set on the placeholder (e.g. by ``mock.patch``) hide those of
+    the real module until they are deleted again.
+
+    Args:
+        name(str): Full name of the module to import
+
+    """
+
+    def __init__(self, name):
+        super(LazyModule, self).__init__(name)
+
+    def __getattr__(self, attr):
+        # Only called for attributes not set on the placeholder itself
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name):
+    """Return a placeholder for a module that imports it on first use.
+
+    Heavy third party modules are imported like this so that the scripts
+    start quickly, e.g. for ``--help``, and only load what they use.
+
+    Args:
+        - name: Full name of the module, e.g. 'ldap.filter'
+
+    Returns
+        - LazyModule: Placeholder standing in for the module
+
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
 from dls_ade.gitlabserver import GitlabServer as Server
@@ -1,10 +1,26 @@
 from argparse import ArgumentParser
 from dls_ade import dls_environment
-env = dls_environment.environment()
+
+# Created when first needed, see get_environment
+_env = None
 
 areas = ["support", "ioc", "matlab", "python", "python3", "python3ext" , "etc", "tools", "epics"]
 
 
+def get_environment():
+    """
+    Return the environment giving the default epics and rhel versions.
+
+    Returns:
+        :class:`~dls_ade.dls_environment.environment`: Shared environment
+
+    """
+    global _env
+    if _env is None:
+        _env = dls_environment.environment()
+    return _env
+
+
 class ArgParser(ArgumentParser):
     """
     Makes a custom parser class with area arguments by default.
@@ -107,18 +123,33 @@ class ArgParser(ArgumentParser):
         self.add_argument("-g", "--git", action="store_true", dest="git",
                           help=help_msg)
 
-    def add_epics_version_flag(self, help_msg="Change the epics version, "
-                                              "default is " + env.epicsVer() +
-                                              " (from your environment)"):
+    def add_refresh_flag(self, help_msg="Ignore the cached list of "
+                                        "repositories and fetch it again"):
         """
-        Add epics version flag argument with module specific help message.
+        Add refresh flag argument with module specific help message.
 
         Args:
             help_msg(str): Help message relevant to module calling function
 
         """
+        self.add_argument("--refresh", action="store_true", dest="refresh",
+                          help=help_msg)
+
+    def add_epics_version_flag(self, help_msg=None):
+        """
+        Add epics version flag argument with module specific help message.
+
+        Args:
+            help_msg(str): Help message relevant to module calling function,
+                defaults to one giving the epics version from the environment
+
+        """
+        epics_version = get_environment().epicsVer()
+        if help_msg is None:
+            help_msg = "Change the epics version, default is {} (from your " \
+                       "environment)".format(epics_version)
         self.add_argument("-e", "--epics_version", action="store", type=str, dest="epics_version",
-                          default=env.epicsVer(), help=help_msg)
+                          default=epics_version, help=help_msg)
 
     def add_rhel_version_flag(self, help_msg="Change the rhel version, "
                                              "default is from /etc/redhat-release "
@@ -131,4 +162,4 @@ class ArgParser(ArgumentParser):
 
         """
         self.add_argument("-r", "--rhel_version", action="store", type=str, dest="rhel_version",
-                          default=env.rhelVer(), help=help_msg)
\ No newline at end of file
+                          default=get_environment().rhelVer(), help=help_msg)
\ No newline at end of file
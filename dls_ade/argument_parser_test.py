@@ -125,6 +125,18 @@ class AddGitTest(unittest.TestCase):
         self.assertIn("--git", option.option_strings)
 
 
+class AddRefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = ArgParser("")
+        self.parser.add_refresh_flag()
+
+    def test_refresh_option_has_correct_attributes(self):
+        option = self.parser._option_string_actions['--refresh']
+        self.assertIsInstance(option, _StoreTrueAction)
+        self.assertEqual(option.dest, "refresh")
+
+
 class AddEpicsVersionTest(unittest.TestCase):
 
     def setUp(self):
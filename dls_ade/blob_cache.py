@@ -0,0 +1,102 @@
+"""
+On-disk cache of file contents read from the git server, keyed by blob SHA.
+
+A blob SHA names the contents of a file exactly, so an entry never goes stale
+and the same contents read at another release, branch or repository are found
+again. Entries live under :data:`~dls_ade.constants.ADE_CACHE_DIR` and are
+checked against their SHA when read, so a damaged file is simply fetched again.
+"""
+
+import os
+import hashlib
+import tempfile
+import logging
+
+from dls_ade.constants import ADE_CACHE_DIR
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+log = logging.getLogger(__name__)
+
+BLOB_CACHE_ROOT = os.path.join(ADE_CACHE_DIR, "blobs")
+
+
+def blob_sha(contents):
+    """
+    Return the SHA git gives a blob with the given contents.
+
+    Args:
+        contents(bytes): File contents
+
+    Returns:
+        str: Hex SHA-1 of the blob
+    """
+    header = "blob {}\0".format(len(contents)).encode("ascii")
+    return hashlib.sha1(header + contents).hexdigest()
+
+
+class BlobCache(object):
+    """
+    A directory of file contents named by blob SHA.
+
+    Args:
+        root(str): Directory to keep the contents in
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, sha):
+        return os.path.join(self.root, sha[:2], sha[2:])
+
+    def get(self, sha):
+        """
+        Return the cached contents of a blob.
+
+        Args:
+            sha(str): Blob SHA
+
+        Returns:
+            bytes: Contents, or None if the blob is not cached
+        """
+        sha = sha.lower()
+        try:
+            with open(self._path(sha), "rb") as f:
+                contents = f.read()
+        except (IOError, OSError):
+            return None
+
+        if blob_sha(contents) != sha:
+            log.debug("Ignoring damaged cached blob {}".format(sha))
+            return None
+        return contents
+
+    def put(self, sha, contents):
+        """
+        Store the contents of a blob.
+
+        Args:
+            sha(str): Blob SHA
+            contents(bytes): Contents of the blob
+        """
+        path = self._path(sha.lower())
+        dirname = os.path.dirname(path)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            # Write then rename so concurrent readers never see half a file
+            fd, tmp_name = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(contents)
+            os.rename(tmp_name, path)
+        except (IOError, OSError) as e:
+            log.debug("Could not cache blob {}: {}".format(sha, e))
+
+
+def default_blob_cache():
+    """
+    Return a :class:`BlobCache` kept in the default cache directory.
+
+    Returns:
+        :class:`BlobCache`: Blob cache instance
+    """
+    return BlobCache(BLOB_CACHE_ROOT)
@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dls_ade.blob_cache import BlobCache, blob_sha
+
+HELLO_SHA = "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+class BlobShaTest(unittest.TestCase):
+
+    def test_given_contents_then_git_blob_sha_returned(self):
+        self.assertEqual(blob_sha(b"hello\n"), HELLO_SHA)
+
+
+class BlobCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = BlobCache(os.path.join(self.tmp_dir, "blobs"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_given_no_entry_then_none_returned(self):
+        self.assertIsNone(self.cache.get(HELLO_SHA))
+
+    def test_given_stored_blob_then_contents_returned(self):
+        self.cache.put(HELLO_SHA, b"hello\n")
+
+        self.assertEqual(self.cache.get(HELLO_SHA.upper()), b"hello\n")
+
+    def test_given_damaged_entry_then_none_returned(self):
+        self.cache.put(HELLO_SHA, b"goodbye\n")
+
+        self.assertIsNone(self.cache.get(HELLO_SHA))
@@ -0,0 +1,603 @@
+#!/bin/env dls-python
+"""
+Simulate the build server on one machine, to measure how quickly build
+requests are submitted and taken from the queue.
+
+The simulator watches the queue directory under DLSBUILD_ROOT_DIR and runs each
+build request file as the build server would, with a pool of workers. The
+scripts run unchanged except that:
+
+* The paths in their header that start with /dls_sw/ are moved under
+  DLSBUILD_ROOT_DIR, and their syslog server is a collector run by the
+  simulator.
+* ``git``, ``make``, ``mail`` and ``dls-logger`` are stubs, so nothing is
+  fetched or built. ``make`` takes a configurable time and exit status.
+  ``dls-logger`` sends the same RFC 5424 messages as the real one.
+
+Only Linux build requests are run. Set DLSBUILD_ROOT_DIR to a scratch
+directory before running the simulator and the scripts submitting to it, e.g.::
+
+    export DLSBUILD_ROOT_DIR=/tmp/dlsbuild
+    python -m dls_ade.build_simulator -j 4 --load 200 --template <request>
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import stat
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dls_ade import dlsbuild
+from dls_ade import logconfig
+from dls_ade.constants import BUILD_SERVERS, DLSBUILD_ROOT_DIR
+from dls_ade.dls_queue import parse_request_filename
+
+usage = """
+Run the build request files submitted to the queue under DLSBUILD_ROOT_DIR
+with stub git and make commands, and report the queue latency and throughput.
+With --load, first submit copies of a build request file to the queue.
+"""
+
+log = logging.getLogger(name="dls_ade")
+usermsg = logging.getLogger(name="usermessages")
+output = logging.getLogger(name="output")
+
+# Builds run at once
+SIMULATOR_WORKERS = 4
+# Seconds between scans of the queue directory
+POLL_INTERVAL = 0.1
+
+JobRecord = namedtuple("JobRecord", ["build_name", "server", "queued",
+                                     "started", "finished", "status"])
+
+SyslogMessage = namedtuple("SyslogMessage", ["received", "level", "build_name",
+                                             "message"])
+
+SYSLOG_LEVELS = {145: "alert", 146: "crit", 147: "err", 148: "warning",
+                 149: "notice", 150: "info", 151: "debug"}
+
+SYSLOG_REGEX = re.compile(
+    r'^<(?P<pri>\d+)>1 \S+ \S+ \S+ - - \[dcs@32121 build_job_parameters='
+    r'"(?P<params>[^"]*)"\] ?(?P<message>.*)$', re.DOTALL)
+
+STUB_GIT = r"""#!/bin/bash
+# Stub git for the build simulator: a clone is a directory holding a minimal
+# configure/RELEASE, and nothing else does anything.
+case "$1" in
+    clone)
+        mkdir -p "${@: -1}/configure" &&
+        echo "EPICS_BASE=/dls_sw/epics/${_epics}/base" \
+            > "${@: -1}/configure/RELEASE"
+        ;;
+    cat-file)
+        cat "${3#*:}"
+        ;;
+    ls-files)
+        exit 1
+        ;;
+esac
+exit 0
+"""
+
+STUB_MAKE = r"""#!/bin/bash
+# Stub make for the build simulator
+if [ "$1" == "clean" ] ; then
+    exit 0
+fi
+sleep ${SIM_MAKE_TIME:-0}
+exit ${SIM_MAKE_STATUS:-0}
+"""
+
+STUB_MAIL = r"""#!/bin/bash
+# Stub mail for the build simulator
+cat > /dev/null
+"""
+
+STUB_DLS_LOGGER = r"""#!/bin/bash
+# Stub dls-logger for the build simulator: sends the message read from stdin
+# to the collector as an RFC 5424 message over UDP.
+while [ $# -gt 0 ] ; do
+    case "$1" in
+        --tag) tag=$2; shift ;;
+        -p) level=${2#*.}; shift ;;
+        -n) server=$2; shift ;;
+        -P) port=$2; shift ;;
+        --sd-param) sd=$2; shift ;;
+    esac
+    shift
+done
+case "$level" in
+    alert) pri=145 ;;
+    crit) pri=146 ;;
+    err*) pri=147 ;;
+    warn*) pri=148 ;;
+    notice) pri=149 ;;
+    debug) pri=151 ;;
+    *) pri=150 ;;
+esac
+read -r message
+echo "<${pri}>1 $(date --rfc-3339=ns | sed 's/ /T/') $(hostname) ${tag} - - [dcs@32121 ${sd}] ${message}" \
+    > /dev/udp/${server}/${port}
+"""
+
+STUBS = {"git": STUB_GIT, "make": STUB_MAKE, "mail": STUB_MAIL,
+         "dls-logger": STUB_DLS_LOGGER}
+
+
+def make_parser():
+    """
+    Creates an ArgumentParser instance and adds
+
+    Flags:
+        * -j (workers)
+        * -n (count)
+        * --idle-exit
+        * --make-time
+        * --make-status
+        * --load
+        * --template
+
+    Returns:
+        :class:`argparse.ArgumentParser`:  ArgParse instance
+    """
+    parser = argparse.ArgumentParser(
+        description=usage,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "-j", "--workers", action="store", type=int,
+        default=SIMULATOR_WORKERS,
+        help="Number of builds run at once, default is {}".format(
+            SIMULATOR_WORKERS))
+    parser.add_argument(
+        "-n", "--count", action="store", type=int,
+        help="Stop after running this many builds")
+    parser.add_argument(
+        "--idle-exit", action="store", type=float, metavar="SECONDS",
+        help="Stop once the queue has been empty and no build has run for "
+             "this long")
+    parser.add_argument(
+        "--make-time", action="store", type=float, default=0.0,
+        help="Seconds each build takes, default is 0")
+    parser.add_argument(
+        "--make-status", action="store", type=int, default=0,
+        help="Exit status of each build, default is 0")
+    parser.add_argument(
+        "--load", action="store", type=int, metavar="N",
+        help="Submit N copies of the --template build request file first")
+    parser.add_argument(
+        "--template", action="store", type=str,
+        help="Build request file to copy for --load, e.g. one kept from a "
+             "test release")
+
+    return parser
+
+
+def parse_syslog_message(data, received=None):
+    """
+    Parse a message sent by the SysLog function of the build scripts.
+
+    Args:
+        data(str): RFC 5424 message
+        received(float): Time the message was received
+
+    Returns:
+        :class:`SyslogMessage`: Message details, or None if the message was
+            not sent by a build script
+    """
+    match = SYSLOG_REGEX.match(data.strip())
+    if match is None:
+        return None
+
+    params = dict(param.split("=", 1)
+                  for param in match.group("params").split() if "=" in param)
+    level = SYSLOG_LEVELS.get(int(match.group("pri")), "info")
+    return SyslogMessage(received, level, params.get("build_name"),
+                         match.group("message"))
+
+
+class SyslogCollector(object):
+    """
+    Receive the syslog messages of the simulated builds on a local UDP port.
+
+    Args:
+        host(str): Address to listen on
+        port(int): Port to listen on, or 0 to pick a free one
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.messages = []
+        self._lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((host, port))
+        self._socket.settimeout(0.1)
+        self.host, self.port = self._socket.getsockname()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._receive)
+        self._thread.daemon = True
+
+    def start(self):
+        """Start receiving messages"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop receiving messages and close the port"""
+        self._stop.set()
+        self._thread.join()
+        self._socket.close()
+
+    def _receive(self):
+        while not self._stop.is_set():
+            try:
+                data = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            message = parse_syslog_message(data.decode("utf-8", "replace"),
+                                           time.time())
+            if message is None:
+                log.debug("Ignoring syslog message {!r}".format(data))
+                continue
+            with self._lock:
+                self.messages.append(message)
+
+    def messages_for(self, build_name):
+        """
+        Return the messages received from a build.
+
+        Args:
+            build_name(str): Build name, without the server suffix
+
+        Returns:
+            list[:class:`SyslogMessage`]: Messages in the order received
+        """
+        with self._lock:
+            return [message for message in self.messages
+                    if message.build_name == build_name]
+
+
+def linux_servers():
+    """Return the names of the Linux build servers"""
+    return list(BUILD_SERVERS["Linux"])
+
+
+def rewrite_header(script, root, syslog_host, syslog_port):
+    """
+    Point the variables in the header of a build request script at the
+    simulator.
+
+    Args:
+        script(str): Build request script
+        root(str): Directory standing in for /dls_sw
+        syslog_host(str): Address of the syslog collector
+        syslog_port(int): Port of the syslog collector
+
+    Returns:
+        str: Script to run
+    """
+    replacements = {"_dls_syslog_server": syslog_host,
+                    "_dls_syslog_server_port": str(syslog_port)}
+    lines = script.splitlines(True)
+    in_header = False
+    for i, line in enumerate(lines):
+        if not line.startswith("_"):
+            if in_header:
+                # The header ends at the first line after it that is not a
+                # variable
+                break
+            continue
+        in_header = True
+        name, _, value = line.partition("=")
+        if name in replacements:
+            lines[i] = "{}={}\n".format(name, replacements[name])
+        elif value.startswith("/dls_sw/"):
+            lines[i] = "{}={}".format(
+                name, os.path.join(root, value[len("/dls_sw/"):]))
+    return "".join(lines)
+
+
+class BuildSimulator(object):
+    """
+    Run the build requests in a queue directory with stub build tools.
+
+    Args:
+        root(str): Directory standing in for /dls_sw, holding the queue
+        workers(int): Number of builds run at once
+        make_time(float): Seconds each build takes
+        make_status(int): Exit status of each build
+    """
+
+    def __init__(self, root, workers=SIMULATOR_WORKERS, make_time=0.0,
+                 make_status=0):
+        self.root = root
+        self.workers = workers
+        self.make_time = make_time
+        self.make_status = make_status
+        self.queue = os.path.join(root, "work", "etc", "build", "queue")
+        self.work_dir = os.path.join(root, "work", "etc", "build",
+                                     "simulator")
+        self.bin_dir = os.path.join(self.work_dir, "bin")
+        self.jobs_dir = os.path.join(self.work_dir, "jobs")
+        self.servers = linux_servers()
+        self.records = []
+        self.collector = None
+
+    def setup(self):
+        """Create the queue, the simulator directories and the stub tools"""
+        for dirname in [self.queue, self.bin_dir, self.jobs_dir]:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+        for name, contents in STUBS.items():
+            path = os.path.join(self.bin_dir, name)
+            with open(path, "w") as f:
+                f.write(contents)
+            os.chmod(path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP |
+                     stat.S_IROTH | stat.S_IXOTH)
+
+    def pending(self):
+        """
+        Return the build requests waiting in the queue, oldest first.
+
+        Returns:
+            list[str]: Build request file names
+        """
+        filenames = []
+        for filename in os.listdir(self.queue):
+            job = parse_request_filename(filename)
+            if job is not None and job.server in self.servers:
+                filenames.append(filename)
+
+        def mtime(filename):
+            try:
+                return os.stat(os.path.join(self.queue, filename)).st_mtime
+            except OSError:
+                return 0
+        return sorted(filenames, key=mtime)
+
+    def claim(self, filename):
+        """
+        Take a build request from the queue, as the build server does.
+
+        Args:
+            filename(str): Build request file name
+
+        Returns:
+            tuple: Path of the claimed file and the time it was queued, or
+                None if the request is no longer in the queue
+        """
+        source = os.path.join(self.queue, filename)
+        target = os.path.join(self.jobs_dir, filename)
+        try:
+            queued = os.stat(source).st_mtime
+            os.rename(source, target)
+        except OSError:
+            return None
+        return target, queued
+
+    def environment(self):
+        """Return the environment the build scripts run in"""
+        return {"PATH": self.bin_dir + ":/usr/bin:/bin",
+                "HOME": os.path.expanduser("~"),
+                "SIM_MAKE_TIME": str(self.make_time),
+                "SIM_MAKE_STATUS": str(self.make_status)}
+
+    def run_job(self, path, queued):
+        """
+        Run a claimed build request.
+
+        Args:
+            path(str): Path of the claimed build request file
+            queued(float): Time the request was queued
+
+        Returns:
+            :class:`JobRecord`: Timings and exit status of the build
+        """
+        filename = os.path.basename(path)
+        job = parse_request_filename(filename)
+        started = time.time()
+
+        with open(path, "r") as f:
+            script = rewrite_header(f.read(), self.root, self.collector.host,
+                                    self.collector.port)
+        with open(path, "w") as f:
+            f.write(script)
+
+        # Run with bash directly: the '#!/bin/env -i' line would clear the
+        # environment holding the stub tools
+        with open(path + ".out", "w") as out:
+            status = subprocess.call(["/bin/bash", path], cwd=self.jobs_dir,
+                                     env=self.environment(),
+                                     stdin=subprocess.DEVNULL, stdout=out,
+                                     stderr=subprocess.STDOUT)
+
+        record = JobRecord(filename[:-len(job.server) - 1], job.server,
+                           queued, started, time.time(), status)
+        log.debug(json.dumps(record._asdict()))
+        return record
+
+    def run(self, count=None, idle_exit=None):
+        """
+        Run build requests as they arrive in the queue until enough have run
+        or the queue has been idle for long enough.
+
+        Args:
+            count(int): Number of builds to run, or None for no limit
+            idle_exit(float): Seconds without work after which to stop, or
+                None to never stop for idleness
+
+        Returns:
+            list[:class:`JobRecord`]: Records of the builds run, in the order
+                they finished
+        """
+        self.collector = SyslogCollector()
+        self.collector.start()
+        running = set()
+        claimed = 0
+        idle_since = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) \
+                    as executor:
+                while True:
+                    for future in [f for f in running if f.done()]:
+                        running.remove(future)
+                        self.records.append(future.result())
+
+                    if count is not None and claimed >= count:
+                        if not running:
+                            break
+                    elif len(running) < self.workers:
+                        for filename in self.pending()[
+                                :self.workers - len(running)]:
+                            claim = self.claim(filename)
+                            if claim is None:
+                                continue
+                            running.add(executor.submit(self.run_job, *claim))
+                            claimed += 1
+                            if count is not None and claimed >= count:
+                                break
+
+                    if running:
+                        idle_since = time.time()
+                    elif idle_exit is not None and \
+                            time.time() - idle_since >= idle_exit:
+                        break
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            # Leave time for the last messages to arrive
+            time.sleep(POLL_INTERVAL)
+            self.collector.stop()
+        return self.records
+
+
+def submit_load(template, count, queue):
+    """
+    Submit copies of a build request file to the queue, each with its own
+    build name, the way :meth:`dls_ade.dlsbuild.Builder.submit` writes them.
+
+    Args:
+        template(str): Path of a build request file
+        count(int): Number of copies to submit
+        queue(str): Queue directory
+
+    Returns:
+        float: Seconds taken to submit them all
+    """
+    filename = os.path.basename(template)
+    job = parse_request_filename(filename)
+    if job is None:
+        raise ValueError("{} is not a build request file".format(template))
+    build_name = filename[:-len(job.server) - 1]
+    with open(template, "r") as f:
+        script = f.read()
+
+    start = time.time()
+    for i in range(count):
+        # Keep the build name parseable: the copy number joins the version
+        name = "{}-sim{}".format(build_name, i)
+        pathname = dlsbuild.write_queue_file(
+            queue, script.replace(build_name, name))
+        os.rename(pathname, os.path.join(
+            queue, "{}.{}".format(name, job.server)))
+    return time.time() - start
+
+
+def percentile(values, fraction):
+    """
+    Return the value below which a fraction of the values lie.
+
+    Args:
+        values(list[float]): Values, in any order
+        fraction(float): Fraction between 0 and 1
+
+    Returns:
+        float: Nearest-rank percentile
+    """
+    values = sorted(values)
+    index = max(0, int(round(fraction * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def summarise(records):
+    """
+    Summarise the timings of the simulated builds.
+
+    Args:
+        records(list[:class:`JobRecord`]): Records of the builds
+
+    Returns:
+        dict: Number of builds and failures, builds per second and queue
+            latency (from submission to starting) statistics in seconds
+    """
+    if not records:
+        return {"builds": 0, "failed": 0}
+
+    latencies = [record.started - record.queued for record in records]
+    first = min(record.queued for record in records)
+    last = max(record.finished for record in records)
+    return {
+        "builds": len(records),
+        "failed": len([record for record in records if record.status != 0]),
+        "throughput": len(records) / max(last - first, 1e-6),
+        "latency_mean": sum(latencies) / len(latencies),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_max": max(latencies),
+    }
+
+
+def _main():
+    parser = make_parser()
+    args = parser.parse_args()
+
+    log.info(json.dumps({'CLI': sys.argv, 'options_args': vars(args)}))
+
+    if os.path.normpath(DLSBUILD_ROOT_DIR) == "/dls_sw":
+        usermsg.error("Set DLSBUILD_ROOT_DIR to a scratch directory: the "
+                      "simulator must not take jobs from the real queue")
+        sys.exit(1)
+    if args.load and not args.template:
+        parser.error("--load requires --template")
+
+    simulator = BuildSimulator(DLSBUILD_ROOT_DIR, args.workers,
+                               args.make_time, args.make_status)
+    simulator.setup()
+
+    count = args.count
+    if args.load:
+        elapsed = submit_load(args.template, args.load, simulator.queue)
+        usermsg.info("Submitted {} build requests in {:.3f}s ({:.1f}/s)".format(
+            args.load, elapsed, args.load / max(elapsed, 1e-6)))
+        if count is None and args.idle_exit is None:
+            count = args.load
+
+    usermsg.info("Running build requests from {} with {} workers".format(
+        simulator.queue, args.workers))
+    records = simulator.run(count, args.idle_exit)
+
+    summary = summarise(records)
+    summary["syslog_messages"] = len(simulator.collector.messages)
+    log.info(json.dumps(summary))
+    output.info(json.dumps(summary, indent=2, sort_keys=True))
+
+
+def main():
+    # Catch unhandled exceptions and ensure they're logged
+    try:
+        logconfig.setup_logging(application='dls-build-simulator.py')
+        _main()
+    except Exception as e:
+        logging.exception(e)
+        logging.getLogger("usermessages").exception(
+            "ABORT: Unhandled exception (see trace below): {}".format(e))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
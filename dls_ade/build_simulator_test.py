@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch
+
+from dls_ade import build_simulator
+from dls_ade import dlsbuild
+from dls_ade.build_simulator import JobRecord
+
+
+class ParseSyslogMessageTest(unittest.TestCase):
+
+    def test_given_build_script_message_then_parsed(self):
+        data = '<147>1 2020-01-01T00:00:00.000+00:00 host dcs_build_job-' \
+               'x86_64 - - [dcs@32121 build_job_parameters="build_name=' \
+               'build_1 area_module_version=support/asyn/4-34 email=a@b ' \
+               'username=abc12345"] Build job failed: no make\n'
+
+        message = build_simulator.parse_syslog_message(data, 1.0)
+
+        self.assertEqual(message, build_simulator.SyslogMessage(
+            1.0, "err", "build_1", "Build job failed: no make"))
+
+    def test_given_other_message_then_none_returned(self):
+        self.assertIsNone(
+            build_simulator.parse_syslog_message("<150>1 hello"))
+
+
+class RewriteHeaderTest(unittest.TestCase):
+
+    def test_given_script_then_header_paths_and_syslog_server_replaced(self):
+        script = "#!/bin/bash\n\n" \
+                 "_build_dir=/dls_sw/prod/R3.14.12.7/support\n" \
+                 "_module=asyn\n" \
+                 "_dls_syslog_server=graylog2.diamond.ac.uk\n" \
+                 "_dls_syslog_server_port=12209\n" \
+                 "\n" \
+                 "_build_dir=/dls_sw/unchanged\n"
+
+        result = build_simulator.rewrite_header(script, "/tmp/sim",
+                                                "127.0.0.1", 5000)
+
+        self.assertEqual(result,
+                         "#!/bin/bash\n\n"
+                         "_build_dir=/tmp/sim/prod/R3.14.12.7/support\n"
+                         "_module=asyn\n"
+                         "_dls_syslog_server=127.0.0.1\n"
+                         "_dls_syslog_server_port=5000\n"
+                         "\n"
+                         "_build_dir=/dls_sw/unchanged\n")
+
+
+class SummariseTest(unittest.TestCase):
+
+    def test_given_no_records_then_zero_builds(self):
+        self.assertEqual(build_simulator.summarise([]),
+                         {"builds": 0, "failed": 0})
+
+    def test_given_records_then_latency_and_throughput_returned(self):
+        records = [JobRecord("a", "redhat7-x86_64", 0.0, 1.0, 2.0, 0),
+                   JobRecord("b", "redhat7-x86_64", 0.0, 3.0, 4.0, 2)]
+
+        summary = build_simulator.summarise(records)
+
+        self.assertEqual(summary["builds"], 2)
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["throughput"], 0.5)
+        self.assertEqual(summary["latency_mean"], 2.0)
+        self.assertEqual(summary["latency_p50"], 1.0)
+        self.assertEqual(summary["latency_max"], 3.0)
+
+
+class BuildSimulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.simulator = build_simulator.BuildSimulator(self.root, workers=2)
+        self.simulator.setup()
+
+        with patch('dls_ade.dlsbuild.lookup_contact_details',
+                   return_value=("A User", "a.user@diamond.ac.uk")):
+            build = dlsbuild.RedhatBuild("redhat7-x86_64", "R3.14.12.7")
+        build.set_area("support")
+        filename, script, _ = build.build_request("asyn", "4-34", None)
+        self.template = os.path.join(self.root, filename)
+        with open(self.template, "w") as f:
+            f.write(script)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_given_load_then_every_request_built_and_logged(self):
+        build_simulator.submit_load(self.template, 3, self.simulator.queue)
+        os.close(os.open(os.path.join(self.simulator.queue, ".build.tmp"),
+                         os.O_CREAT))
+
+        records = self.simulator.run(count=3)
+
+        self.assertEqual([record.status for record in records], [0, 0, 0])
+        self.assertEqual(os.listdir(self.simulator.queue), [".build.tmp"])
+        self.assertTrue(os.path.isdir(os.path.join(
+            self.root, "prod", "R3.14.12.7", "support", "asyn", "4-34")))
+        for record in records:
+            messages = [message.message for message in
+                        self.simulator.collector.messages_for(
+                            record.build_name)]
+            self.assertEqual(messages[-1], "Build complete")
+
+    def test_given_failing_make_then_failure_recorded(self):
+        self.simulator.make_status = 2
+        build_simulator.submit_load(self.template, 1, self.simulator.queue)
+
+        records = self.simulator.run(count=1)
+
+        self.assertEqual(records[0].status, 2)
+        levels = [message.level for message in
+                  self.simulator.collector.messages_for(
+                      records[0].build_name)]
+        self.assertEqual(levels[-1], "err")
@@ -12,6 +12,21 @@ DLSBUILD_WIN_ROOT_DIR = os.getenv("DLSBUILD_WIN_ROOT_DIR", "W:/")
 LDAP_SERVER_URL = 'ldap://altfed.cclrc.ac.uk'
 GIT_ROOT = "dascgitolite@dasc-git.diamond.ac.uk"
 
+# Directory for the local caches kept between invocations of the dls-* scripts
+# (e.g. repository listings). Set ADE_CACHE_DIR to relocate it.
+ADE_CACHE_DIR = os.getenv(
+    "ADE_CACHE_DIR",
+    os.path.join(os.getenv("XDG_CACHE_HOME",
+                           os.path.join(os.path.expanduser("~"), ".cache")),
+                 "dls_ade"))
+# Seconds for which a cached repository listing is used without asking the
+# server for changes, and after which it is rebuilt from scratch.
+REPO_LIST_CACHE_TTL = int(os.getenv("ADE_REPO_LIST_CACHE_TTL", 600))
+REPO_LIST_CACHE_MAX_AGE = int(os.getenv("ADE_REPO_LIST_CACHE_MAX_AGE", 86400))
+# Seconds for which FED-ID contact details found in LDAP are reused. Set to 0
+# to always ask LDAP.
+FED_ID_CACHE_TTL = int(os.getenv("ADE_FED_ID_CACHE_TTL", 86400))
+
 _gelflog_server_addr = os.getenv('ADE_GELFLOG_SERVER', "graylog2.diamond.ac.uk:12201").split(':')
 GELFLOG_SERVER = _gelflog_server_addr[0]
 GELFLOG_SERVER_PORT = _gelflog_server_addr[1]
@@ -8,8 +8,8 @@ import logging
 
 from dls_ade.argument_parser import ArgParser
 from dls_ade.dls_utilities import check_technical_area
-from dls_ade import vcs_git
 from dls_ade import Server
+from dls_ade.gitserver import REFS_ONLY_CLONE
 from dls_ade import logconfig
 
 usage = """
@@ -50,23 +50,31 @@ def _main():
     source = server.dev_module_path(module, args.area)
     log.debug(source)
 
-    if server.is_server_repo(source):
-        vcs = server.temp_clone(source)
-        releases = vcs_git.list_module_releases(vcs.repo)
+    try:
+        refs = server.list_remote_refs(source)
+    except ValueError:
+        raise IOError("{} does not exist on the repository.".format(source))
 
-        if releases:
-            last_release_num = releases[-1]
-        else:
-            usermsg.info("No release has been done for {}".format(module))
-            # return so last_release_num can't be referenced before assignment
-            return 1
+    releases = list(refs["tags"])
+    if releases:
+        last_release_num = releases[-1]
     else:
-        raise IOError("{} does not exist on the repository.".format(source))
+        usermsg.info("No release has been done for {}".format(module))
+        # return so last_release_num can't be referenced before assignment
+        return 1
+
+    if refs["tags"][last_release_num] == refs["HEAD"]:
+        logs = []
+    else:
+        # The refs alone cannot tell whether HEAD is behind the release (e.g.
+        # a release tagged on a branch), so look at the history.
+        vcs = server.temp_clone(source, profile=REFS_ONLY_CLONE)
+        # Get a single log between last release and HEAD
+        # If there is one, then changes have been made
+        logs = list(vcs.repo.iter_commits(last_release_num + "..HEAD",
+                                          max_count=1))
+        shutil.rmtree(vcs.repo.working_tree_dir)
 
-    # Get a single log between last release and HEAD
-    # If there is one, then changes have been made
-    logs = list(vcs.repo.iter_commits(last_release_num + "..HEAD",
-                                      max_count=1))
     if logs:
         output.info("Changes have been made to {module}"
                     " since release {release}".format(
@@ -78,8 +86,6 @@ def _main():
             module=module, release=last_release_num
         ))
 
-    shutil.rmtree(vcs.repo.working_tree_dir)
-
 
 def main():
     # Catch unhandled exceptions and ensure they're logged
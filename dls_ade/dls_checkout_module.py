@@ -14,6 +14,7 @@ from dls_ade import vcs_git
 from dls_ade.argument_parser import ArgParser
 from dls_ade import Server
 from dls_ade import logconfig
+from dls_ade.gitserver import CLONE_JOBS
 
 from six.moves import input
 
@@ -34,6 +35,8 @@ def make_parser():
 
     Flags:
         * -b (branch)
+        * -j (jobs)
+        * --refresh
 
     Returns:
         :class:`argparse.ArgumentParser`:  ArgParse instance
@@ -43,6 +46,12 @@ def make_parser():
     parser.add_branch_flag(
         help_msg="Checkout a specific named branch rather than the default"
                  " (master)")
+    parser.add_argument(
+        "-j", "--jobs", action="store", type=int, dest="jobs",
+        default=CLONE_JOBS,
+        help="Number of repositories to clone at once when checking out an "
+             "area or technical area, default is {}".format(CLONE_JOBS))
+    parser.add_refresh_flag()
 
     parser.add_argument("module_name", nargs="?", type=str, default="",
                         help="Name of module")
@@ -99,13 +108,13 @@ def _main():
 
     if module == "":
         usermsg.info("Checking out entire {} area".format(args.area))
-        server.clone_multi(source)
+        server.clone_multi(source, refresh=args.refresh, jobs=args.jobs)
     elif module.endswith('/') and args.area == 'ioc':
         usermsg.info("Checking out {} technical area...".format(module))
 
         source = server.dev_group_path(module, args.area)
 
-        server.clone_multi(source)
+        server.clone_multi(source, refresh=args.refresh, jobs=args.jobs)
     else:
         usermsg.info("Checking out {module} from {area}".format(module=module,
                                                                 area=args.area))
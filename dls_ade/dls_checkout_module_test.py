@@ -23,6 +23,13 @@ class MakeParserTest(unittest.TestCase):
         self.assertEqual(args.module_name, "module1")
         self.assertEqual(args.area, "python")
 
+    def test_parser_jobs_default_and_override(self):
+        args = self.parser.parse_args("".split())
+        self.assertEqual(args.jobs, dls_checkout_module.CLONE_JOBS)
+
+        args = self.parser.parse_args("-j 12".split())
+        self.assertEqual(args.jobs, 12)
+
     def test_parser_does_not_accept_version(self):
         try:
             self.parser.parse_args("-p module1 0-1".split())
@@ -16,18 +16,84 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with 'dls.environment'.  If not, see <http://www.gnu.org/licenses/>.
 
-import distro
 import logging
 import os
 import re
+from functools import lru_cache
 from subprocess import Popen, PIPE, STDOUT
 try:
     from ConfigParser import SafeConfigParser
 except ImportError:  # Python 3
     from configparser import SafeConfigParser
 
+from dls_ade import lazy_import
+
+distro = lazy_import("distro")
+
 log = logging.getLogger(__name__)
 
+# Leading digits of a release number component
+DIGITS_RE = re.compile(r"\d+")
+# Number of release tags whose normalised form is remembered
+RELEASE_KEY_CACHE_SIZE = 16384
+
+
+def release_of(path):
+    """
+    Return the release number a path ends in.
+
+    Args:
+        path(str or tuple): Path, or tuple with the path as its first element
+
+    Returns:
+        str: Last component of the path
+
+    """
+    if type(path) == tuple:
+        path = path[0]
+    return os.path.split(os.path.normpath(path))[1]
+
+
+@lru_cache(maxsize=RELEASE_KEY_CACHE_SIZE)
+def release_key(release):
+    """
+    Format release tag into a sortable tuple of components, see
+    :meth:`environment.normaliseRelease`. Results are cached, as the same tags
+    are sorted many times.
+
+    Args:
+        release(str): Release tag
+
+    Returns:
+        tuple: Component parts of release tag
+
+    """
+    components = []
+    # first split by dls: 4-5beta2dls1-3 --> 4-5beta2 and 1-3
+    for part in release.split("dls", 1):
+        # rejig separators
+        part = part.replace(".", "-").replace("_", "-")
+        # allow up to 3 -'s: 4-5beta2 --> 4, 5 and beta2
+        for subpart in part.split("-", 3):
+            match = DIGITS_RE.match(subpart)
+            if match:
+                # turn the digit to an int so it sorts properly
+                components.append(int(match.group()))
+                suffix = subpart[match.end():]
+                if suffix == '':
+                    components.append('z')
+                else:
+                    components.append(suffix)
+            else:
+                # just add the string part
+                components.append(0)
+                components.append(subpart)
+        # pad to 6 elements
+        components += [0, ''] * int((6-len(components))/2)
+    # pad to 12 elements
+    components += [0, ''] * int((12-len(components))/2)
+    return tuple(components)
+
 
 class environment(object):
     """
@@ -291,32 +357,11 @@ class environment(object):
             list: Component parts of release tag
 
         """
-        components = []
-        # first split by dls: 4-5beta2dls1-3 --> 4-5beta2 and 1-3
-        for part in release.split("dls", 1):
-            # rejig separators
-            part = part.replace(".", "-").replace("_", "-")
-            # allow up to 3 -'s: 4-5beta2 --> 4, 5 and beta2
-            for subpart in part.split("-", 3):
-                match = re.match("\d+", subpart)
-                if match:
-                    # turn the digit to an int so it sorts properly
-                    components.append(int(match.group()))
-                    suffix = subpart[match.start() + len(match.group()):]
-                    if suffix == '':
-                        components.append('z')
-                    else:
-                        components.append(suffix)
-                else:
-                    # just add the string part
-                    components.append(0)
-                    components.append(subpart)
-            # pad to 6 elements
-            components += [0, ''] * int((6-len(components))/2)
-        # pad to 12 elements
-        components += [0, ''] * int((12-len(components))/2)
-        # log.debug(components)
-        return components
+        return list(release_key(release))
+
+    def _release_sort_key(self, path):
+        # Shared by sortReleases and latest_release so they always agree
+        return self.normaliseRelease(release_of(path)), path
 
     def sortReleases(self, paths):
         """
@@ -330,21 +375,25 @@ class environment(object):
             str: Sorted list of release tags
 
         """
-        releases = []
-        for path in paths:
-            if type(path) == tuple:
-                release = os.path.split(os.path.normpath(path[0]))[1]
-            else:
-                release = os.path.split(os.path.normpath(path))[1]
-            releases.append((self.normaliseRelease(release), path))
-
-        sorted_releases = []
-        for entry in sorted(releases):
-            sorted_releases.append(entry[1])
+        sorted_releases = sorted(paths, key=self._release_sort_key)
         log.debug(sorted_releases)
 
         return sorted_releases
 
+    def latest_release(self, paths):
+        """
+        Find the path with the highest release number in a single pass, for
+        when only the last entry of :meth:`sortReleases` is needed.
+
+        Args:
+            paths(list of str and/or tuple): Paths to choose from
+
+        Returns:
+            str: Path with the latest release, or None if `paths` is empty
+
+        """
+        return max(paths, key=self._release_sort_key, default=None)
+
     def classifyArea(self, path):
         """
         Classify the area of a path, returning
@@ -1,5 +1,7 @@
 #!/bin/env dls-python
 
+import os
+import timeit
 import unittest
 from dls_ade import dls_environment
 from mock import patch, ANY, MagicMock
@@ -680,3 +682,68 @@ class SortReleasesTestWithPatch(SortReleasesTest):
     def test_sorts_letters(self, _1):
         super(SortReleasesTestWithPatch, self).test_sorts_letters()
 
+
+
+class LatestReleaseTest(unittest.TestCase):
+
+    def test_given_releases_then_same_as_last_sorted(self):
+        env = dls_environment.environment()
+        paths = ['/prod/mod/1-7-12beta1dls16-2-13', '/prod/mod/3-10dls12',
+                 '/prod/mod/3-8dls12', '/prod/mod/3-10dls15',
+                 '/prod/mod/3-10dls15beta1']
+
+        self.assertEqual(env.latest_release(paths), '/prod/mod/3-10dls15')
+        self.assertEqual(env.latest_release(paths),
+                         env.sortReleases(paths)[-1])
+
+    def test_given_no_releases_then_none(self):
+        env = dls_environment.environment()
+
+        self.assertIsNone(env.latest_release([]))
+
+    def test_given_many_releases_then_same_as_last_of_sorted(self):
+        env = dls_environment.environment()
+        releases = ["{}-{}-{}dls{}".format(i % 7, i % 13, i % 101, i)
+                    for i in range(1000)] + ["4-5beta2dls1-3", "4-5dls1-3",
+                                             "4-5", "R4.5", "4_5_1"]
+
+        self.assertEqual(env.latest_release(releases),
+                         env.sortReleases(releases)[-1])
+
+
+# Wall-clock comparisons are only run on request, as they depend on the load
+# of the machine running the tests
+RUN_BENCHMARKS = os.environ.get("DLS_ADE_BENCHMARK")
+
+
+@unittest.skipUnless(RUN_BENCHMARKS, "set DLS_ADE_BENCHMARK to run")
+class ReleaseKeyBenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.env = dls_environment.environment()
+        self.releases = ["{}-{}-{}dls{}".format(i % 7, i % 13, i % 101, i)
+                         for i in range(10000)]
+
+    def best_time(self, function):
+        return min(timeit.repeat(function, number=1, repeat=3))
+
+    def test_cached_keys_sort_faster_than_uncached(self):
+        uncached_key = dls_environment.release_key.__wrapped__
+        self.env.sortReleases(self.releases)
+
+        uncached = self.best_time(
+            lambda: sorted(self.releases, key=uncached_key))
+        cached = self.best_time(
+            lambda: sorted(self.releases, key=dls_environment.release_key))
+
+        self.assertLess(cached, uncached)
+
+    def test_latest_release_faster_than_full_sort(self):
+        self.env.sortReleases(self.releases)
+
+        full_sort = self.best_time(
+            lambda: self.env.sortReleases(self.releases)[-1])
+        latest = self.best_time(
+            lambda: self.env.latest_release(self.releases))
+
+        self.assertLess(latest, full_sort)
@@ -6,12 +6,12 @@ Report validation outcome.
 import logging
 import argparse
 import os
-from gitlab import Gitlab
-from gitlab.exceptions import GitlabVerifyError
 
-from dls_ade import logconfig
+from dls_ade import logconfig, lazy_import
 from dls_ade.gitlabserver import GITLAB_API_VERSION, GITLAB_API_URL
 
+gitlab = lazy_import("gitlab")
+
 
 usage = """
 Given the path to a .gitlab-ci.yml configuration file for
@@ -70,7 +70,7 @@ def validate(ci_file_contents):
         tuple: (valid(bool), errors(list))
                 errors contains a list of errors found if valid is False
     """
-    gitlab_api = Gitlab(
+    gitlab_api = gitlab.Gitlab(
         GITLAB_API_URL,
         api_version=GITLAB_API_VERSION,
     )
@@ -111,7 +111,7 @@ def _main():
             for error in errors:
                 usermsg.error("- %s", error)
             exit(1)
-    except GitlabVerifyError as e:
+    except gitlab.exceptions.GitlabVerifyError as e:
         usermsg.error("Validation couldn't be completed.\n%s", e)
         exit(1)
 
@@ -9,11 +9,14 @@ import time
 import sys
 import logging
 import csv
+import heapq
 import argparse
-import requests
 
 from dls_ade.constants import GELFLOG_SERVER
 from dls_ade import logconfig
+from dls_ade import lazy_import
+
+requests = lazy_import("requests")
 
 USER = os.getenv("USER")
 # Read-only API token for Graylog - see GRAYLOG_TOKEN.md
@@ -38,6 +41,16 @@ FINISHED_STR = ("Build complete", "Build job failed")
 
 WINDOWS_WARNING = "Cannot retrieve build status for windows builds"
 
+# Connection to Graylog kept open for every request made by this process
+_session = None
+
+# Seconds between checks on jobs being waited for. Graylog is asked again
+# after WAIT_INTERVAL seconds, backing off up to WAIT_MAX_INTERVAL while no
+# job changes state; logs being tailed are read every WAIT_INTERVAL.
+WAIT_INTERVAL = 1
+WAIT_MAX_INTERVAL = 30
+WAIT_BACKOFF = 2
+
 #TODO:
 '''
 windows builds ---> At the moment they will get stuck in "Queueing" because the windows
@@ -62,6 +75,7 @@ def make_parser():
         * -n (nresults)
         * -l (local)
         * -t (time)
+        * --tail
 
     Returns:
         :class:`argparse.ArgumentParser`:  ArgParse instance
@@ -92,6 +106,10 @@ def make_parser():
         "-t", "--time_frame", action="store", type=int,
         default=2,
         help="Graylog search period in hours. Default is 2 hours.")
+    parser.add_argument(
+        "--tail", action="store_true",
+        help="Print the build log of each job as it is written. "
+             "Implies --wait")
 
     return parser
 
@@ -114,9 +132,25 @@ def create_graylog_query(query_str, time_frame):
     return query_params
 
 
+def get_session():
+    """Return the HTTP session used for Graylog requests, creating it on the
+    first call so the connection is reused by later requests
+
+    Returns:
+        :class:`requests.Session`: Session authenticated with the API token
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.auth = (TOKEN, "token")
+    return _session
+
+
 def graylog_request(params):
     """Make a graylog request
 
+    The response body is streamed; it is read as the rows are parsed.
+
     Args:
         params(dict): Params dict returned from create_graylog_query (or other create
                       function)
@@ -125,51 +159,71 @@ def graylog_request(params):
         reponse object: Graylog response
     """
     url = "https://" + GELFLOG_SERVER + "/api/search/universal/relative"
-    auth = (TOKEN, "token")
-    r = requests.get(url, auth=auth, params=params)
+    r = get_session().get(url, params=params, stream=True)
     return r
 
 
-def parse_graylog_response(graylog_response):
+def iter_graylog_rows(graylog_response):
+    """Parse the graylog CSV response lazily, one row at a time
+
+    Args:
+        graylog_response(response object): Response returned by graylog_request()
+
+    Yields:
+        dict: Graylog search result, mapping field names to values. Fields
+        missing from a row are empty.
+    """
+    lines = (line.decode("utf-8") if isinstance(line, bytes) else line
+             for line in graylog_response.iter_lines())
+    reader = csv.reader(lines, delimiter=',')
+    try:
+        header = next(reader)
+    except StopIteration:
+        return
+
+    for row in reader:
+        row = row + [""] * (len(header) - len(row))
+        yield dict(zip(header, row))
+
+
+def parse_graylog_response(graylog_response, limit=None):
     """Parse the graylog response as a list of dictionaries in reverse
     time order
 
     Args:
         graylog_response(response object): Response returned by graylog_request()
+        limit(int): Only return the newest `limit` results; the rest are
+                    discarded as they are read instead of being sorted
 
     Returns:
         list of dict: Graylog search results as a list of dictionaries
         sorted in reverse time order.
     """
-    reader = csv.reader(graylog_response.iter_lines(), delimiter=',')
-    try:
-        header = reader.next()
-    except StopIteration:
-        pass
-
-    dicts = []
-    for row in reader:
-        dictline = {}
-        for h, hline in enumerate(header):
-            dictline[hline] = row[h]
-        dicts.append(dictline)
-    dicts = sorted(dicts, key=lambda i: i["timestamp"], reverse=True)
-    return dicts
+    rows = iter_graylog_rows(graylog_response)
+    key = lambda i: i["timestamp"]
+    if limit is None:
+        return sorted(rows, key=key, reverse=True)
+    # nlargest keeps a heap of at most `limit` rows
+    return heapq.nlargest(limit, rows, key=key)
 
 
-def get_graylog_response(params):
+def get_graylog_response(params, limit=None):
     """Send request to graylog API and parse the result as list of dicts
 
     Args:
         params(dict): Params dict returned from create_graylog_query (or other create
                       function)
+        limit(int): Only return the newest `limit` results
 
     Returns:
         list of dict: Graylog search results as a list of dictionaries
         sorted in reverse time order.
     """
     res = graylog_request(params)
-    return parse_graylog_response(res)
+    try:
+        return parse_graylog_response(res, limit)
+    finally:
+        res.close()
 
 
 def create_build_job_query(user, time_frame, local=False):
@@ -215,6 +269,29 @@ def create_build_started_query(build_job, time_frame):
     return create_graylog_query(query_str, time_frame)
 
 
+def create_build_jobs_state_query(build_jobs, time_frame):
+    """Create one query for everything needed to find the state of several
+    build jobs: their start and finish messages from the build server, and
+    the request file messages that tell windows builds apart.
+
+    Args:
+        build_jobs(list of str): Build job names
+        time_frame(int): Graylog search period in hours
+
+    Returns:
+        dict: Params for requests.get() from graylog API
+    """
+    names = " OR ".join('"' + build_job + '"' for build_job in build_jobs)
+    query_str = ('(application_name:dcs_build_job* AND build_name:(' + names +
+                 ') AND (message:"' + STARTED_STR + '" OR ' +
+                 " OR ".join('message:"' + s + '"' for s in FINISHED_STR) +
+                 '))')
+    for build_job in build_jobs:
+        if needs_windows_check(build_job):
+            query_str += ' OR message:"Build request file: ' + build_job + '"'
+    return create_graylog_query(query_str, time_frame)
+
+
 def create_build_finished_query(build_job, time_frame):
     query_str = ('application_name:dcs_build_job* AND build_name:"' +
                  build_job + '" ' +
@@ -259,7 +336,8 @@ def get_build_jobs(time_frame, user=USER, njobs=1, local=False):
     Returns:
         list of str: List of build names
     """
-    graylog_dicts_list = get_graylog_response(create_build_job_query(user, time_frame, local))
+    graylog_dicts_list = get_graylog_response(
+        create_build_job_query(user, time_frame, local), limit=njobs)
     build_jobs = extract_build_jobs(graylog_dicts_list, time_frame, njobs=njobs)
     return build_jobs
 
@@ -284,6 +362,20 @@ def display_build_job_info(status_dict):
     logging.getLogger("output").info(job_info)
 
 
+def needs_windows_check(build_job):
+    """Check whether a build job could be a windows build. Local, etc and
+    tools builds only run on linux.
+
+    Args:
+        build_job(str): Build job name
+
+    Returns:
+        bool: True if the request file must be checked for a windows server
+    """
+    return not (build_job.startswith("local") or "_etc_" in build_job or
+                "_tools_" in build_job)
+
+
 def is_windows(build_job, time_frame):
     """Check if windows build
 
@@ -294,10 +386,11 @@ def is_windows(build_job, time_frame):
     Returns:
         bool: True if windows build
     """
-    if build_job.startswith("local") or "_etc_" in build_job or "_tools_" in build_job:
+    if not needs_windows_check(build_job):
         windows = False
     else:
-        graylog_dicts_list = get_graylog_response(create_windows_query(build_job, time_frame))
+        graylog_dicts_list = get_graylog_response(
+            create_windows_query(build_job, time_frame), limit=1)
         try:
             windows = ".windows" in graylog_dicts_list[0]["message"]
         except IndexError:
@@ -377,13 +470,14 @@ def get_completed_status(completed_dict):
     return status + " at " + parse_timestamp(complete_timestamp)
 
 
-def get_build_status(build_job, time_frame):
-    """Find the status of a build job. The status of the build job, location or the
-       log and err files in a dictionary.
+def make_status_dict(build_job, started, completed):
+    """Combine the start and finish messages of a build job into its status
+    dictionary.
 
     Args:
         build_job(str): build job name
-        time_frame(int): Graylog search period in hours
+        started(dict): Graylog response dict of the start message, or None
+        completed(dict): Graylog response dict of the finish message, or None
 
     Returns:
         dict: Dictionary with build name, log file, err file and build status
@@ -391,12 +485,10 @@ def get_build_status(build_job, time_frame):
     status = "Queueing"
     status_dict = {JOB_NAME: build_job}
 
-    started = get_started_dict(build_job, time_frame)
     if started is not None:
         status_dict[LOG_FILE] = find_file(started, "log")
         status_dict[ERR_FILE] = find_file(started, "err")
 
-    completed = get_completed_dict(build_job, time_frame)
     if completed is not None:
         status = get_completed_status(completed)
 
@@ -407,6 +499,170 @@ def get_build_status(build_job, time_frame):
     return status_dict
 
 
+def get_build_status(build_job, time_frame):
+    """Find the status of a build job. The status of the build job, location or the
+       log and err files in a dictionary.
+
+    Args:
+        build_job(str): build job name
+        time_frame(int): Graylog search period in hours
+
+    Returns:
+        dict: Dictionary with build name, log file, err file and build status
+    """
+    started = get_started_dict(build_job, time_frame)
+    completed = get_completed_dict(build_job, time_frame)
+    return make_status_dict(build_job, started, completed)
+
+
+def extract_build_job_states(response_dict_list, build_jobs):
+    """Group the results of a create_build_jobs_state_query query by build job
+
+    Args:
+        response_dict_list(list of dicts): Graylog search results in reverse
+                                           time order
+        build_jobs(list of str): Build job names
+
+    Returns:
+        dict: For each build job a dict with the latest "started" and
+              "completed" response dicts (None if not logged yet) and
+              "windows", which is None if the build server is unknown
+    """
+    states = {}
+    for build_job in build_jobs:
+        states[build_job] = {
+            "started": None, "completed": None,
+            "windows": None if needs_windows_check(build_job) else False}
+
+    for response_dict in response_dict_list:
+        message = response_dict["message"]
+        state = states.get(response_dict.get("build_name"))
+        if state is not None:
+            if message.startswith(STARTED_STR):
+                key = "started"
+            elif message.startswith(FINISHED_STR):
+                key = "completed"
+            else:
+                continue
+            if state[key] is None:
+                state[key] = response_dict
+        elif message.startswith("Build request file: "):
+            # Request messages have no build_name; the file name is the
+            # build job name followed by the build server
+            for build_job, state in states.items():
+                if message.startswith("Build request file: " + build_job +
+                                      ".") and state["windows"] is None:
+                    state["windows"] = ".windows" in message
+
+    return states
+
+
+def get_build_job_states(build_jobs, time_frame):
+    """Find the state of several build jobs with a single Graylog query
+
+    Args:
+        build_jobs(list of str): Build job names
+        time_frame(int): Graylog search period in hours
+
+    Returns:
+        dict: Build job states as returned by extract_build_job_states
+    """
+    if not build_jobs:
+        return {}
+    graylog_dicts_list = get_graylog_response(
+        create_build_jobs_state_query(build_jobs, time_frame))
+    return extract_build_job_states(graylog_dicts_list, build_jobs)
+
+
+class LogTail(object):
+    """Follow a build log on the shared filesystem
+
+    Args:
+        path(str): Path of the log file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+
+    def read_new_lines(self):
+        """Return the lines appended since the last call
+
+        Returns:
+            list of str: Complete lines, without line endings
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.position)
+                data = f.read()
+        except (IOError, OSError):
+            return []
+        # Leave a partly written last line for the next call. The position is
+        # a byte offset, so a multi-byte character split between two reads
+        # is only decoded once it is complete.
+        end = data.rfind(b"\n") + 1
+        self.position += end
+        return [line.decode("utf-8", errors="replace")
+                for line in data[:end].splitlines()]
+
+
+def wait_for_build_jobs(build_jobs, time_frame, tail=False):
+    """Wait until several build jobs have finished
+
+    The state of every unfinished job is fetched with one Graylog query,
+    repeated with exponential backoff while nothing changes.
+
+    Args:
+        build_jobs(list of str): Build job names
+        time_frame(int): Graylog search period in hours
+        tail(bool): If True, print the lines of each job's build log as they
+                    are written, once its start message gives the log path
+
+    Returns:
+        dict: Final build job states as returned by extract_build_job_states
+    """
+    output = logging.getLogger(name="output")
+
+    states = get_build_job_states(build_jobs, time_frame)
+    pending = list(build_jobs)
+    tails = {}
+    interval = WAIT_INTERVAL
+    next_query = time.time() + interval
+
+    while True:
+        for job in list(pending):
+            state = states[job]
+            if tail and state["started"] is not None and job not in tails:
+                log_file = find_file(state["started"], "log")
+                if os.path.isfile(log_file):
+                    tails[job] = LogTail(log_file)
+            if job in tails:
+                for line in tails[job].read_new_lines():
+                    output.info("\r{}: {}".format(job, line))
+            if state["completed"] is not None:
+                pending.remove(job)
+                output.info("\rCompleted job: {}: {}\n".format(
+                    job, time.ctime()))
+
+        if not pending:
+            return states
+
+        sys.stdout.write("Waiting for {} job(s): {}\r".format(
+            len(pending), time.ctime()))
+        sys.stdout.flush()
+        time.sleep(WAIT_INTERVAL)
+
+        if time.time() >= next_query:
+            new_states = get_build_job_states(list(pending), time_frame)
+            changed = any(new_states[job] != states[job] for job in pending)
+            states.update(new_states)
+            if changed:
+                interval = WAIT_INTERVAL
+            else:
+                interval = min(interval * WAIT_BACKOFF, WAIT_MAX_INTERVAL)
+            next_query = time.time() + interval
+
+
 def _main():
 
     log = logging.getLogger(name="dls_ade")
@@ -419,27 +675,29 @@ def _main():
     build_jobs = get_build_jobs(
         time_frame=args.time_frame, user=args.user, njobs=args.nresults, local=args.local)
 
+    states = get_build_job_states(build_jobs, args.time_frame)
+
+    to_wait_for = []
     for job in build_jobs:
-        waiting = False
-        windows = is_windows(job, args.time_frame)
+        windows = states[job]["windows"]
+
+        if windows is None:
+            usermsg.error("Cannot determine linux/windows build for " + job)
+            sys.exit(1)
 
         if windows:
             usermsg.info("\r{:<{}s}: {}".format("Warning", LJUST, WINDOWS_WARNING))
+        elif states[job]["completed"] is None:
+            to_wait_for.append(job)
 
-        if args.wait and not windows:
-            while get_completed_dict(job, args.time_frame) is None:
-                waiting = True
-                sys.stdout.write(
-                    "Waiting for {}: {}\r".format(job,
-                                                  time.ctime()))
-                sys.stdout.flush()
-                #output.info(time.ctime(), end="\r", flush=True)#python 3 equivalent
-                time.sleep(1)
-
-        if waiting:
-            output.info("\rCompleted job: {}: {}\n".format(job, time.ctime()))
+    if (args.wait or args.tail) and to_wait_for:
+        states.update(wait_for_build_jobs(to_wait_for, args.time_frame,
+                                          tail=args.tail))
 
-        status_dict = get_build_status(job, args.time_frame)
+    for job in build_jobs:
+        state = states[job]
+        status_dict = make_status_dict(job, state["started"],
+                                       state["completed"])
         display_build_job_info(status_dict)
 
         if args.errors and ERR_FILE in status_dict and os.path.isfile(status_dict[ERR_FILE]):
@@ -8,7 +8,10 @@ import dls_ade.dls_last_release as dls_last_release
 from argparse import _StoreAction
 from argparse import _StoreTrueAction
 
+import os
 import re
+import shutil
+import tempfile
 from requests.models import Response
 
 build_job_response = [{'build_name': '', 'timestamp': '2020-01-21T16:05:09.858Z', 'message': "Build server job parameters: {'dls_syslog_server': 'graylog2.diamond.ac.uk', 'force': 'false', 'epics': 'R3.14.12.7', 'module': 'BL08J-BUILDER', 'build_name': 'build_20200121-160509_ysx26594_support_BL08J-BUILDER_0-27', 'git_dir': 'https://gitlab.diamond.ac.uk/controls/support/BL08J-BUILDER.git', 'user': 'ysx26594', 'dls_syslog_server_port': '12209', 'area': 'support', 'build_dir': '/dls_sw/prod/R3.14.12.7/support', 'version': '0-27', 'email': u'tom.trafford@diamond.ac.uk'}"}, {'build_name': '', 'timestamp': '2020-01-21T16:03:17.809Z', 'message': "Build server job parameters: {'dls_syslog_server': 'graylog2.diamond.ac.uk', 'force': 'false', 'epics': 'R3.14.12.7', 'module': 'Launcher', 'build_name': 'build_20200121-160317_hgs15624_etc_Launcher_0-87', 'git_dir': 'https://gitlab.diamond.ac.uk/controls/etc/Launcher.git', 'user': 'hgs15624', 'dls_syslog_server_port': '12209', 'area': 'etc', 'build_dir': '/dls_sw/prod/etc', 'version': '0-87', 'email': u'will.rogers@diamond.ac.uk'}"}]
@@ -75,6 +78,11 @@ class ParserTest(unittest.TestCase):
         self.assertEqual(option.dest, "time_frame")
         self.assertIn("--time_frame", option.option_strings)
 
+    def test_tail_option_has_correct_attributes(self):
+        option = self.parser._option_string_actions['--tail']
+        self.assertIsInstance(option, _StoreTrueAction)
+        self.assertEqual(option.dest, "tail")
+
 
 def test_get_build_jobs():
     with mock.patch('dls_ade.dls_last_release.get_graylog_response') as mocked_graylog_response:
@@ -122,3 +130,151 @@ def test_parse_timestamp(response):
 def test_find_log_file(started_dict, expected, ext):
     assert dls_last_release.find_file(started_dict, ext) == expected
 
+
+def test_build_job_states_resolved_from_one_query():
+    ioc_job = response_ioc[0]["build_name"]
+    etc_job = response_etc[0]["build_name"]
+    windows_job = "build_20200117-125836_cvl62853_ioc_ME13C_ME13C-EA-IOC-03_0-1"
+    responses = [response_etc[0], response_ioc[0], response_ioc[1],
+                 response_etc[2], windows_ioc[0],
+                 {'build_name': '', 'timestamp': '2019-11-01T10:30:43.000Z',
+                  'message': 'Build request file: ' + ioc_job +
+                             '.redhat6-x86_64 Created in : /dls_sw/work/etc/build/queue'}]
+    with mock.patch('dls_ade.dls_last_release.get_graylog_response') as mocked_graylog_response:
+        mocked_graylog_response.return_value = responses
+        states = dls_last_release.get_build_job_states(
+            [ioc_job, etc_job, windows_job], time_frame)
+
+    assert mocked_graylog_response.call_count == 1
+    query = mocked_graylog_response.call_args[0][0]["query"]
+    assert 'build_name:("' + ioc_job + '" OR "' + etc_job in query
+    assert 'Build request file: ' + etc_job not in query
+    assert states[ioc_job] == {"started": response_ioc[1],
+                               "completed": response_ioc[0], "windows": False}
+    assert states[etc_job]["windows"] is False
+    assert states[windows_job] == {"started": None, "completed": None,
+                                   "windows": True}
+    assert dls_last_release.make_status_dict(
+        ioc_job, states[ioc_job]["started"],
+        states[ioc_job]["completed"]) == status_dict_ioc
+
+
+def test_build_job_state_without_request_message_is_unknown():
+    job = "build_20200121-175420_xfz39520_ioc_BL04J_BL04J-MO-IOC-02_2020-R7-Run1-5"
+    states = dls_last_release.extract_build_job_states([], [job])
+    assert states[job]["windows"] is None
+
+
+class FakeResponse(object):
+
+    def __init__(self, content):
+        self.content = content
+
+    def iter_lines(self):
+        for line in self.content.split("\n"):
+            yield line.encode("utf-8")
+
+
+def test_parse_graylog_response_sorts_rows_newest_first():
+    rows = dls_last_release.parse_graylog_response(FakeResponse(test_content))
+    assert [row["message"] for row in rows] == ["M3", "M4", "M1", "M2"]
+    assert rows[2] == {"timestamp": "2019-11-04T14:04:45.337Z",
+                       "message": "M1", "build_name": ""}
+
+
+def test_parse_graylog_response_with_limit_keeps_newest_rows():
+    rows = dls_last_release.parse_graylog_response(FakeResponse(test_content),
+                                                   limit=2)
+    assert [row["build_name"] for row in rows] == ["BN3", "BN4"]
+
+
+def test_parse_empty_graylog_response():
+    assert dls_last_release.parse_graylog_response(FakeResponse("")) == []
+
+
+@mock.patch("dls_ade.dls_last_release._session", None)
+@mock.patch("dls_ade.dls_last_release.requests.Session")
+def test_graylog_requests_share_one_session(mock_session):
+    dls_last_release.graylog_request({"query": "a"})
+    dls_last_release.graylog_request({"query": "b"})
+    assert mock_session.call_count == 1
+    assert mock_session.return_value.get.call_count == 2
+
+
+def make_state(started=None, completed=None):
+    return {"started": started, "completed": completed, "windows": False}
+
+
+@mock.patch('dls_ade.dls_last_release.time.sleep')
+@mock.patch('dls_ade.dls_last_release.get_build_job_states')
+def test_wait_queries_unfinished_jobs_together_with_backoff(mock_states,
+                                                             mock_sleep):
+    clock = [0]
+    mock_sleep.side_effect = lambda seconds: clock.__setitem__(
+        0, clock[0] + seconds)
+    ioc_job = response_ioc[0]["build_name"]
+    etc_job = response_etc[0]["build_name"]
+    running = {ioc_job: make_state(response_ioc[1]),
+               etc_job: make_state(response_etc[2])}
+    mock_states.side_effect = [
+        running,
+        {ioc_job: make_state(response_ioc[1]),
+         etc_job: make_state(response_etc[2], response_etc[0])},
+        {ioc_job: make_state(response_ioc[1])},
+        {ioc_job: make_state(response_ioc[1])},
+        {ioc_job: make_state(response_ioc[1], response_ioc[0])},
+    ]
+
+    with mock.patch('dls_ade.dls_last_release.time.time',
+                    side_effect=lambda: clock[0]):
+        states = dls_last_release.wait_for_build_jobs([ioc_job, etc_job],
+                                                      time_frame)
+
+    assert states[ioc_job]["completed"] == response_ioc[0]
+    assert states[etc_job]["completed"] == response_etc[0]
+    queried = [call[0][0] for call in mock_states.call_args_list]
+    assert queried == [[ioc_job, etc_job], [ioc_job, etc_job], [ioc_job],
+                       [ioc_job], [ioc_job]]
+    # 1s after a change, then backing off to 2s and 4s while unchanged
+    assert clock[0] == 1 + 1 + 2 + 4
+
+
+class LogTailTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.log_dir, "build.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def test_only_new_complete_lines_returned(self):
+        tail = dls_last_release.LogTail(self.log_file)
+        self.assertEqual(tail.read_new_lines(), [])
+
+        with open(self.log_file, "w") as f:
+            f.write("line 1\nline 2\npart")
+        self.assertEqual(tail.read_new_lines(), ["line 1", "line 2"])
+
+        with open(self.log_file, "a") as f:
+            f.write("ial line 3\n")
+        self.assertEqual(tail.read_new_lines(), ["partial line 3"])
+        self.assertEqual(tail.read_new_lines(), [])
+
+    def test_given_utf8_lines_then_decoded_without_repeats(self):
+        tail = dls_last_release.LogTail(self.log_file)
+        quoted = u"error: \u2018x\u2019 undeclared\n".encode("utf-8")
+
+        with open(self.log_file, "wb") as f:
+            # Stop in the middle of the closing quote
+            f.write(quoted[:-13])
+        self.assertEqual(tail.read_new_lines(), [])
+
+        with open(self.log_file, "ab") as f:
+            f.write(quoted[-13:] + b"next line\n")
+        self.assertEqual(tail.read_new_lines(),
+                         [u"error: \u2018x\u2019 undeclared", "next line"])
+
+        with open(self.log_file, "ab") as f:
+            f.write(b"bad \xff byte\n")
+        self.assertEqual(tail.read_new_lines(), [u"bad \ufffd byte"])
@@ -6,12 +6,11 @@ List the branches of a module on the repository.
 
 import sys
 import json
-import shutil
 import logging
 
 from dls_ade.argument_parser import ArgParser
 from dls_ade.dls_utilities import check_technical_area
-from dls_ade import vcs_git, Server
+from dls_ade import Server
 from dls_ade import logconfig
 
 usage = """
@@ -52,14 +51,10 @@ def _main():
 
     source = server.dev_module_path(args.module_name, args.area)
 
-    vcs = server.temp_clone(source)
-
-    branches = vcs_git.list_remote_branches(vcs.repo)
+    branches = server.list_remote_refs(source)["branches"]
     usermsg.info("Branches of {module}:".format(module=source))
     output.info("{branches}".format(branches=", ".join(branches)))
 
-    shutil.rmtree(vcs.repo.working_tree_dir)
-
 
 def main():
     # Catch unhandled exceptions and ensure they're logged
@@ -19,6 +19,8 @@ Default <area> is 'support'.
 List all modules in the <area> area.
 If <dom_name> given and <area> = 'ioc', list the subdirectories of <dom_name>.
 e.g. %(prog)s -p prints: converter, cothread, dls_nsga, etc.
+On a terminal, modules are printed as the server returns them, so the first
+ones appear straight away; otherwise the list is sorted ignoring case.
 """
 
 
@@ -28,6 +30,7 @@ def make_parser():
 
     Flags:
         * -d (domain) :class:`argparse.ArgumentParser`
+        * --refresh
 
     Returns:
         :class:`argparse.ArgumentParser`: Parser instance
@@ -35,21 +38,41 @@ def make_parser():
     parser = ArgParser(usage)
     parser.add_argument("domain_name", nargs="?", type=str,
                         help="domain of ioc to list")
+    parser.add_refresh_flag()
     return parser
 
 
-def get_module_list(source):
+def iter_module_list(source, refresh=False):
+    """
+    Yields the modules in the area of the repository specified by source, as
+    the server finds them.
+
+    Args:
+        source(str): Suffix of URL to list from e.g. controls/ioc/BL15I
+        refresh(bool): Ignore any cached repository listing
+
+    Yields:
+        str: Module name
+    """
+    server = Server()
+    for repo in server.iter_server_repo_list(source, refresh=refresh):
+        # Strip source from the front and .git from the end.
+        yield remove_git_at_end(repo.split(source + '/')[-1])
+
+
+def get_module_list(source, refresh=False):
     """
     Prints the modules in the area of the repository specified by source.
 
     Args:
         source(str): Suffix of URL to list from e.g. controls/ioc/BL15I
+        refresh(bool): Ignore any cached repository listing
 
     Returns:
         list: List of modules (list of str)
     """
     server = Server()
-    repos = server.get_server_repo_list(source)
+    repos = server.get_server_repo_list(source, refresh=refresh)
     # Strip source from the front and .git from the end.
     modules = [remove_git_at_end(p.split(source + '/')[-1]) for p in repos]
     return modules
@@ -77,8 +100,16 @@ def _main():
     usermsg.info("Listing modules in the %s area\n"
                  "Hold on, this may take a little while ...",
                  search_area)
+    if sys.stdout.isatty():
+        # Print each page of the listing as it arrives, unsorted
+        usermsg.info("Modules in {area}:".format(area=search_area))
+        for module in iter_module_list(source, args.refresh):
+            output.info(module)
+        return
+
     # Sort ignoring case of module name.
-    module_list = sorted(get_module_list(source), key=lambda x: x.lower())
+    module_list = sorted(get_module_list(source, args.refresh),
+                         key=lambda x: x.lower())
     usermsg.info("Modules in {area}:".format(area=search_area))
     print_msg = "\n".join(module_list)
     output.info(print_msg)
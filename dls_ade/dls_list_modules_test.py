@@ -42,7 +42,8 @@ class PrintModuleListTest(unittest.TestCase):
 
         dls_list_modules.get_module_list(source)
 
-        self.server_mock.get_server_repo_list.assert_called_once_with(source)
+        self.server_mock.get_server_repo_list.assert_called_once_with(
+            source, refresh=False)
 
     def test_given_valid_source_then_list_of_modules(self):
         self.server_mock.get_server_repo_list.return_value = [
@@ -54,3 +55,45 @@ class PrintModuleListTest(unittest.TestCase):
         module_list = dls_list_modules.get_module_list(source)
         self.assertIsNotNone(module_list)
         self.assertListEqual(module_list, ['module', 'module2'])
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server_mock = server_mock
+        self.server_mock.dev_area_path.return_value = "controls/support"
+        repos = ["controls/support/motor.git", "controls/support/asyn.git",
+                 "controls/support/Busy.git"]
+        self.server_mock.iter_server_repo_list.return_value = iter(repos)
+        self.server_mock.get_server_repo_list.return_value = repos
+
+        patcher = patch('dls_ade.dls_list_modules.logging.getLogger')
+        self.output = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        patcher = patch('sys.argv', ["dls-list-modules.py"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server_mock.reset_mock()
+
+    @patch('sys.stdout')
+    def test_given_terminal_then_modules_printed_as_found(self, mock_stdout):
+        mock_stdout.isatty.return_value = True
+
+        dls_list_modules._main()
+
+        self.server_mock.iter_server_repo_list.assert_called_once_with(
+            "controls/support", refresh=False)
+        self.assertFalse(self.server_mock.get_server_repo_list.call_count)
+        printed = [call[0][0] for call in self.output.info.call_args_list]
+        self.assertEqual(printed[-3:], ["motor", "asyn", "Busy"])
+
+    @patch('sys.stdout')
+    def test_given_pipe_then_sorted_list_printed(self, mock_stdout):
+        mock_stdout.isatty.return_value = False
+
+        dls_list_modules._main()
+
+        self.assertFalse(self.server_mock.iter_server_repo_list.call_count)
+        self.output.info.assert_called_with("asyn\nBusy\nmotor")
@@ -9,7 +9,6 @@ The git flag will list releases from the repository.
 
 import os
 import sys
-import shutil
 import json
 import platform
 import logging
@@ -17,7 +16,7 @@ import logging
 from dls_ade.dls_environment import environment
 from dls_ade.argument_parser import ArgParser
 from dls_ade.dls_utilities import check_technical_area
-from dls_ade import vcs_git, Server
+from dls_ade import Server
 from dls_ade import logconfig
 
 usage = """
@@ -116,9 +115,7 @@ def _main():
         source = server.dev_module_path(args.module_name, args.area)
         log.debug(source)
 
-        vcs = server.temp_clone(source)
-        releases = vcs_git.list_module_releases(vcs.repo)
-        shutil.rmtree(vcs.repo.working_tree_dir)
+        releases = list(server.list_remote_refs(source)["tags"])
 
     else:
         # List branches from prod
@@ -23,6 +23,7 @@ from dls_ade.argument_parser import ArgParser
 from dls_ade.dls_environment import environment
 from dls_ade.dls_utilities import check_technical_area
 from dls_ade import vcs_git, Server
+from dls_ade.gitserver import BLOBLESS_CLONE, REFS_ONLY_CLONE
 from dls_ade import logconfig
 
 usage = """
@@ -198,13 +199,36 @@ def set_log_range(module, releases, earlier, later, releases_list):
     return start, end
 
 
-def get_log_messages(repo):
+def get_log_range(start, end):
+    """
+    Return the git revision range of the commits between two releases.
+
+    Args:
+        start(str): Start point, or "" for the beginning of the history
+        end(str): End point
+
+    Returns:
+        str: Revision range for `git log`
+    """
+
+    if start:
+        return "{}..{}".format(start, end)
+    return end
+
+
+def get_log_messages(repo, start="", end="HEAD"):
     """
     Create a `log_info` dictionary and add log messages, commit objects and
     max author length.
 
+    Only the commits in the range from `start` (exclusive) to `end` are
+    walked, so the cost depends on the size of the range rather than the
+    whole history.
+
     Args:
         repo(:class:`~git.repo.base.Repo`): Git repository instance
+        start(str): Start point, or "" for the beginning of the history
+        end(str): End point
 
     Returns:
         dict: A dictionary containing messages, commit objects and the longest
@@ -213,7 +237,7 @@ def get_log_messages(repo):
     """
     log_info = {'logs': [], 'commit_objects': {}, 'max_author_length': 0}
 
-    for commit in repo.iter_commits():
+    for commit in repo.iter_commits(get_log_range(start, end)):
         sha = commit.hexsha[:7]
         author = commit.author.name
         summary = commit.summary.replace('\n', ' ')
@@ -360,6 +384,27 @@ def format_log_messages(log_info, raw, verbose):
         list[str]: A list log entries
     """
 
+    return list(iter_log_messages(log_info, raw, verbose))
+
+
+def iter_log_messages(log_info, raw, verbose):
+    """
+    Format the entries of a `log_info` dictionary one at a time, newest
+    first, see :func:`format_log_messages`.
+
+    Args:
+        log_info(dict): Dictionary containing log information from commits,
+            with the logs in chronological order. If it has a 'file_changes'
+            entry from :func:`get_file_changes_by_commit` the verbose diff
+            info is taken from there.
+        raw(bool): True or False for whether to format in raw or in colour
+        verbose(bool): True or False to add extra information (time, date,
+            message body and diff info)
+
+    Yields:
+        str: Formatted log entry
+    """
+
     blue = 34
     cyan = 36
     green = 32
@@ -367,6 +412,7 @@ def format_log_messages(log_info, raw, verbose):
     logs = log_info['logs']
     commit_objects = log_info['commit_objects']
     max_author_length = log_info['max_author_length']
+    file_changes = log_info.get('file_changes')
 
     # Add formatting parameters
     screen_width = 100
@@ -379,14 +425,9 @@ def format_log_messages(log_info, raw, verbose):
 
     max_line_length = screen_width - overflow_message_padding
 
-    formatted_logs = []
-    prev_sha = ''
-    for log_entry in logs:
-
-        if len(log_entry) > 1:
-            commit_sha = log_entry[1][:7]
-        else:
-            commit_sha = 'no sha'
+    for index in range(len(logs) - 1, -1, -1):
+        log_entry = logs[index]
+        commit_sha = entry_sha(log_entry)
 
         if len(log_entry) > 2:
             name = '{:<{}}'.format(log_entry[2], max_author_length)
@@ -422,32 +463,51 @@ def format_log_messages(log_info, raw, verbose):
                         '\n' + \
                         '{:<{}}'.format('...', overflow_message_padding) + line
 
-            # Get diff information for commit
+            # Get diff information against the previous (older) entry
             diff_info = ''
-            if prev_sha:
-                # Pass commit objects corresponding to current and previous
-                # commit_sha to get_file_changes
-                changed_files = get_file_changes(commit_objects[prev_sha],
-                                                 commit_objects[commit_sha])
+            if index > 0:
+                prev_sha = entry_sha(logs[index - 1])
+                if file_changes is not None:
+                    changed_files = []
+                    commit = commit_objects[commit_sha]
+                    # A release entry lists nothing against its own commit
+                    if commit != commit_objects[prev_sha]:
+                        changed_files = file_changes.get(commit.hexsha, [])
+                else:
+                    # Pass commit objects corresponding to current and
+                    # previous commit_sha to get_file_changes
+                    changed_files = get_file_changes(
+                        commit_objects[prev_sha], commit_objects[commit_sha])
                 if changed_files:
                     diff_info = "\n\nChanges:\n"
                     for file_change in changed_files:
                         diff_info += file_change
-            prev_sha = commit_sha
 
-            formatted_logs.append(colour(commit_sha, blue, raw) + ' ' +
-                                  colour(date_and_time, cyan, raw) + ' ' +
-                                  colour(name, green, raw) + ': ' +
-                                  formatted_message + diff_info)
+            yield (colour(commit_sha, blue, raw) + ' ' +
+                   colour(date_and_time, cyan, raw) + ' ' +
+                   colour(name, green, raw) + ': ' +
+                   formatted_message + diff_info)
         # Otherwise, add to logs
         else:
-            formatted_logs.append(colour(commit_sha, blue, raw) + ' ' +
-                                  colour(name, green, raw) + ': ' +
-                                  formatted_message)
+            yield (colour(commit_sha, blue, raw) + ' ' +
+                   colour(name, green, raw) + ': ' +
+                   formatted_message)
 
-    formatted_logs.reverse()
 
-    return formatted_logs
+def entry_sha(log_entry):
+    """
+    Return the abbreviated SHA of a `log_info` entry.
+
+    Args:
+        log_entry(list): Entry of log_info['logs']
+
+    Returns:
+        str: Seven character SHA, or 'no sha'
+    """
+
+    if len(log_entry) > 1:
+        return log_entry[1][:7]
+    return 'no sha'
 
 
 def colour(word, col, raw):
@@ -510,6 +570,77 @@ def get_file_changes(commit, prev_commit):
     return changed_files
 
 
+def iter_name_status(repo, start, end):
+    """
+    Read the files changed by every commit in a range from a single
+    `git log --name-status -M`, parsing its output as it is produced. Merge
+    commits list the files changed from their first parent.
+
+    Args:
+        repo(:class:`~git.repo.base.Repo`): Git repository instance
+        start(str): Start point, or "" for the beginning of the history
+        end(str): End point
+
+    Yields:
+        str, list[str]: Full SHA of each commit and its changed files in the
+            format of :func:`get_file_changes`
+    """
+
+    if repo.git.version_info >= (2, 31):
+        merge_option = "--diff-merges=first-parent"
+    else:
+        # Older git repeats a merge once for each parent, first parent first
+        merge_option = "-m"
+    process = repo.git.log("--name-status", "-M", merge_option,
+                           "--format=%x00%H", get_log_range(start, end),
+                           as_process=True)
+    sha = None
+    changed_files = []
+    repeated = False
+    for line in process.stdout:
+        line = line.decode("utf-8", "replace").rstrip("\n")
+        if line.startswith("\x00"):
+            repeated = line[1:] == sha
+            if repeated:
+                continue
+            if sha is not None:
+                yield sha, changed_files
+            sha = line[1:]
+            changed_files = []
+        elif "\t" in line and not repeated:
+            fields = line.split("\t")
+            status = fields[0][:1]
+            if status == "R":
+                changed_files.append('A     ' + fields[2] + ' (Renamed)\n')
+                changed_files.append('D     ' + fields[1] + ' (Renamed)\n')
+            elif status == "C":
+                changed_files.append('A     ' + fields[2] + '\n')
+            elif status in ("A", "D"):
+                changed_files.append(status + '     ' + fields[1] + '\n')
+            else:
+                changed_files.append('M     ' + fields[1] + '\n')
+    if sha is not None:
+        yield sha, changed_files
+    process.wait()
+
+
+def get_file_changes_by_commit(repo, start, end):
+    """
+    Find the files changed by every commit in a range, see
+    :func:`iter_name_status`.
+
+    Args:
+        repo(:class:`~git.repo.base.Repo`): Git repository instance
+        start(str): Start point, or "" for the beginning of the history
+        end(str): End point
+
+    Returns:
+        dict: Full commit SHA to list of changed files
+    """
+
+    return dict(iter_name_status(repo, start, end))
+
+
 def format_message_width(message, line_len):
     """
     Takes message and formats each line to be shorter than `line_len`, splits a
@@ -567,7 +698,9 @@ def _main():
     source = server.dev_module_path(args.module_name, args.area)
 
     if server.is_server_repo(source):
-        vcs = server.temp_clone(source)
+        # File contents are only read for the verbose list of changes
+        profile = BLOBLESS_CLONE if args.verbose else REFS_ONLY_CLONE
+        vcs = server.temp_clone(source, profile=profile)
         releases = vcs_git.list_module_releases(vcs.repo)
         log.debug(releases)
     else:
@@ -583,7 +716,7 @@ def _main():
     # Create log info from log messages
     # log_info is a dictionary in the form {logs(list), commit_objects(dict),
     # max_author_length(int)}
-    log_info = get_log_messages(vcs.repo)
+    log_info = get_log_messages(vcs.repo, start, end)
 
     if len(releases) > 0:
 
@@ -605,24 +738,24 @@ def _main():
     # Sort tags and commits chronologically by the UNIX time stamp in index 0
     log_info['logs'] = sorted(log_info['logs'], key=itemgetter(0))
 
-    # Make list of printable log entries
-    formatted_logs = format_log_messages(log_info, raw, args.verbose)
+    if args.verbose:
+        log_info['file_changes'] = get_file_changes_by_commit(vcs.repo,
+                                                              start, end)
 
     if end == 'HEAD':
         print_bool = True
     else:
         print_bool = False
 
+    # Write each log entry as soon as it is formatted
     release_marker = "(RELEASE: {})"
-    messages = []
-    for log in formatted_logs:
+    for log in iter_log_messages(log_info, raw, args.verbose):
         if log.endswith(release_marker.format(end)):
             print_bool = True
         if print_bool:
-            messages.append(log)
+            output.info(log)
         if log.endswith(release_marker.format(start)):
             break
-    output.info("\n".join(messages))
 
     shutil.rmtree(vcs.repo.working_tree_dir)
 
@@ -1,6 +1,12 @@
 #!/bin/env dls-python
 
+import os
+import shutil
+import tempfile
 import unittest
+
+import git
+
 from dls_ade import dls_logs_since_release
 from mock import patch, MagicMock, ANY
 from argparse import _StoreTrueAction
@@ -284,6 +290,25 @@ class GetLogMessagesTest(unittest.TestCase):
                                                u' make "sdos" public to allow checks on the sdo_observers list']]})
 
 
+    def test_given_range_then_only_range_walked(self):
+
+        repo_inst = MagicMock()
+        repo_inst.iter_commits.return_value = []
+
+        dls_logs_since_release.get_log_messages(repo_inst, '4-1', '4-2')
+
+        repo_inst.iter_commits.assert_called_once_with('4-1..4-2')
+
+    def test_given_no_start_then_history_up_to_end_walked(self):
+
+        repo_inst = MagicMock()
+        repo_inst.iter_commits.return_value = []
+
+        dls_logs_since_release.get_log_messages(repo_inst, '', 'HEAD')
+
+        repo_inst.iter_commits.assert_called_once_with('HEAD')
+
+
 class GetTagsListTest(unittest.TestCase):
 
     def test_given_range_then_extract(self):
@@ -511,6 +536,20 @@ class FormatLogMessagesTest(unittest.TestCase):
         self.assertEqual(log, [u'no sha no date/time no name: \n'])
 
 
+class IterLogMessagesTest(unittest.TestCase):
+
+    def test_given_logs_then_yielded_newest_first(self):
+        log_info = {'commit_objects': {}, 'max_author_length': 3,
+                    'logs': [[1, '1111111', 'Ann', 'first'],
+                             [2, '2222222', 'Bob', 'second']]}
+
+        logs = dls_logs_since_release.iter_log_messages(log_info, raw=True,
+                                                        verbose=False)
+
+        self.assertEqual(next(logs), '2222222 Bob: second')
+        self.assertEqual(next(logs), '1111111 Ann: first')
+
+
 class ColourTest(unittest.TestCase):
 
     def test_given_word_and_raw_then_return_word(self):
@@ -590,6 +629,99 @@ class GetFileChangesTest(unittest.TestCase):
         self.assertEqual(diffs, ['A     new_file (Renamed)\n', 'D     old_file (Renamed)\n'])
 
 
+class GetFileChangesByCommitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_inst = MagicMock()
+        self.repo_inst.git.version_info = (2, 39, 2)
+        self.process = self.repo_inst.git.log.return_value
+        self.process.stdout = [
+            b"\x00" + b"2" * 40 + b"\n", b"\n",
+            b"R100\told_file\tnew_file\n", b"D\tgone_file\n",
+            b"\x00" + b"1" * 40 + b"\n", b"\n",
+            b"A\tnew_file\n", b"M\told_file\n"]
+
+    def test_given_range_then_single_log_run(self):
+        dls_logs_since_release.get_file_changes_by_commit(self.repo_inst,
+                                                          "1-0", "HEAD")
+
+        self.repo_inst.git.log.assert_called_once_with(
+            "--name-status", "-M", "--diff-merges=first-parent",
+            "--format=%x00%H", "1-0..HEAD", as_process=True)
+        self.process.wait.assert_called_once_with()
+
+    def test_given_log_then_changes_parsed_per_commit(self):
+        changes = dls_logs_since_release.get_file_changes_by_commit(
+            self.repo_inst, "1-0", "HEAD")
+
+        self.assertEqual(changes, {
+            "2" * 40: ['A     new_file (Renamed)\n',
+                       'D     old_file (Renamed)\n',
+                       'D     gone_file\n'],
+            "1" * 40: ['A     new_file\n', 'M     old_file\n']})
+
+    def _merge_history(self):
+        # 1-0 -- main ------ merge
+        #    \-- feature --/
+        repo_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, repo_dir)
+        repo = git.Repo.init(repo_dir)
+        repo.git.config("user.name", "Test")
+        repo.git.config("user.email", "test@diamond.ac.uk")
+
+        def commit(filename, message):
+            with open(os.path.join(repo_dir, filename), "w") as f:
+                f.write(message)
+            repo.git.add(filename)
+            repo.git.commit("-m", message)
+
+        commit("README", "initial")
+        repo.git.tag("1-0")
+        main_branch = repo.active_branch.name
+        repo.git.checkout("-b", "feature")
+        commit("feature_file", "feature")
+        repo.git.checkout(main_branch)
+        commit("main_file", "main")
+        repo.git.merge("--no-ff", "-m", "merge", "feature")
+        return repo
+
+    def _check_merge_history_changes(self, repo):
+        changes = dls_logs_since_release.get_file_changes_by_commit(
+            repo, "1-0", "HEAD")
+
+        self.assertEqual(changes, {
+            repo.head.commit.hexsha: ['A     feature_file\n'],
+            repo.commit("HEAD^1").hexsha: ['A     main_file\n'],
+            repo.commit("HEAD^2").hexsha: ['A     feature_file\n']})
+
+    def test_given_merge_commit_then_changes_from_first_parent_listed(self):
+        self._check_merge_history_changes(self._merge_history())
+
+    def test_given_old_git_and_merge_commit_then_side_branch_listed(self):
+        repo = self._merge_history()
+
+        with patch.object(type(repo.git), "version_info", (2, 17, 1)):
+            self._check_merge_history_changes(repo)
+
+    def test_given_file_changes_then_diff_not_run(self):
+        commit_1 = MagicMock(hexsha="1" * 40)
+        commit_2 = MagicMock(hexsha="2" * 40)
+        log_info = {'commit_objects': {'1111111': commit_1,
+                                       '2222222': commit_2},
+                    'max_author_length': 3,
+                    'file_changes': {"2" * 40: ['M     old_file\n']},
+                    'logs': [[1, '1111111', 'Ann', 'first',
+                              '01/01/2020 00:00:00', ''],
+                             [2, '2222222', 'Bob', 'second',
+                              '02/01/2020 00:00:00', '']]}
+
+        logs = dls_logs_since_release.format_log_messages(log_info, raw=True,
+                                                          verbose=True)
+
+        self.assertIn('M     old_file\n', logs[0])
+        self.assertFalse(commit_1.diff.called)
+
+
 class FormatMessageWidthTest(unittest.TestCase):
 
     def test_given_length_OK_then_returned_as_list(self):
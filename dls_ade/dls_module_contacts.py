@@ -17,12 +17,16 @@ import json
 import logging
 import csv
 import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from dls_ade.argument_parser import ArgParser
 from dls_ade import Server
 from dls_ade.exceptions import FedIdError
+from dls_ade.gitserver import SPARSE_CLONE
 from dls_ade import logconfig
-from dls_ade.dls_utilities import lookup_contact_details
+from dls_ade.dls_utilities import lookup_contact_details, lookup_contacts
+from dls_ade.vcs_git import git
 
 # Optional but useful in a library or non-main module:
 logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -30,6 +34,9 @@ log = logging.getLogger(__name__)
 usermsg = logging.getLogger(name="usermessages")
 output = logging.getLogger(name="output")
 
+# Number of modules whose .gitattributes are read from the server at once
+CONTACT_JOBS = 8
+
 usage = """
 Default <area> is 'support'.
 Set or get primary contact (contact) and secondary contact (cc) properties
@@ -65,6 +72,7 @@ def make_parser():
         * -d (cc)
         * -s (csv)
         * -m (import)
+        * --refresh
 
     Returns:
         :class:`argparse.ArgumentParser`: ArgParse instance
@@ -91,6 +99,7 @@ def make_parser():
         "-m", "--import", action="store", type=str, metavar="CSV_FILE",
         dest="imp", help="Import a CSV_FILE with header and rows of format:" +
                          "\nModule, Contact, Contact Name, CC, CC Name")
+    parser.add_refresh_flag()
 
     return parser
 
@@ -271,10 +280,40 @@ def edit_contact_info(repo, contact='', cc=''):
     return commit_message
 
 
+def parse_contacts(gitattributes):
+    """
+    Get the contact and cc set for the whole module in a .gitattributes file,
+    as 'git check-attr' would report them for the top level directory.
+
+    Args:
+        gitattributes(str): Contents of the .gitattributes file, or None if
+            the module has none
+
+    Returns:
+        contact, cc_contact
+    """
+    attributes = {"module-contact": "unspecified",
+                  "module-cc": "unspecified"}
+    for line in (gitattributes or "").splitlines():
+        fields = line.split()
+        if not fields or fields[0] != "*":
+            continue
+        for field in fields[1:]:
+            name, _, value = field.partition("=")
+            # Later lines override earlier ones
+            if name in attributes and value:
+                attributes[name] = value
+
+    return attributes["module-contact"], attributes["module-cc"]
+
+
 def get_module_contacts(module, area, server=None):
     """
     Get the contact and cc for the named module in the given area
 
+    Only the .gitattributes file is read from the server; the module is not
+    cloned.
+
     Args:
         module: Module name
         area: Repository area
@@ -290,12 +329,40 @@ def get_module_contacts(module, area, server=None):
         server = Server()
 
     source = server.dev_module_path(module, area)
-    local_clone = server.temp_clone(source, depth=1)
-    contact, cc_contact = get_contacts_from_local_clone(local_clone)
+    gitattributes = server.read_file(source, "HEAD", ".gitattributes")
 
-    shutil.rmtree(local_clone.repo.working_tree_dir)
+    return parse_contacts(gitattributes)
+
+
+def get_all_module_contacts(modules, area, server=None, jobs=CONTACT_JOBS):
+    """
+    Get the contact and cc for many modules in the given area, reading their
+    .gitattributes files from the server concurrently.
+
+    Args:
+        modules(list): Module names
+        area(str): Repository area
+        server: Optional Server object, will be created if not given.
+        jobs(int): Maximum number of modules read at once
+
+    Returns:
+        OrderedDict: Module name to (contact, cc_contact) in the order of
+            `modules`, or to None if the module could not be read
+    """
+    if server is None:
+        server = Server()
+
+    def read_contacts(module):
+        try:
+            return get_module_contacts(module, area, server)
+        except (ValueError, git.GitCommandError) as e:
+            log.debug("Could not read contacts of {}: {}".format(module, e))
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        results = executor.map(read_contacts, modules)
+        return OrderedDict(zip(modules, results))
 
-    return contact, cc_contact
 
 def get_contacts_from_local_clone(local_clone):
     # Retrieve contact info
@@ -324,7 +391,8 @@ def _main():
         for module in args.modules:
             modules.append(module)
     else:
-        repo_list = server.get_server_repo_list(args.area)
+        repo_list = server.get_server_repo_list(args.area,
+                                                refresh=args.refresh)
         for path in repo_list:
             modules.append(path.split(args.area + "/")[-1])
 
@@ -333,15 +401,19 @@ def _main():
     if not (args.contact or args.cc or args.imp):
 
         print_out = []
-        for module in modules:
-            try:
-                contact, cc_contact = get_module_contacts(
-                    module, args.area, server
-                )
-            except ValueError:
+        all_contacts = get_all_module_contacts(modules, args.area, server)
+        if args.csv:
+            # Find every FED-ID in a few LDAP searches up front, so the
+            # lookups in output_csv_format are answered from the cache
+            lookup_contacts([fed_id for contacts in all_contacts.values()
+                             if contacts is not None for fed_id in contacts
+                             if fed_id != "unspecified"])
+        for module, contacts in all_contacts.items():
+            if contacts is None:
                 usermsg.error("Module {} does not exist in {}".format(
                     module, args.area))
                 continue
+            contact, cc_contact = contacts
 
             if args.csv:
                 print_out.append(output_csv_format(contact, cc_contact, module))
@@ -371,7 +443,8 @@ def _main():
     for module, contact, cc in contacts:
         log.debug("Cloning {module} from {area}".format(module=module, area=args.area))
         source = server.dev_module_path(module, args.area)
-        vcs = server.temp_clone(source)
+        vcs = server.temp_clone(source, profile=SPARSE_CLONE,
+                                paths=["/.gitattributes"])
         repo = vcs.repo
 
         try:
@@ -332,3 +332,44 @@ class EditContactInfoTest(unittest.TestCase):
 
         self.assertEqual(mock_file.write.call_args_list[0][0][0], "* module-contact=user123\n")
         self.assertEqual(mock_file.write.call_args_list[1][0][0], "* module-cc=user789\n")
+
+
+class ParseContactsTest(unittest.TestCase):
+
+    def test_given_contact_and_cc_then_both_returned(self):
+        contacts = dls_module_contacts.parse_contacts(
+            "* module-contact=user123\n* module-cc=user456\n")
+
+        self.assertEqual(contacts, ("user123", "user456"))
+
+    def test_given_no_gitattributes_then_unspecified(self):
+        contacts = dls_module_contacts.parse_contacts(None)
+
+        self.assertEqual(contacts, ("unspecified", "unspecified"))
+
+    def test_given_repeated_attribute_then_last_one_used(self):
+        contacts = dls_module_contacts.parse_contacts(
+            "* module-contact=user123\n*.db -diff\n"
+            "* module-contact=user789 module-cc=user456\n")
+
+        self.assertEqual(contacts, ("user789", "user456"))
+
+
+class GetAllModuleContactsTest(unittest.TestCase):
+
+    def test_given_modules_then_contacts_read_without_cloning(self):
+        server = MagicMock()
+        server.dev_module_path.side_effect = \
+            lambda module, area: "controls/{}/{}".format(area, module)
+        server.read_file.side_effect = [
+            "* module-contact=user123\n", ValueError("no such module")]
+
+        contacts = dls_module_contacts.get_all_module_contacts(
+            ["module1", "module2"], "support", server, jobs=1)
+
+        self.assertEqual(list(contacts), ["module1", "module2"])
+        self.assertEqual(contacts["module1"], ("user123", "unspecified"))
+        self.assertIsNone(contacts["module2"])
+        server.read_file.assert_any_call(
+            "controls/support/module1", "HEAD", ".gitattributes")
+        self.assertFalse(server.temp_clone.call_count)
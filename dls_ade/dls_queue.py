@@ -0,0 +1,174 @@
+#!/bin/env dls-python
+# This script comes from the dls_scripts python module
+"""
+List the build jobs waiting in the build server queue, or the build requests
+you have submitted for a module.
+"""
+
+import os
+import sys
+import time
+import json
+import logging
+import argparse
+from collections import namedtuple
+
+from dls_ade import dlsbuild
+from dls_ade import logconfig
+from dls_ade.constants import BUILD_SERVERS
+from dls_ade.release_log import ReleaseLog
+
+usage = """
+List the build jobs waiting in the build server queue. Only the names of the
+build request files are read, so the queue is listed quickly however many
+jobs it holds. With --history, list the build requests you have submitted
+for a module instead, from your release log.
+"""
+
+log = logging.getLogger(name="dls_ade")
+usermsg = logging.getLogger(name="usermessages")
+output = logging.getLogger(name="output")
+
+QueuedJob = namedtuple("QueuedJob", ["submitted", "user", "area", "module",
+                                     "version", "server", "filename"])
+
+BUILD_NAME_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def make_parser():
+    """
+    Creates an ArgumentParser instance and adds
+
+    Flags:
+        * -u (user)
+        * -s (server)
+        * --history
+
+    Returns:
+        :class:`argparse.ArgumentParser`:  ArgParse instance
+    """
+    parser = argparse.ArgumentParser(
+        description=usage,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "-u", "--user", action="store", type=str,
+        help="Only list jobs submitted by this user (FED ID)")
+    parser.add_argument(
+        "-s", "--server", action="store", type=str,
+        help="Only list jobs for this build server, e.g. redhat7-x86_64")
+    parser.add_argument(
+        "--history", action="store", type=str, metavar="MODULE",
+        help="List your past build requests for MODULE instead")
+
+    return parser
+
+
+def parse_request_filename(filename):
+    """
+    Get the details of a job from the name of its build request file, which
+    is '<build_name>.<server>' (see :meth:`dls_ade.dlsbuild.Builder.submit`).
+
+    Args:
+        filename(str): Name of a file in the queue directory
+
+    Returns:
+        :class:`QueuedJob`: Job details, or None if the file is not a build
+            request. The module name has any '/' replaced by '_'.
+    """
+    servers = [server for os_servers in BUILD_SERVERS.values()
+               for server in os_servers]
+    for server in servers:
+        if filename.endswith("." + server):
+            build_name = filename[:-len(server) - 1]
+            break
+    else:
+        return None
+
+    # build_<date-time>_<user>_<area>_<module>_<version>
+    fields = build_name.split("_", 4)
+    if len(fields) != 5 or fields[0] != "build" or "_" not in fields[4]:
+        return None
+    _, stamp, user, area, module_version = fields
+    module, version = module_version.rsplit("_", 1)
+    try:
+        submitted = time.mktime(time.strptime(stamp, BUILD_NAME_TIME_FORMAT))
+    except ValueError:
+        return None
+
+    return QueuedJob(submitted, user, area, module, version, server, filename)
+
+
+def list_queue(pathname=None):
+    """
+    List the build jobs in the queue directory, oldest first.
+
+    Args:
+        pathname(str): Queue directory, defaults to the build server queue
+
+    Returns:
+        list[:class:`QueuedJob`]: Queued jobs
+    """
+    if pathname is None:
+        pathname = dlsbuild.queue_dir()
+
+    jobs = [parse_request_filename(filename)
+            for filename in os.listdir(pathname)]
+    return sorted(job for job in jobs if job is not None)
+
+
+def format_job(job):
+    """
+    Format a queued job for display.
+
+    Args:
+        job(:class:`QueuedJob`): Queued job
+
+    Returns:
+        str: One line summary
+    """
+    return "{} {:<10} {:<8} {} {} ({})".format(
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job.submitted)),
+        job.user, job.area, job.module, job.version, job.server)
+
+
+def _main():
+    parser = make_parser()
+    args = parser.parse_args()
+
+    log.info(json.dumps({'CLI': sys.argv, 'options_args': vars(args)}))
+
+    if args.history:
+        entries = ReleaseLog(dlsbuild.release_log_file()).find(args.history)
+        if not entries:
+            usermsg.info("No build requests logged for {}".format(
+                args.history))
+        for entry in entries:
+            output.info("{} {} ({}) -> {}".format(
+                entry.build_name, entry.version, entry.server,
+                entry.build_dir))
+        return
+
+    jobs = [job for job in list_queue()
+            if (args.user is None or job.user == args.user) and
+            (args.server is None or job.server == args.server)]
+    if not jobs:
+        usermsg.info("No build jobs waiting in the queue")
+    for job in jobs:
+        output.info(format_job(job))
+
+
+def main():
+    # Catch unhandled exceptions and ensure they're logged
+    try:
+        logconfig.setup_logging(application='dls-queue.py')
+        _main()
+    except Exception as e:
+        logging.exception(e)
+        logging.getLogger("usermessages").exception(
+            "ABORT: Unhandled exception (see trace below): {}".format(e))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
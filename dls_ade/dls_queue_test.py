@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dls_ade import dls_queue
+
+
+class ParseRequestFilenameTest(unittest.TestCase):
+
+    def test_given_build_request_then_job_returned(self):
+        job = dls_queue.parse_request_filename(
+            "build_20260101-120000_abc12345_ioc_BL01I_BL01I-EA-IOC-01_1-2"
+            ".redhat7-x86_64")
+
+        self.assertEqual(job.user, "abc12345")
+        self.assertEqual(job.area, "ioc")
+        self.assertEqual(job.module, "BL01I_BL01I-EA-IOC-01")
+        self.assertEqual(job.version, "1-2")
+        self.assertEqual(job.server, "redhat7-x86_64")
+
+    def test_given_server_with_underscore_then_job_returned(self):
+        job = dls_queue.parse_request_filename(
+            "build_20260101-120000_abc12345_support_asyn_4-34"
+            ".windows6_3-AMD64")
+
+        self.assertEqual(job.module, "asyn")
+        self.assertEqual(job.server, "windows6_3-AMD64")
+
+    def test_given_other_files_then_none_returned(self):
+        for filename in [".tmpabc123.tmp",
+                         "build_20260101-120000_abc12345_support_asyn_4-34",
+                         "notes.redhat7-x86_64",
+                         "build_bad-date_abc12345_support_asyn_4-34"
+                         ".redhat7-x86_64"]:
+            self.assertIsNone(dls_queue.parse_request_filename(filename))
+
+
+class ListQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.queue)
+
+    def test_given_queue_then_jobs_listed_oldest_first(self):
+        for filename in [
+                "build_20260101-120100_abc12345_support_motor_6-9"
+                ".redhat7-x86_64",
+                "build_20260101-120000_xyz98765_support_asyn_4-34"
+                ".redhat6-x86_64",
+                ".tmpabc123.tmp"]:
+            open(os.path.join(self.queue, filename), "w").close()
+
+        jobs = dls_queue.list_queue(self.queue)
+
+        self.assertEqual([job.module for job in jobs], ["asyn", "motor"])
@@ -16,8 +16,11 @@ the server
 
 import sys
 import json
+import shutil
 import re
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from dls_ade import Server
 from dls_ade import dlsbuild
@@ -25,8 +28,12 @@ from dls_ade import logconfig
 from dls_ade.argument_parser import ArgParser
 from dls_ade.dls_environment import environment
 from dls_ade.exceptions import VCSGitError
+from dls_ade.gitserver import SPARSE_CLONE
+from dls_ade.vcs_git import git
 from dls_ade.dls_utilities import check_tag_is_valid
 
+from six.moves import input
+
 usage = """Default <area> is 'support'.
  Release <module_name> at tag <release> from <area>.
  This script will do a test build of the module. If it succeeds, a build
@@ -40,6 +47,12 @@ usage = """Default <area> is 'support'.
 log = logging.getLogger(name="dls_ade")
 usermsg = logging.getLogger(name="usermessages")
 
+# Number of pre-flight steps run at once
+PREFLIGHT_JOBS = 4
+# Areas released from git
+GIT_SUPPORTED_AREAS = ["support", "ioc", "epics", "python", "matlab",
+                       "python3", "tools", "targetOS", "etc"]
+
 
 def make_parser():
     """
@@ -195,8 +208,7 @@ def check_parsed_arguments_valid(args, parser):
             * <args.area> area not supported by git
 
     """
-    git_supported_areas = ["support", "ioc", "epics", "python", "matlab", "python3",
-                           "tools", "targetOS", "etc"]
+    git_supported_areas = GIT_SUPPORTED_AREAS
     etc_supported_areas = ["init", "Launcher"]
     if not args.module_name:
         parser.error("Module name not specified")
@@ -270,7 +282,7 @@ def get_last_release(releases):
         str: Most recent release number
 
     """
-    last_release = environment().sortReleases(releases)[-1].split("/")[-1]
+    last_release = environment().latest_release(releases).split("/")[-1]
     return last_release
 
 
@@ -324,6 +336,23 @@ def construct_info_message(module, branch, area, version, build_object):
     return info
 
 
+def is_epics_version_mismatch(module_epics, option_epics, build_epics):
+    """
+    Checks if a release would be built against a different epics version from
+    its previous release without the -e flag
+
+    Args:
+        module_epics(str): Epics version of previous release
+        option_epics(str): Epics version to change to
+        build_epics(str): Epics version of environment
+
+    Returns:
+        bool: True if the user should be asked before building
+
+    """
+    return not option_epics and module_epics != build_epics.replace("_64", "")
+
+
 def check_epics_version_consistent(module_epics, option_epics, build_epics):
     """
     Checks if epics version is consistent between release and environment,
@@ -338,21 +367,21 @@ def check_epics_version_consistent(module_epics, option_epics, build_epics):
         bool: True if the build can continue, False if not
 
     """
-    build_epics = build_epics.replace("_64", "")
-    if not option_epics and module_epics != build_epics:
+    if is_epics_version_mismatch(module_epics, option_epics, build_epics):
+        build_epics = build_epics.replace("_64", "")
         question = (
             "You are trying to release a %s module under %s without "
             "using the -e flag. Are you sure [Y/N]?" %
             (module_epics, build_epics)).lower()
         answer = ask_user_input(question)
-        return False if answer.upper() is not "Y" else True
+        return answer.upper() == "Y"
     else:
         return True
 
 
 def ask_user_input(question):
     """
-    Wrapper for raw_input function
+    Wrapper for input function
 
     Args:
         question(str): Question for the user to respond to
@@ -361,7 +390,7 @@ def ask_user_input(question):
         str: User input
 
     """
-    return raw_input(question)
+    return input(question)
 
 
 def get_module_epics_version(vcs):
@@ -376,7 +405,38 @@ def get_module_epics_version(vcs):
         str: Epics version of most recent release
 
     """
-    conf_release = vcs.cat("configure/RELEASE")
+    return parse_epics_version(vcs.cat("configure/RELEASE"))
+
+
+def get_release_epics_version(server, source, version):
+    """
+    Get epics version of a release by reading its configure/RELEASE from the
+    server, without a clone
+
+    Args:
+        server(:class:`~dls_ade.gitserver.GitServer`): Git server instance
+        source(str): Server repository path of the module
+        version(str): Release or commit to read
+
+    Returns:
+        str: Epics version of the release
+
+    """
+    conf_release = server.read_file(source, version, "configure/RELEASE")
+    return parse_epics_version(conf_release or "")
+
+
+def parse_epics_version(conf_release):
+    """
+    Find the epics version in the contents of a configure/RELEASE file
+
+    Args:
+        conf_release(str): Contents of configure/RELEASE
+
+    Returns:
+        str: Epics version, or an empty list if none is mentioned
+
+    """
     module_epics = re.findall(
         r"/dls_sw/epics/(R\d(?:\.\d+)+)/base", conf_release)
     if module_epics:
@@ -503,6 +563,189 @@ def normalise_release(release, area):
     return new_release
 
 
+def run_task_graph(tasks, jobs=PREFLIGHT_JOBS, cleanup=None):
+    """
+    Run functions concurrently, each as soon as the tasks it depends on have
+    finished.
+
+    Args:
+        tasks(dict): Task name to a tuple of the function to run and the list
+            of names of the tasks it depends on. The function is called with
+            the results of those tasks, in the same order.
+        jobs(int): Maximum number of tasks run at once
+        cleanup(dict): Task name to a function called with the task's result
+            if another task fails, e.g. to remove a temporary clone
+
+    Returns:
+        dict, dict: Task name to result, and task name to seconds taken
+
+    Raises:
+        ValueError: If the dependencies of the tasks cannot be resolved
+        Exception: The first error raised by a task, once the tasks already
+            running have finished. Tasks depending on it are not run, and the
+            results of the tasks that finished are cleaned up.
+    """
+    results = {}
+    timings = {}
+    pending = dict(tasks)
+    running = {}
+
+    def timed(name, function, *args):
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            timings[name] = time.time() - start
+
+    error = None
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while True:
+            if error is None:
+                for name, (function, depends) in list(pending.items()):
+                    if all(dep in results for dep in depends):
+                        del pending[name]
+                        args = [results[dep] for dep in depends]
+                        future = executor.submit(timed, name, function,
+                                                 *args)
+                        running[future] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+
+    if error is not None:
+        for name, clean in (cleanup or {}).items():
+            if name in results:
+                try:
+                    clean(results[name])
+                except Exception as e:
+                    log.warning("Could not clean up {}: {}".format(name, e))
+        raise error
+    if pending:
+        raise ValueError("Cannot resolve dependencies of: {}".format(
+            ", ".join(sorted(pending))))
+
+    return results, timings
+
+
+def make_preflight_tasks(args, server, source):
+    """
+    Build the pre-flight steps of a release for :func:`run_task_graph`:
+
+    * build: create the build object, which looks up the user's email
+    * exists: check the module exists on the server, once for the tasks that
+      follow
+    * refs: list the module's releases on the server, without a clone
+    * clone: clone the module, to tag it and pass it to the build. Remove it
+      with :func:`remove_temp_clone` if the release does not go ahead
+    * version: work out the version to release and the commit to tag
+    * server_epics: read the EPICS version from the configure/RELEASE file
+      on the server (ioc and support modules only)
+    * epics: the EPICS version read from the server, or from the clone if
+      the server could not serve the file
+
+    Args:
+        args(:class:`argparse.Namespace`): Parser arguments
+        server(:class:`~dls_ade.gitserver.GitServer`): Git server instance
+        source(str): Server repository path of the module
+
+    Returns:
+        dict: Pre-flight tasks
+    """
+
+    def check_exists():
+        if not server.is_server_repo(source):
+            raise ValueError("Repository does not contain " + source)
+
+    def release_ref(version_info):
+        version, commit_to_tag = version_info
+        # A new tag is only pushed later, so read the commit it will be on
+        return commit_to_tag or version
+
+    def read_epics_version(version_info):
+        ref = release_ref(version_info)
+        if ref == "HEAD" and args.branch:
+            ref = args.branch
+        try:
+            return get_release_epics_version(server, source, ref), None
+        except Exception as e:
+            # e.g. 'git archive --remote' will not serve an arbitrary commit
+            log.warning("Could not read configure/RELEASE of {} at {} from "
+                        "the server: {}".format(source, ref, e))
+            return None, e
+
+    def check_epics_version(server_read, version_info, vcs):
+        module_epics, error = server_read
+        if error is None:
+            return module_epics
+        ref = release_ref(version_info)
+        if ref == "HEAD" and args.branch:
+            ref = "origin/" + args.branch
+        try:
+            conf_release = vcs.repo.git.show(ref + ":configure/RELEASE")
+        except git.GitCommandError:
+            raise ValueError("Could not read configure/RELEASE at {}: "
+                             "{}".format(ref, error))
+        return parse_epics_version(conf_release)
+
+    tasks = {
+        "build": (lambda: create_build_object(args), []),
+        "exists": (check_exists, []),
+        "refs": (lambda _: server.list_remote_refs(source,
+                                                   check_exists=False),
+                 ["exists"]),
+        # The module's files are read from the server, so keep the checkout
+        # (e.g. of a branch) down to configure/RELEASE
+        "clone": (lambda _: server.temp_clone(
+            source, profile=SPARSE_CLONE, paths=["/configure/RELEASE"],
+            check_exists=False), ["exists"]),
+        "version": (lambda refs: determine_version_to_release(
+            args.release, args.area, args.next_version, list(refs["tags"]),
+            args.commit), ["refs"]),
+    }
+    if args.area in ["ioc", "support"]:
+        tasks["server_epics"] = (read_epics_version, ["version"])
+        # The clone is needed for the release anyway, so waiting for it
+        # here costs nothing
+        tasks["epics"] = (check_epics_version,
+                          ["server_epics", "version", "clone"])
+
+    return tasks
+
+
+def remove_temp_clone(vcs):
+    """
+    Remove the temporary clone of a module made by a pre-flight task.
+
+    Args:
+        vcs(:class:`~dls_ade.vcs_git.Git`): Git instance of the clone
+    """
+    shutil.rmtree(vcs.repo.working_tree_dir, ignore_errors=True)
+
+
+def format_timings(timings):
+    """
+    Format the time taken by each pre-flight step, slowest first.
+
+    Args:
+        timings(dict): Task name to seconds taken
+
+    Returns:
+        str: Timing summary
+    """
+    steps = sorted(timings.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join("{} {:.1f}s".format(name, seconds)
+                     for name, seconds in steps)
+
+
 def _main():
 
     parser = make_parser()
@@ -513,29 +756,42 @@ def _main():
     check_parsed_arguments_valid(args, parser)
     module = args.module_name
 
-    build = create_build_object(args)
-
     # python3ext releases don't have any source code
     if args.area == "python3ext":
+        build = create_build_object(args)
         vcs = None
         version = args.release
+        module_epics = None
     else:
         server = Server()
         source = server.dev_module_path(module, args.area)
-        vcs = server.temp_clone(source)
+
+        if args.release is None:
+            usermsg.info("No release specified; able to test "
+                         "build at {} only.".format(args.commit))
+
+        start = time.time()
+        try:
+            results, timings = run_task_graph(
+                make_preflight_tasks(args, server, source),
+                cleanup={"clone": remove_temp_clone})
+        except (VCSGitError, ValueError) as err:
+            log.exception(err)
+            usermsg.error("Aborting: {msg}".format(msg=err))
+            sys.exit(1)
+        log.info(json.dumps({'preflight_timings': timings}))
+        usermsg.info("Pre-flight checks took {:.1f}s ({})".format(
+            time.time() - start, format_timings(timings)))
+
+        build = results["build"]
+        vcs = results["clone"]
+        version, commit_to_tag = results["version"]
+        module_epics = results.get("epics")
 
         try:
-            release = args.release
-            if release is None:
-                usermsg.info("No release specified; able to test "
-                             "build at {} only.".format(args.commit))
             if args.branch:
                 vcs.set_branch(args.branch)
 
-            releases = vcs.list_releases()
-            version, commit_to_tag = determine_version_to_release(
-                release, args.area, args.next_version, releases, args.commit
-            )
             if commit_to_tag is not None:  # Make Release if repo required
                 usermsg.info("Making tag {} at {}".format(version, commit_to_tag))
                 vcs.create_new_tag_and_push(version, commit_to_tag, args.message)
@@ -545,14 +801,12 @@ def _main():
             usermsg.error("Aborting: {msg}".format(msg=err))
             sys.exit(1)
 
-    if args.area in ["ioc", "support"]:
-        module_epics = get_module_epics_version(vcs)
-        if module_epics:
-            sure = check_epics_version_consistent(
-                module_epics, args.epics_version, build.epics())
-            if not sure:
-                usermsg.info("Cancelling: EPICS version not consistent")
-                sys.exit(0)
+    if module_epics:
+        sure = check_epics_version_consistent(
+            module_epics, args.epics_version, build.epics())
+        if not sure:
+            usermsg.info("Cancelling: EPICS version not consistent")
+            sys.exit(0)
 
     if not args.skip_test:
         test_build_message, test_build_fail = perform_test_build(
@@ -0,0 +1,324 @@
+#!/bin/env dls-python
+
+"""
+Release a set of modules listed in a manifest with a single command.
+Every release is checked before anything is submitted: the module must exist
+on the server and the release must already be tagged. The checks run in
+parallel, sharing one server connection and one build object (and so one LDAP
+lookup). Only once every release is valid are the build request files written
+to the build server queue, all together.
+"""
+
+import sys
+import csv
+import copy
+import json
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dls_ade import Server
+from dls_ade import dlsbuild
+from dls_ade import logconfig
+from dls_ade import dls_release
+from dls_ade.argument_parser import ArgParser
+from dls_ade.exceptions import VCSGitError
+from dls_ade.vcs_git import Git
+
+usage = """Default <area> is 'support'.
+ Release every module listed in <manifest> from the server.
+ The manifest is a CSV file with one release per line, in the format:
+   module,area,version
+ where area may be left empty to use the default area. Blank lines, lines
+ starting with '#' and a header line starting with 'Module' are ignored.
+ Each version must already be tagged on the server. Nothing is submitted to
+ the build server unless every release in the manifest is valid. There is no
+ local test build.
+"""
+
+log = logging.getLogger(name="dls_ade")
+usermsg = logging.getLogger(name="usermessages")
+
+# Number of releases checked at once
+BATCH_JOBS = 8
+
+ReleaseEntry = namedtuple("ReleaseEntry", ["module", "area", "version"])
+
+
+def make_parser():
+    """
+    Takes ArgParse instance with default arguments and adds
+
+    Positional Arguments:
+        * manifest
+
+    Flags:
+        * -f (force)
+        * -e (epics_version)
+        * -T (test_build_only)
+        * -j (jobs)
+        * -r (rhel_version) or --w (windows arguments)
+
+    Returns:
+        :class:`argparse.ArgumentParser`: ArgParse instance
+
+    """
+    parser = ArgParser(usage)
+
+    parser.add_argument(
+        "manifest", type=str,
+        help="CSV file listing the module, area and version of each release")
+    parser.add_epics_version_flag(
+        help_msg="Change the EPICS version. This will determine which build "
+                 "server the jobs are built on for EPICS modules. Default is "
+                 "from your environment")
+
+    parser.add_argument(
+        "-f", "--force", action="store_true", dest="force", default=None,
+        help="Force the releases. Releases that exist in prod are removed "
+             "and built again. To be used with caution.")
+    parser.add_argument(
+        "-T", "--test_build-only", action="store_true", dest="test_only",
+        help="If set, this will only do test builds on the build server.")
+    parser.add_argument(
+        "-j", "--jobs", action="store", type=int, dest="jobs",
+        default=BATCH_JOBS,
+        help="Number of releases to check at once, default is {}".format(
+            BATCH_JOBS))
+
+    title = "Build operating system arguments"
+    desc = "Note: The following arguments are mutually exclusive - only use " \
+           "one"
+
+    desc_group = parser.add_argument_group(title=title, description=desc)
+    group = desc_group.add_mutually_exclusive_group()
+
+    group.add_argument(
+        "-r", "--rhel_version", action="store", type=str,
+        dest="rhel_version",
+        help="change the rhel version of the builds. Can be 6 or 7")
+    group.add_argument(
+        "-w", "--windows", action="store", dest="windows", type=str,
+        help="Release the modules only for this Windows version, see "
+             "dls-release.py")
+
+    return parser
+
+
+def read_manifest(manifest, default_area="support"):
+    """
+    Read the releases listed in a manifest file.
+
+    Args:
+        manifest(str): Path of the CSV manifest
+        default_area(str): Area of releases that do not give one
+
+    Returns:
+        list[:class:`ReleaseEntry`]: Releases in the order listed
+
+    Raises:
+        ValueError: If a line is not a valid release, an area is not released
+            from git or a module is listed twice
+    """
+    releases = []
+    with open(manifest, "r") as f:
+        for line_number, row in enumerate(csv.reader(f), 1):
+            row = [field.strip() for field in row]
+            if not any(row) or row[0].startswith("#") or row[0] == "Module":
+                continue
+
+            if len(row) != 3 or not row[0] or not row[2]:
+                raise ValueError(
+                    "{}:{}: expected 'module,area,version', got '{}'".format(
+                        manifest, line_number, ",".join(row)))
+
+            module, area, version = row
+            area = area or default_area
+            if area not in dls_release.GIT_SUPPORTED_AREAS:
+                raise ValueError("{}:{}: {} area not valid".format(
+                    manifest, line_number, area))
+            if any(entry.module == module and entry.area == area
+                   for entry in releases):
+                raise ValueError("{}:{}: {} is listed twice".format(
+                    manifest, line_number, module))
+
+            releases.append(ReleaseEntry(module, area, version))
+
+    if not releases:
+        raise ValueError("No releases listed in {}".format(manifest))
+
+    return releases
+
+
+def create_build_objects(args, areas):
+    """
+    Create the build object for each area, looking up the user's details only
+    once.
+
+    Args:
+        args(:class:`argparse.Namespace`): Parser arguments
+        areas(list[str]): Areas being released
+
+    Returns:
+        dict: Area to :class:`~dls_ade.dlsbuild.Builder`
+    """
+    first_args = copy.copy(args)
+    first_args.area = areas[0]
+    build = dls_release.create_build_object(first_args)
+
+    builds = {areas[0]: build}
+    for area in areas[1:]:
+        builds[area] = copy.copy(build)
+        builds[area].set_area(area)
+    return builds
+
+
+def check_release(server, entry):
+    """
+    Check that a release can be submitted.
+
+    Args:
+        server(:class:`~dls_ade.gitserver.GitServer`): Git server instance
+        entry(:class:`ReleaseEntry`): Release to check
+
+    Returns:
+        str: Epics version in the release's configure/RELEASE, or None if the
+            module is not an EPICS module
+
+    Raises:
+        ValueError: If the module or the release does not exist
+    """
+    source = server.dev_module_path(entry.module, entry.area)
+    refs = server.list_remote_refs(source)
+    if entry.version not in refs["tags"]:
+        raise ValueError("Release {} not found".format(entry.version))
+
+    if entry.area in ["ioc", "support"]:
+        return dls_release.get_release_epics_version(server, source,
+                                                     entry.version)
+    return None
+
+
+def check_releases(server, releases, jobs=BATCH_JOBS):
+    """
+    Check every release in parallel.
+
+    Args:
+        server(:class:`~dls_ade.gitserver.GitServer`): Git server instance
+        releases(list[:class:`ReleaseEntry`]): Releases to check
+        jobs(int): Maximum number of releases checked at once
+
+    Returns:
+        list[tuple]: For each release in order, the epics version from
+            :func:`check_release` and an error message, one of which is None
+    """
+
+    def check(entry):
+        try:
+            return check_release(server, entry), None
+        except (VCSGitError, ValueError, IOError) as e:
+            log.exception(e)
+            return None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return list(executor.map(check, releases))
+
+
+def confirm_epics_versions(releases, module_epics_versions, builds,
+                           option_epics):
+    """
+    Ask the user to confirm each release whose module was last built against
+    a different EPICS version, see
+    :func:`~dls_ade.dls_release.check_epics_version_consistent`.
+
+    Args:
+        releases(list[:class:`ReleaseEntry`]): Releases to check
+        module_epics_versions(list[str]): Epics version of each release, as
+            returned by :func:`check_releases`
+        builds(dict): Area to build object
+        option_epics(str): Epics version given with the -e flag, if any
+
+    Returns:
+        bool: True if every release can continue, False if not
+    """
+    for entry, module_epics in zip(releases, module_epics_versions):
+        if not module_epics:
+            continue
+        build_epics = builds[entry.area].epics()
+        if dls_release.is_epics_version_mismatch(module_epics, option_epics,
+                                                 build_epics):
+            # Say which release the question is about
+            usermsg.info("{} {} ({}):".format(entry.module, entry.version,
+                                              entry.area))
+            if not dls_release.check_epics_version_consistent(
+                    module_epics, option_epics, build_epics):
+                return False
+    return True
+
+
+def _main():
+
+    parser = make_parser()
+    args = parser.parse_args()
+
+    log.info(json.dumps({'CLI': sys.argv, 'options_args': vars(args)}))
+
+    try:
+        releases = read_manifest(args.manifest, args.area)
+    except (IOError, ValueError) as err:
+        usermsg.error("Aborting: {msg}".format(msg=err))
+        sys.exit(1)
+
+    areas = []
+    for entry in releases:
+        if entry.area not in areas:
+            areas.append(entry.area)
+    builds = create_build_objects(args, areas)
+
+    server = Server()
+    usermsg.info("Checking {} releases".format(len(releases)))
+    results = check_releases(server, releases, args.jobs)
+
+    failed = 0
+    for entry, (module_epics, error) in zip(releases, results):
+        if error is not None:
+            failed += 1
+            usermsg.error("{} {} ({}): {}".format(
+                entry.module, entry.version, entry.area, error))
+
+    if failed:
+        usermsg.error("Aborting: {} of {} releases are not valid; nothing "
+                      "has been submitted".format(failed, len(releases)))
+        sys.exit(1)
+
+    module_epics_versions = [module_epics for module_epics, _ in results]
+    if not confirm_epics_versions(releases, module_epics_versions, builds,
+                                  args.epics_version):
+        usermsg.info("Cancelling: EPICS version not consistent")
+        sys.exit(0)
+
+    submissions = [(builds[entry.area], entry.module, entry.version,
+                    Git(entry.module, entry.area, server))
+                   for entry in releases]
+    dlsbuild.submit_batch(submissions, test=args.test_only)
+
+    msg_build_job = "test-release" if args.test_only else "Release"
+    usermsg.info("{} {} jobs submitted to build server queue".format(
+        len(submissions), msg_build_job))
+
+
+def main():
+    # Catch unhandled exceptions and ensure they're logged
+    try:
+        logconfig.setup_logging(application='dls-release-batch.py')
+        _main()
+    except Exception as e:
+        logging.exception(e)
+        logging.getLogger("usermessages").exception(
+            "ABORT: Unhandled exception (see trace below): {}".format(e)
+        )
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch, MagicMock
+
+from dls_ade import dls_release_batch
+from dls_ade import dlsbuild
+from dls_ade.dls_release_batch import ReleaseEntry
+from dls_ade.release_log import ReleaseLog, ReleaseLogEntry
+
+
+class ReadManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manifest = os.path.join(self.tmp_dir, "manifest.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, contents):
+        with open(self.manifest, "w") as f:
+            f.write(contents)
+
+    def test_given_manifest_then_releases_returned_in_order(self):
+        self._write("Module,Area,Version\n"
+                    "# base modules first\n"
+                    "asyn,,4-34\n"
+                    "\n"
+                    "BL01I/BL01I-EA-IOC-01, ioc, 1-2\n")
+
+        releases = dls_release_batch.read_manifest(self.manifest)
+
+        self.assertEqual(releases, [
+            ReleaseEntry("asyn", "support", "4-34"),
+            ReleaseEntry("BL01I/BL01I-EA-IOC-01", "ioc", "1-2")])
+
+    def test_given_line_without_version_then_error_raised(self):
+        self._write("asyn,support\n")
+
+        with self.assertRaises(ValueError):
+            dls_release_batch.read_manifest(self.manifest)
+
+    def test_given_area_not_released_from_git_then_error_raised(self):
+        self._write("numpy,python3ext,1-0\n")
+
+        with self.assertRaises(ValueError):
+            dls_release_batch.read_manifest(self.manifest)
+
+    def test_given_module_listed_twice_then_error_raised(self):
+        self._write("asyn,support,4-34\nasyn,,4-35\n")
+
+        with self.assertRaises(ValueError):
+            dls_release_batch.read_manifest(self.manifest)
+
+    def test_given_no_releases_then_error_raised(self):
+        self._write("Module,Area,Version\n")
+
+        with self.assertRaises(ValueError):
+            dls_release_batch.read_manifest(self.manifest)
+
+
+class CreateBuildObjectsTest(unittest.TestCase):
+
+    @patch('dls_ade.dls_release_batch.dls_release.create_build_object')
+    def test_given_areas_then_one_build_object_created(self, mock_create):
+        args = MagicMock(area="support")
+
+        builds = dls_release_batch.create_build_objects(args,
+                                                        ["support", "ioc"])
+
+        mock_create.assert_called_once()
+        self.assertEqual(mock_create.call_args[0][0].area, "support")
+        self.assertEqual(set(builds), {"support", "ioc"})
+        builds["ioc"].set_area.assert_called_once_with("ioc")
+
+
+class CheckReleasesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MagicMock()
+        self.server.dev_module_path.side_effect = \
+            lambda module, area: "controls/{}/{}".format(area, module)
+        self.server.list_remote_refs.return_value = {
+            "HEAD": "1" * 40, "branches": {}, "tags": {"4-34": "1" * 40}}
+        self.server.read_file.return_value = \
+            "EPICS_BASE=/dls_sw/epics/R3.14.12.7/base\n"
+
+    def test_given_releases_then_epics_versions_and_errors_returned(self):
+        releases = [ReleaseEntry("asyn", "support", "4-34"),
+                    ReleaseEntry("asyn", "support", "4-35"),
+                    ReleaseEntry("dls_pmaclib", "python", "4-34")]
+
+        results = dls_release_batch.check_releases(self.server, releases)
+
+        self.assertEqual(results, [("R3.14.12.7", None),
+                                   (None, "Release 4-35 not found"),
+                                   (None, None)])
+        self.server.read_file.assert_called_once_with(
+            "controls/support/asyn", "4-34", "configure/RELEASE")
+
+    def test_given_missing_module_then_error_returned(self):
+        self.server.list_remote_refs.side_effect = ValueError(
+            "Repository does not contain controls/support/nothing")
+
+        results = dls_release_batch.check_releases(
+            self.server, [ReleaseEntry("nothing", "support", "1-0")])
+
+        self.assertEqual(results[0][1],
+                         "Repository does not contain controls/support/nothing")
+
+
+class ConfirmEpicsVersionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.releases = [ReleaseEntry("asyn", "support", "4-34"),
+                         ReleaseEntry("motor", "support", "6-9")]
+        build = MagicMock()
+        build.epics.return_value = "R3.14.12.7_64"
+        self.builds = {"support": build}
+
+    @patch('dls_ade.dls_release.input', return_value="y")
+    def test_given_mismatch_and_user_agrees_then_true(self, mock_input):
+        sure = dls_release_batch.confirm_epics_versions(
+            self.releases, ["R3.14.12.7", "R3.14.12.3"], self.builds, None)
+
+        self.assertTrue(sure)
+        mock_input.assert_called_once()
+        self.assertIn("r3.14.12.3", mock_input.call_args[0][0])
+
+    @patch('dls_ade.dls_release.input', return_value="n")
+    def test_given_mismatch_and_user_declines_then_false(self, mock_input):
+        sure = dls_release_batch.confirm_epics_versions(
+            self.releases, ["R3.14.12.3", "R3.14.12.3"], self.builds, None)
+
+        self.assertFalse(sure)
+        mock_input.assert_called_once()
+
+    @patch('dls_ade.dls_release.input')
+    def test_given_epics_option_then_user_not_asked(self, mock_input):
+        sure = dls_release_batch.confirm_epics_versions(
+            self.releases, ["R3.14.12.3", None], self.builds, "R3.14.12.7")
+
+        self.assertTrue(sure)
+        mock_input.assert_not_called()
+
+
+class SubmitBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.queue = os.path.join(self.tmp_dir, "queue")
+        os.mkdir(self.queue)
+        self.release_log = os.path.join(self.tmp_dir, "release-log")
+        for name, value in [("queue_dir", self.queue),
+                            ("release_log_file", self.release_log)]:
+            patcher = patch('dls_ade.dlsbuild.' + name, return_value=value)
+            self.addCleanup(patcher.stop)
+            patcher.start()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def _builder(filename):
+        builder = MagicMock()
+        builder.build_request.return_value = (filename, "script", {})
+        builder.release_log_entry.return_value = ReleaseLogEntry(
+            "/dls_sw/prod", "a", "1-0", filename, "redhat7-x86_64")
+        return builder
+
+    def test_given_submissions_then_all_files_queued_and_logged(self):
+        submissions = [
+            (self._builder("build_a.redhat7-x86_64"), "a", "1-0", None),
+            (self._builder("build_b.redhat7-x86_64"), "b", "2-0", None)]
+
+        filenames = dlsbuild.submit_batch(submissions, test=True)
+
+        self.assertEqual(filenames, ["build_a.redhat7-x86_64",
+                                     "build_b.redhat7-x86_64"])
+        self.assertEqual(sorted(os.listdir(self.queue)), filenames)
+        submissions[0][0].build_request.assert_called_once_with(
+            "a", "1-0", None, True)
+        self.assertEqual(
+            [entry.build_name
+             for entry in ReleaseLog(self.release_log).find("a")],
+            ["build_a.redhat7-x86_64", "build_b.redhat7-x86_64"])
+
+    def test_given_failing_submission_then_nothing_queued(self):
+        failing = MagicMock()
+        failing.build_request.side_effect = KeyError("epics")
+        submissions = [
+            (self._builder("build_a.redhat7-x86_64"), "a", "1-0", None),
+            (failing, "b", "2-0", None)]
+
+        with self.assertRaises(KeyError):
+            dlsbuild.submit_batch(submissions)
+
+        self.assertEqual(os.listdir(self.queue), [])
+        self.assertFalse(os.path.exists(self.release_log))
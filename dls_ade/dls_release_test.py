@@ -1,7 +1,11 @@
 #!/bin/env dls-python
 
 import mock
+import threading
 import unittest
+
+import git
+
 from dls_ade import dls_release
 
 from mock import patch, ANY, MagicMock
@@ -627,6 +631,14 @@ class TestConstructInfoMessage(unittest.TestCase):
 
 class TestCheckEpicsVersion(unittest.TestCase):
 
+    def test_given_epics_versions_then_mismatch_found(self):
+        self.assertTrue(dls_release.is_epics_version_mismatch(
+            "R3.14.12.3", None, "R3.14.12.7_64"))
+        self.assertFalse(dls_release.is_epics_version_mismatch(
+            "R3.14.12.7", None, "R3.14.12.7_64"))
+        self.assertFalse(dls_release.is_epics_version_mismatch(
+            "R3.14.12.3", "R3.14.12.7", "R3.14.12.7_64"))
+
     def test_given_epics_option_then_return_true(self):
 
         e_module = 'some_epics_version'
@@ -694,6 +706,194 @@ class TestGetModuleEpicsVersion(unittest.TestCase):
         self.assertFalse(len(module_epics))
 
 
+class TestGetReleaseEpicsVersion(unittest.TestCase):
+
+    def test_given_release_file_on_server_then_return_epics_version(self):
+        server = MagicMock()
+        server.read_file.return_value = \
+            'EPICS_BASE=/dls_sw/epics/R3.14.12.7/base\n'
+
+        module_epics = dls_release.get_release_epics_version(
+            server, "controls/support/dummy", "1-0")
+
+        server.read_file.assert_called_once_with(
+            "controls/support/dummy", "1-0", "configure/RELEASE")
+        self.assertEqual(module_epics, 'R3.14.12.7')
+
+    def test_given_no_release_file_then_return_empty_list(self):
+        server = MagicMock()
+        server.read_file.return_value = None
+
+        module_epics = dls_release.get_release_epics_version(
+            server, "controls/support/dummy", "1-0")
+
+        self.assertFalse(len(module_epics))
+
+
+class RunTaskGraphTest(unittest.TestCase):
+
+    def test_given_dependencies_then_results_passed_on(self):
+        tasks = {
+            "a": (lambda: 1, []),
+            "b": (lambda: 2, []),
+            "sum": (lambda a, b: a + b, ["a", "b"]),
+        }
+
+        results, timings = dls_release.run_task_graph(tasks)
+
+        self.assertEqual(results, {"a": 1, "b": 2, "sum": 3})
+        self.assertEqual(set(timings), {"a", "b", "sum"})
+
+    def test_given_independent_tasks_then_run_concurrently(self):
+        started = threading.Event()
+
+        def first():
+            # Only finishes if the second task runs at the same time
+            return started.wait(5)
+
+        tasks = {"first": (first, []), "second": (started.set, [])}
+
+        results, _ = dls_release.run_task_graph(tasks)
+
+        self.assertTrue(results["first"])
+
+    def test_given_task_fails_then_error_raised_and_dependents_not_run(self):
+        dependent = MagicMock()
+
+        def fail():
+            raise ValueError("Release 1-0 not found")
+
+        tasks = {"fail": (fail, []), "dependent": (dependent, ["fail"])}
+
+        with self.assertRaises(ValueError):
+            dls_release.run_task_graph(tasks)
+        self.assertFalse(dependent.call_count)
+
+    def test_given_task_fails_then_finished_results_cleaned_up(self):
+        clean = MagicMock()
+        finished = threading.Event()
+
+        def clone():
+            finished.set()
+            return "clone"
+
+        def fail():
+            # Fail once the other task has its result
+            finished.wait(5)
+            raise ValueError("Release 1-0 not found")
+
+        tasks = {"clone": (clone, []), "fail": (fail, [])}
+
+        with self.assertRaises(ValueError):
+            dls_release.run_task_graph(tasks, cleanup={"clone": clean,
+                                                       "fail": clean})
+        clean.assert_called_once_with("clone")
+
+    def test_given_unknown_dependency_then_error_raised(self):
+        tasks = {"a": (lambda b: b, ["b"])}
+
+        with self.assertRaises(ValueError):
+            dls_release.run_task_graph(tasks)
+
+
+class MakePreflightTasksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MagicMock()
+        self.server.list_remote_refs.return_value = {
+            "HEAD": "1" * 40, "branches": {}, "tags": {"1-0": "1" * 40}}
+        self.server.read_file.return_value = \
+            "EPICS_BASE=/dls_sw/epics/R3.14.12.7/base\n"
+
+    @patch('dls_ade.dls_release.create_build_object')
+    def test_given_release_then_epics_read_at_release(self, mock_build):
+        options = FakeOptions(release="1-0")
+
+        tasks = dls_release.make_preflight_tasks(options, self.server,
+                                                 "controls/support/dummy")
+        results, _ = dls_release.run_task_graph(tasks)
+
+        self.assertEqual(results["version"], ("1-0", None))
+        self.assertEqual(results["epics"], "R3.14.12.7")
+        self.assertEqual(results["clone"],
+                         self.server.temp_clone.return_value)
+        self.assertEqual(results["build"], mock_build.return_value)
+        self.server.read_file.assert_called_once_with(
+            "controls/support/dummy", "1-0", "configure/RELEASE")
+        # The module is only looked up on the server once
+        self.server.is_server_repo.assert_called_once_with(
+            "controls/support/dummy")
+        self.assertFalse(
+            self.server.list_remote_refs.call_args[1]["check_exists"])
+        self.assertFalse(self.server.temp_clone.call_args[1]["check_exists"])
+
+    @patch('dls_ade.dls_release.create_build_object')
+    def test_given_next_version_on_branch_then_epics_read_at_branch(self, _):
+        options = FakeOptions(next_version=True, branch="feature")
+
+        tasks = dls_release.make_preflight_tasks(options, self.server,
+                                                 "controls/support/dummy")
+        results, _ = dls_release.run_task_graph(tasks)
+
+        self.assertEqual(results["version"], ("1-1", "HEAD"))
+        self.server.read_file.assert_called_once_with(
+            "controls/support/dummy", "feature", "configure/RELEASE")
+
+    @patch('dls_ade.dls_release.create_build_object')
+    def test_given_missing_module_then_nothing_cloned(self, _):
+        self.server.is_server_repo.return_value = False
+        options = FakeOptions(release="1-0")
+
+        tasks = dls_release.make_preflight_tasks(options, self.server,
+                                                 "controls/support/dummy")
+
+        with self.assertRaises(ValueError):
+            dls_release.run_task_graph(tasks)
+        self.assertFalse(self.server.temp_clone.call_count)
+
+    @patch('dls_ade.dls_release.create_build_object')
+    def test_given_server_cannot_read_commit_then_epics_read_from_clone(self,
+                                                                       _):
+        self.server.read_file.side_effect = git.GitCommandError(
+            "archive", 128, b"fatal: no such ref: " + b"3" * 40)
+        clone = self.server.temp_clone.return_value
+        clone.repo.git.show.return_value = \
+            "EPICS_BASE=/dls_sw/epics/R3.14.12.3/base\n"
+        options = FakeOptions(release="1-1", commit="3" * 40)
+
+        tasks = dls_release.make_preflight_tasks(options, self.server,
+                                                 "controls/support/dummy")
+        results, _ = dls_release.run_task_graph(tasks)
+
+        self.assertEqual(results["epics"], "R3.14.12.3")
+        clone.repo.git.show.assert_called_once_with(
+            "3" * 40 + ":configure/RELEASE")
+
+    @patch('dls_ade.dls_release.create_build_object')
+    def test_given_release_file_cannot_be_read_then_error_raised(self, _):
+        self.server.read_file.side_effect = git.GitCommandError(
+            "archive", 128)
+        clone = self.server.temp_clone.return_value
+        clone.repo.git.show.side_effect = git.GitCommandError("show", 128)
+        options = FakeOptions(next_version=True, branch="feature")
+
+        tasks = dls_release.make_preflight_tasks(options, self.server,
+                                                 "controls/support/dummy")
+
+        with self.assertRaises(ValueError):
+            dls_release.run_task_graph(tasks)
+        clone.repo.git.show.assert_called_once_with(
+            "origin/feature:configure/RELEASE")
+
+    def test_given_python_area_then_no_epics_task(self):
+        options = FakeOptions(area="python", release="1-0")
+
+        tasks = dls_release.make_preflight_tasks(options, self.server,
+                                                 "controls/python/dummy")
+
+        self.assertNotIn("epics", tasks)
+
+
 class TestPerformTestBuild(unittest.TestCase):
 
     def setUp(self):
@@ -907,6 +1107,8 @@ class FakeOptions(object):
         self.next_version = kwargs.get('next_version', None)
         self.skip_test = kwargs.get('skip_test', False)
         self.local_build = kwargs.get('local_build', False)
+        self.release = kwargs.get('release', None)
+        self.commit = kwargs.get('commit', None)
 
 
 class FakeVcs(object):
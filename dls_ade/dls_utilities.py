@@ -1,18 +1,35 @@
-import ldap
+import json
 import logging
 import os
 import re
+import tempfile
+import threading
+import time
 
-from packaging import version
-
-from dls_ade.constants import LDAP_SERVER_URL
+from dls_ade import lazy_import
+from dls_ade.constants import LDAP_SERVER_URL, ADE_CACHE_DIR, \
+    FED_ID_CACHE_TTL
 from dls_ade.exceptions import FedIdError, ParsingError
 
+ldap = lazy_import("ldap")
+ldap_filter = lazy_import("ldap.filter")
+version = lazy_import("packaging.version")
+
 
 
 GIT_ROOT_DIR = os.getenv('GIT_ROOT_DIR', "controls")
 log = logging.getLogger(__name__)
 
+LDAP_BASE_DN = "dc=fed,dc=cclrc,dc=ac,dc=uk"
+LDAP_ATTRIBUTES = ["cn", "givenName", "sn", "mail"]
+# FED-IDs looked up in one OR-filter search
+LDAP_BATCH_SIZE = 100
+FED_ID_CACHE_FILE = os.path.join(ADE_CACHE_DIR, "fed_ids.json")
+
+# Connection shared by every lookup in this process, see _ldap_search
+_ldap_connection = None
+_ldap_lock = threading.Lock()
+
 
 def remove_end_slash(path_string):
 
@@ -89,9 +106,165 @@ def check_tag_is_valid(tag, area=None):
     return True
 
 
+class FedIdCache(object):
+    """
+    Contact details of FED-IDs, kept in memory and optionally in a JSON file
+    so later invocations of the scripts can reuse them.
+
+    Args:
+        filename(str): File to store the cache in, or None to keep it in
+            memory only
+        ttl(int): Seconds for which an entry is used
+    """
+
+    def __init__(self, filename=None, ttl=FED_ID_CACHE_TTL):
+        self.filename = filename
+        self.ttl = ttl
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.filename is not None:
+                try:
+                    with open(self.filename, 'r') as f:
+                        self._entries = json.load(f)
+                except (IOError, OSError, ValueError) as e:
+                    log.debug("Ignoring FED-ID cache {}: {}".format(
+                        self.filename, e))
+        return self._entries
+
+    def _save(self):
+        if self.filename is None:
+            return
+        dirname = os.path.dirname(self.filename)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            # Write then rename so concurrent readers never see half a file
+            fd, tmp_name = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f)
+            os.rename(tmp_name, self.filename)
+        except (IOError, OSError) as e:
+            log.debug("Could not write FED-ID cache {}: {}".format(
+                self.filename, e))
+
+    def get(self, fed_id):
+        """
+        Return the cached contact details of `fed_id`.
+
+        Args:
+            fed_id(str): FED-ID to look for
+
+        Returns:
+            tuple(str, str): Contact name, email address, or None if `fed_id`
+                is not cached or its entry is older than the TTL
+        """
+        entry = self._load().get(fed_id)
+        if entry is None or time.time() - entry["time"] > self.ttl:
+            return None
+        return entry["name"], entry["mail"]
+
+    def update(self, contacts):
+        """
+        Store contact details.
+
+        Args:
+            contacts(dict): FED-ID to (contact name, email address)
+        """
+        if not contacts:
+            return
+        entries = self._load()
+        now = time.time()
+        for fed_id, (name, mail) in contacts.items():
+            entries[fed_id] = {"name": name, "mail": mail, "time": now}
+        self._save()
+
+
+fed_id_cache = FedIdCache(FED_ID_CACHE_FILE)
+
+
+def _ldap_search(search_filter):
+    # Connect and bind once per process; the lookup is retried on a fresh
+    # connection if the server has dropped the shared one.
+    global _ldap_connection
+
+    with _ldap_lock:
+        for attempt in range(2):
+            if _ldap_connection is None:
+                _ldap_connection = ldap.initialize(LDAP_SERVER_URL)
+                _ldap_connection.simple_bind_s()
+            try:
+                return _ldap_connection.search_s(
+                    LDAP_BASE_DN, ldap.SCOPE_SUBTREE, search_filter,
+                    LDAP_ATTRIBUTES)
+            except ldap.SERVER_DOWN:
+                _ldap_connection = None
+                if attempt:
+                    raise
+
+
+def lookup_contacts(fed_ids):
+    """
+    Find the details of many FED-IDs, with one LDAP search per batch of
+    FED-IDs that are not already cached.
+
+    Args:
+        fed_ids(list[str]): FED-IDs to search for
+
+    Returns:
+        dict: FED-ID to (contact name, email address) for every FED-ID found
+    """
+
+    contacts = {}
+    missing = []
+    for fed_id in set(fed_ids):
+        details = fed_id_cache.get(fed_id)
+        if details is None:
+            missing.append(fed_id)
+        else:
+            contacts[fed_id] = details
+
+    found = {}
+    for i in range(0, len(missing), LDAP_BATCH_SIZE):
+        batch = missing[i:i + LDAP_BATCH_SIZE]
+        search_filter = "(|{})".format("".join(
+            "(cn={})".format(ldap_filter.escape_filter_chars(fed_id))
+            for fed_id in batch))
+        log.debug("Performing search for %s", ", ".join(batch))
+        ldap_output = _ldap_search(search_filter)
+        log.debug(ldap_output)
+        # ldap_output has the form:
+        # [('CN=<FED-ID>,OU=DLS,DC=fed,DC=cclrc,DC=ac,DC=uk',
+        #   {'cn': ['<FED-ID>'], 'givenName': ['<FirstName>'],
+        #    'sn': ['<Surname>'], 'mail': ['<Email>']}),
+        #  (None, ['ldap://res02.fed.cclrc.ac.uk/...'])]
+        # where entries without a DN are referrals to other servers.
+
+        # LDAP matches cn case insensitively
+        requested = dict((fed_id.lower(), fed_id) for fed_id in batch)
+        for dn, info in ldap_output:
+            if dn is None:
+                continue
+            fed_id = requested.get(info['cn'][0].decode('utf-8').lower())
+            if fed_id is None:
+                continue
+            found[fed_id] = (
+                '{} {}'.format(info['givenName'][0].decode('utf-8'),
+                               info['sn'][0].decode('utf-8')),
+                info['mail'][0].decode('utf-8'))
+
+    fed_id_cache.update(found)
+    contacts.update(found)
+
+    return contacts
+
+
 def lookup_contact_details(fed_id):
     """
-    Perform an LDAP search to find details corresponding to a FED-ID.
+    Find the details corresponding to a FED-ID, from the cache or an LDAP
+    search.
 
     Args:
         fed_id(str): FED-ID to search for
@@ -103,36 +276,8 @@ def lookup_contact_details(fed_id):
 
     """
 
-    # Set up ldap search parameters
-    l = ldap.initialize(LDAP_SERVER_URL)
-    basedn = "dc=fed,dc=cclrc,dc=ac,dc=uk"
-    search_filter = "(&(cn={}))".format(fed_id)
-    search_attribute = ["givenName", "sn", "mail"]
-    search_scope = ldap.SCOPE_SUBTREE
-
-    # Perform search, print message so user knows where program hangs
-    # The lookup can hang at l.result() if the FED-ID does not exist.
-    log.debug("Performing search for {}".format(fed_id))
-    l.simple_bind_s()
-    ldap_result_id = l.search(basedn, search_scope, search_filter,
-                              search_attribute)
-    ldap_output = l.result(ldap_result_id, 0)
-    log.debug(ldap_output)
-    # ldap_output has the form:
-    # (100, [('CN=<FED-ID>,OU=DLS,DC=fed,DC=cclrc,DC=ac,DC=uk',
-    # {'givenName': ['<FirstName>'], 'sn': ['<Surname>']})])
-
-    if ldap_output[0] == 115:
-        # If the FED-ID does not exist, ldap_output will look like:
-        # (115, [(None,
-        # ['ldap://res02.fed.cclrc.ac.uk/DC=res02,DC=fed,DC=cclrc,DC=ac,DC=uk'])])
+    contacts = lookup_contacts([fed_id])
+    if fed_id not in contacts:
         raise FedIdError("\"{}\" is not a FedID in LDAP".format(fed_id))
 
-    # Extract contact name from output
-    name_info_dict = ldap_output[1][0][1]
-    first_name = name_info_dict['givenName'][0].decode('utf-8')
-    surname = name_info_dict['sn'][0].decode('utf-8')
-    email_address = name_info_dict['mail'][0].decode('utf-8')
-    # name_info_dict: {'givenName': ['<FirstName>'], 'sn': ['<Surname>']}
-
-    return '{} {}'.format(first_name, surname), email_address
+    return contacts[fed_id]
@@ -1,9 +1,13 @@
 from dls_ade import dls_utilities
+import os
+import shutil
+import tempfile
 import unittest
+from mock import patch
 
-from dls_ade.exceptions import ParsingError
+from dls_ade.exceptions import ParsingError, FedIdError
 
-from dls_ade.dls_utilities import check_tag_is_valid
+from dls_ade.dls_utilities import check_tag_is_valid, FedIdCache
 
 
 class TagFormatTest(unittest.TestCase):
@@ -81,3 +85,71 @@ class CheckTechnicalAreaValidTest(unittest.TestCase):
             dls_utilities.check_technical_area(area, module)
         except ParsingError as error:
             self.assertEqual(str(error), expected_error_msg)
+
+
+class LookupContactsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(patch.stopall)
+        patch('dls_ade.dls_utilities.fed_id_cache', FedIdCache()).start()
+        patch('dls_ade.dls_utilities._ldap_connection', None).start()
+        self.mock_initialize = patch(
+            'dls_ade.dls_utilities.ldap.initialize').start()
+        self.connection = self.mock_initialize.return_value
+        self.connection.search_s.return_value = [
+            ('CN=abc12345,OU=DLS,DC=fed,DC=cclrc,DC=ac,DC=uk',
+             {'cn': [b'abc12345'], 'givenName': [b'Ann'], 'sn': [b'Smith'],
+              'mail': [b'ann.smith@diamond.ac.uk']}),
+            ('CN=xyz67890,OU=DLS,DC=fed,DC=cclrc,DC=ac,DC=uk',
+             {'cn': [b'xyz67890'], 'givenName': [b'Bob'], 'sn': [b'Jones'],
+              'mail': [b'bob.jones@diamond.ac.uk']}),
+            (None, ['ldap://res02.fed.cclrc.ac.uk/DC=res02']),
+        ]
+
+    def test_given_fed_ids_then_found_in_one_search(self):
+        contacts = dls_utilities.lookup_contacts(
+            ["abc12345", "xyz67890", "unknown"])
+
+        self.assertEqual(contacts, {
+            "abc12345": ("Ann Smith", "ann.smith@diamond.ac.uk"),
+            "xyz67890": ("Bob Jones", "bob.jones@diamond.ac.uk")})
+        self.assertEqual(self.connection.search_s.call_count, 1)
+        search_filter = self.connection.search_s.call_args[0][2]
+        self.assertTrue(search_filter.startswith("(|"))
+        for fed_id in ["abc12345", "xyz67890", "unknown"]:
+            self.assertIn("(cn={})".format(fed_id), search_filter)
+
+    def test_given_repeated_lookups_then_one_connection_and_search(self):
+        dls_utilities.lookup_contact_details("abc12345")
+        details = dls_utilities.lookup_contact_details("abc12345")
+
+        self.assertEqual(details, ("Ann Smith", "ann.smith@diamond.ac.uk"))
+        self.assertEqual(self.mock_initialize.call_count, 1)
+        self.assertEqual(self.connection.search_s.call_count, 1)
+
+    def test_given_unknown_fed_id_then_error_raised(self):
+        with self.assertRaises(FedIdError):
+            dls_utilities.lookup_contact_details("unknown")
+
+
+class FedIdCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.cache_dir, "fed_ids.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_given_saved_entry_then_read_by_new_instance(self):
+        FedIdCache(self.filename).update(
+            {"abc12345": ("Ann Smith", "ann.smith@diamond.ac.uk")})
+
+        self.assertEqual(FedIdCache(self.filename).get("abc12345"),
+                         ("Ann Smith", "ann.smith@diamond.ac.uk"))
+
+    def test_given_expired_entry_then_none(self):
+        cache = FedIdCache(self.filename, ttl=-1)
+        cache.update({"abc12345": ("Ann Smith", "ann.smith@diamond.ac.uk")})
+
+        self.assertIsNone(cache.get("abc12345"))
@@ -6,12 +6,13 @@ import subprocess
 import tempfile
 import stat
 import shutil
-import ldap
 import logging
+from functools import lru_cache
 
 from dls_ade.constants import BUILD_SERVERS, SERVER_SHORTCUT, DLSBUILD_ROOT_DIR, DLSBUILD_WIN_ROOT_DIR, LDAP_SERVER_URL, SYSLOG_SERVER, SYSLOG_SERVER_PORT
 from dls_ade.dls_environment import environment
 from dls_ade.dls_utilities import lookup_contact_details
+from dls_ade.release_log import RELEASE_LOG_FILE, ReleaseLog, ReleaseLogEntry
 
 # Optional but useful in a library or non-main module:
 logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -20,8 +21,18 @@ usermsg = logging.getLogger("usermessages")
 
 build_scripts = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), "dlsbuild_scripts")
-os_list = set(os.listdir(build_scripts))
-os_list -= set([".svn"])
+
+
+@lru_cache(maxsize=None)
+def supported_os_list():
+    """Return the set of operating systems there are build scripts for"""
+    return set(os.listdir(build_scripts)) - set([".svn"])
+
+
+@lru_cache(maxsize=None)
+def build_script_list(bld_os):
+    """Return the names of the build scripts for an operating system"""
+    return os.listdir(os.path.join(build_scripts, bld_os))
 
 
 def epics_servers(os, epics):
@@ -58,7 +69,7 @@ class Builder:
 
     def __init__(self, bld_os, server=None, epics=None):
 
-        assert bld_os in os_list, "Build operating system not supported"
+        assert bld_os in supported_os_list(), "Build operating system not supported"
 
         self.os = bld_os
         self.force = False
@@ -109,7 +120,7 @@ class Builder:
 
     def set_area(self, area):
         """Sets the release area to use in the build"""
-        file_list = os.listdir(os.path.join(build_scripts, self.os))
+        file_list = build_script_list(self.os)
         script_list = [x for x in file_list if x.endswith(self.exten)]
 
         assert area + self.exten in script_list, \
@@ -139,7 +150,7 @@ class Builder:
 
     def os_list(self):
         """Returns the list of operating systems supported"""
-        return os_list
+        return supported_os_list()
 
     def script_file(self):
         """Returns the files system path to the raw build script file"""
@@ -243,11 +254,11 @@ class Builder:
             shutil.rmtree(build_dir)
         return status
 
-    def submit(self, module, version, vcs, test=False):
-        """Submit a job to the build queue to build module version using the
-        code in the src_dir directory of subversion. If test is anything
-        that evaluates to True it is built in the test directory. Otherwise it
-        is a normal production build."""
+    def build_request(self, module, version, vcs, test=False):
+        """Return the file name and contents of the build request file that
+        builds module version on the build server, with the parameters in it.
+        If test is anything that evaluates to True it is built in the test
+        directory. Otherwise it is a normal production build."""
 
         build_name = self.build_name("build", module, version)
         if test:
@@ -260,23 +271,109 @@ class Builder:
             build_dir, module, version, vcs, build_name)
 
         # generate the filename
-        pathname = os.path.join(DLSBUILD_ROOT_DIR, "work", "etc", "build", "queue")
         filename = "%s.%s" % (params["build_name"], self.server)
 
-        # Submit the build script
         log.info("Build server job parameters: {}".format(params))
-        with open(os.path.join(pathname, filename), "w") as f:
-            f.write(self.build_script(params))
+        return filename, self.build_script(params), params
+
+    def release_log_entry(self, params):
+        """Returns the entry recording a build request in the release log"""
+        return ReleaseLogEntry(
+            params["build_dir"], params["module"], params["version"],
+            params["build_name"], self.server)
+
+    def submit(self, module, version, vcs, test=False):
+        """Submit a job to the build queue to build module version using the
+        code in the src_dir directory of subversion. If test is anything
+        that evaluates to True it is built in the test directory. Otherwise it
+        is a normal production build."""
+
+        filename, script, params = self.build_request(
+            module, version, vcs, test)
+
+        # Submit the build script
+        pathname = queue_dir()
+        tmp_name = write_queue_file(pathname, script)
+        os.rename(tmp_name, os.path.join(pathname, filename))
 
         # Create a log of the build
-        with open(os.path.expanduser(os.path.join("~", ".dls-release-log")), "a") as f:
-            f.write("\t".join([
-                params["build_dir"], params["module"], params["version"],
-                params["build_name"], self.server]) + "\n")
+        ReleaseLog(release_log_file()).append(
+            [self.release_log_entry(params)])
 
         usermsg.info("Build request file: {fname}\nCreated in : {dirname}".format(fname=filename, dirname=pathname))
 
 
+def queue_dir():
+    """Return the directory the build server takes build request files from"""
+    return os.path.join(DLSBUILD_ROOT_DIR, "work", "etc", "build", "queue")
+
+
+def release_log_file():
+    """Return the path of the user's log of build requests"""
+    return RELEASE_LOG_FILE
+
+
+def write_queue_file(pathname, script):
+    """Write a build request file into the queue directory under a temporary
+    name, hidden and without the server suffix so the build server ignores
+    it. Renaming it to its real name then submits the complete file at once.
+
+    Args:
+        pathname(str): Queue directory
+        script(str): Contents of the build request file
+
+    Returns:
+        str: Path of the temporary file
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=pathname, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(script)
+        os.chmod(tmp_name, 0o644)
+    except Exception:
+        os.remove(tmp_name)
+        raise
+    return tmp_name
+
+
+def submit_batch(submissions, test=False):
+    """Submit several build jobs together: either every build request file
+    appears in the queue or none of them does.
+
+    Args:
+        submissions(list): Tuples of the builder, module, version and vcs of
+            each job
+        test(bool): Build in the test directory instead of prod
+
+    Returns:
+        list[str]: Names of the build request files
+    """
+    pathname = queue_dir()
+    requests = []
+    try:
+        for builder, module, version, vcs in submissions:
+            filename, script, params = builder.build_request(
+                module, version, vcs, test)
+            tmp_name = write_queue_file(pathname, script)
+            requests.append((tmp_name, filename,
+                             builder.release_log_entry(params)))
+    except Exception:
+        for tmp_name, _, _ in requests:
+            os.remove(tmp_name)
+        raise
+
+    for tmp_name, filename, _ in requests:
+        os.rename(tmp_name, os.path.join(pathname, filename))
+
+    ReleaseLog(release_log_file()).append(
+        [entry for _, _, entry in requests])
+
+    filenames = [filename for _, filename, _ in requests]
+    usermsg.info("Build request files created in {dirname}:\n{fnames}".format(
+        dirname=pathname, fnames="\n".join(filenames)))
+    return filenames
+
+
 class WindowsBuild(Builder):
     """Implements the build class for Windows"""
     def __init__(self, server, epics):
@@ -1,10 +1,14 @@
 import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-import gitlab
-
+from dls_ade import bytes_to_string, lazy_import
 from dls_ade.gitserver import GitServer
-from dls_ade.dls_utilities import GIT_ROOT_DIR
+from dls_ade.dls_utilities import GIT_ROOT_DIR, remove_git_at_end
+from dls_ade.repo_cache import default_repo_list_cache
+
+gitlab = lazy_import("gitlab")
 
 
 def test_given_invalid_source_then_empty_list_of_modules(self):
@@ -26,6 +30,11 @@ TOKEN_HELP_LINK = "https://confluence.diamond.ac.uk/display/CNTRLS/" \
                   "How+to+generate+a+GitLab+API+token+for+use+with+dls_ade"
 GITLAB_API_VERSION = 4
 GITLAB_PER_PAGE = 100
+# Pages of a project listing fetched at once
+LIST_PAGE_JOBS = 8
+# Groups below this depth (e.g. controls/ioc) are looked up together when
+# creating a project's namespace
+GROUP_CACHE_DEPTH = 2
 HTTP_NOT_FOUND = 404
 # make sure the file mode is 440
 USER_TOKEN_FILE_PATH = os.path.expanduser("~/.config/gitlab/token")
@@ -61,6 +70,10 @@ class GitlabServer(GitServer):
             per_page=GITLAB_PER_PAGE
         )
         self._private_gitlab_handle = None
+        self._repo_cache = default_repo_list_cache("gitlab")
+        # Group path to id, filled in by _create_groups_in_path
+        self._group_ids = {}
+        self._loaded_group_roots = set()
 
     def _setup_private_gitlab_handle(self):
         if self._private_gitlab_handle:
@@ -111,35 +124,205 @@ class GitlabServer(GitServer):
                 raise
         return True
 
-    def get_server_repo_list(self, path=GIT_ROOT_DIR):
+    def get_server_repo_list(self, path=GIT_ROOT_DIR, refresh=False):
         """
         Returns list of module repository paths from all projects below
         'path' in the Gitlab server tree.
 
-        Includes .git suffix.
+        Includes .git suffix. The listing is cached on disk and, once the
+        cached copy is stale, only projects with activity since it was
+        fetched are requested from the server.
 
         Arguments:
             path: Gitlab server path
+            refresh(bool): Ignore any cached listing and fetch it in full
 
         Returns:
             List[str]: Repository paths on the server.
         """
-        projects = (
-            self._anon_gitlab_handle.groups.get(path).projects.list(
-                all=True, include_subgroups=True
-            )
-        )
+        return sorted(self.iter_server_repo_list(path, refresh))
+
+    def iter_server_repo_list(self, path=GIT_ROOT_DIR, refresh=False):
+        """
+        Yields the module repository paths below 'path' in the Gitlab server
+        tree as they are found.
+
+        When the whole listing is fetched, the paths on each page are yielded
+        as soon as that page arrives, in page order; the cache is updated once
+        every page has been read. A cached listing, or one updated with only
+        the active projects, is yielded sorted.
+
+        Arguments:
+            path: Gitlab server path
+            refresh(bool): Ignore any cached listing and fetch it in full
+
+        Yields:
+            str: Repository path on the server, including .git suffix
+        """
+        entry = None if refresh else self._repo_cache.get(path)
+
+        if entry is not None and self._repo_cache.is_fresh(entry):
+            for repo in sorted(entry["repos"]):
+                yield repo
+            return
 
-        repos = []
+        fetched = time.time()
+        repos = {}
+        if entry is None:
+            log.debug("Fetching all projects below {}".format(path))
+            for page in self._fetch_repo_pages(path):
+                repos.update(page)
+                for repo in sorted(page):
+                    yield repo
+            self._repo_cache.update(path, repos, None, fetched)
+            return
+
+        since = self._repo_cache.changed_since(entry)
+        log.debug("Fetching projects below {} active since {}".format(
+            path, since))
+        for page in self._fetch_repo_pages(path, last_activity_after=since):
+            repos.update(page)
+        entry = self._repo_cache.update(path, repos, entry, fetched)
+        for repo in sorted(entry["repos"]):
+            yield repo
+
+    def _fetch_repo_pages(self, path, **filters):
+        """
+        Fetch the pages of the projects below a group.
+
+        Args:
+            path(str): Gitlab group path
+            **filters: Query parameters for the project listing
+
+        Yields:
+            dict: Repository path to last activity timestamp for the projects
+                on each page, in page order
+        """
+        url = self._anon_gitlab_handle.groups.get(path, lazy=True).\
+            projects.path
+        query = dict(filters, include_subgroups=True)
+        for projects in self._fetch_pages(self._anon_gitlab_handle, url,
+                                          query):
+            yield self._page_repos(projects)
+
+    @staticmethod
+    def _fetch_pages(handle, url, query, jobs=LIST_PAGE_JOBS):
+        """
+        Fetch the pages of a Gitlab listing. The first page gives the number
+        of pages, and the rest are then fetched concurrently.
+
+        Args:
+            handle(:class:`gitlab.Gitlab`): Gitlab handle to request with
+            url(str): Path of the listing in the Gitlab API
+            query(dict): Query parameters for the listing
+            jobs(int): Maximum number of pages fetched at once
+
+        Yields:
+            list: The decoded items on each page, in page order
+        """
+        query = dict(query, per_page=GITLAB_PER_PAGE)
+
+        def fetch(page):
+            query_data = dict(query, page=page)
+            return handle.http_request("get", url, query_data=query_data)
+
+        first = fetch(1)
+        yield first.json()
+
+        total_pages = first.headers.get("X-Total-Pages")
+        if not total_pages:
+            # Gitlab leaves out the totals for very long listings, so follow
+            # the pages one by one
+            next_page = first.headers.get("X-Next-Page")
+            while next_page:
+                response = fetch(int(next_page))
+                yield response.json()
+                next_page = response.headers.get("X-Next-Page")
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = [executor.submit(fetch, page)
+                       for page in range(2, int(total_pages) + 1)]
+            try:
+                for future in futures:
+                    yield future.result().json()
+            finally:
+                # Stop fetching if the caller stops reading
+                for future in futures:
+                    future.cancel()
+
+    @staticmethod
+    def _page_repos(projects):
+        repos = {}
         for project in projects:
             repo_path = os.path.join(
-                project.namespace["full_path"], project.name
+                project["namespace"]["full_path"], project["name"]
             )
             repo_path = "{}.git".format(repo_path)
-            repos.append(repo_path)
+            repos[repo_path] = project.get("last_activity_at")
 
         return repos
 
+    def read_file(self, server_repo_path, ref, path):
+        """
+        Read one file from a server repository through the Gitlab repository
+        files API, without cloning it.
+
+        Only the blob SHA of the file is asked for first; its contents are
+        taken from the local blob cache (see :mod:`dls_ade.blob_cache`) when
+        they have been read before, and fetched and cached otherwise.
+
+        Args:
+            server_repo_path(str): Server repository path
+            ref(str): Branch, tag or commit to read the file at
+            path(str): Path of the file within the repository
+
+        Returns:
+            str: Contents of the file, or None if it does not exist at `ref`
+
+        Raises:
+            ValueError: Repository does not contain <server_repo_path>
+        """
+        project = self._anon_gitlab_handle.projects.get(
+            remove_git_at_end(server_repo_path), lazy=True)
+        try:
+            sha = self._get_blob_id(project, ref, path)
+        except gitlab.exceptions.GitlabHttpError as e:
+            if e.response_code != HTTP_NOT_FOUND:
+                raise
+            # A HEAD response has no message to say what was not found
+            return self._read_raw_file(project, server_repo_path, ref, path)
+
+        contents = self.blob_cache.get(sha)
+        if contents is None:
+            contents = project.repository_raw_blob(sha)
+            self.blob_cache.put(sha, contents)
+
+        return bytes_to_string(contents)
+
+    def _get_blob_id(self, project, ref, path):
+        file_path = path.replace('/', '%2F').replace('.', '%2E')
+        response = self._anon_gitlab_handle.http_request(
+            "head", "{}/{}".format(project.files.path, file_path),
+            query_data={"ref": ref})
+        return response.headers["X-Gitlab-Blob-Id"]
+
+    @staticmethod
+    def _read_raw_file(project, server_repo_path, ref, path):
+        try:
+            contents = project.files.raw(file_path=path, ref=ref)
+        except gitlab.exceptions.GitlabGetError as e:
+            if e.response_code != HTTP_NOT_FOUND:
+                raise
+            # Gitlab answers 404 for a missing project, ref or file alike;
+            # only the message tells them apart
+            if "File Not Found" in str(e.error_message):
+                return None
+            raise ValueError("Repository does not contain " +
+                             server_repo_path)
+
+        return bytes_to_string(contents)
+
     def create_remote_repo(self, dest):
         """
         Create a git repository on the given gitlab server path.
@@ -159,40 +342,82 @@ class GitlabServer(GitServer):
         if repo_name.endswith(".git"):
             repo_name = repo_name[:-4]
 
-        self._create_groups_in_path(path)
-        group_id = self._private_gitlab_handle.groups.get(path).id
+        group_id = self._create_groups_in_path(path)
 
         project_data = dict(GITLAB_DEFAULT_PROJECT_ATTRIBUTES)
         project_data["name"] = repo_name
         self._private_gitlab_handle.projects.create(project_data,
                                                     namespace_id=group_id)
 
-    def _is_group(self, path):
+    def _get_group_id(self, path):
+        # Id of an existing group, or None. Gitlab matches paths regardless
+        # of case, so they are kept in lower case.
         try:
-            self._anon_gitlab_handle.groups.get(path)
+            group = self._private_gitlab_handle.groups.get(path)
         except gitlab.exceptions.GitlabGetError as e:
             if e.response_code == HTTP_NOT_FOUND:
-                return False
-            else:
-                raise
-        return True
+                return None
+            raise
+        self._group_ids[path.lower()] = group.id
+        return group.id
+
+    def _load_group_ids(self, root):
+        # Read the ids of a group and every group below it, with one request
+        # for the group and one per page of its descendants. If the group
+        # does not exist, nothing below it does either, so only its
+        # ancestors are looked up, until one is found.
+        root_id = self._get_group_id(root)
+        if root_id is None:
+            parent = os.path.dirname(root)
+            while parent and self._get_group_id(parent) is None:
+                parent = os.path.dirname(parent)
+            return
+
+        url = "/groups/{}/descendant_groups".format(root_id)
+        for groups in self._fetch_pages(self._private_gitlab_handle, url, {}):
+            for descendant in groups:
+                self._group_ids[descendant["full_path"].lower()] = \
+                    descendant["id"]
 
     def _create_groups_in_path(self, path):
-        if self._is_group(path):
-            return
+        """
+        Create the groups in a path that do not exist yet, parents first.
+
+        The ids of the groups below the area group of the path (e.g.
+        controls/ioc) are read once and kept for the life of the server
+        object, so the number of requests does not depend on the depth of
+        the path.
+
+        Args:
+            path(str): Gitlab group path e.g. controls/ioc/BL01I/EA
+
+        Returns:
+            int: Id of the group at the end of the path
+        """
         parts = path.split('/')
-        for i in range(1, len(parts)):
+        root = "/".join(parts[:GROUP_CACHE_DEPTH]).lower()
+        if root not in self._loaded_group_roots:
+            self._load_group_ids(root)
+            self._loaded_group_roots.add(root)
+
+        # Start below the deepest group of the path that already exists
+        existing = len(parts)
+        while existing and \
+                "/".join(parts[:existing]).lower() not in self._group_ids:
+            existing -= 1
+        parent_id = None
+        if existing:
+            parent_id = self._group_ids["/".join(parts[:existing]).lower()]
+
+        for i in range(existing + 1, len(parts) + 1):
             semi_path = "/".join(parts[:i])
-            if not self._is_group(semi_path):
-                self._create_group(semi_path)
-        self._create_group(path)
-
-    def _create_group(self, path):
-        if "/" not in path:
-            parent_id = None
-        else:
-            parent_id = self._private_gitlab_handle.groups.get(
-                os.path.dirname(path)).id
+            log.debug("Creating group {}".format(semi_path))
+            parent_id = self._create_group(semi_path, parent_id)
+            self._group_ids[semi_path.lower()] = parent_id
+
+        return parent_id
+
+    def _create_group(self, path, parent_id):
         group_name = os.path.basename(path)
         group_data = dict(GITLAB_DEFAULT_GROUP_ATTRIBUTES)
         group_data.update({
@@ -200,7 +425,7 @@ class GitlabServer(GitServer):
             'path': group_name,
             'parent_id': parent_id
         })
-        self._private_gitlab_handle.groups.create(group_data)
+        return self._private_gitlab_handle.groups.create(group_data).id
 
     @staticmethod
     def dev_area_path(area="support"):
@@ -1,32 +1,228 @@
 import os
+import shutil
+import tempfile
 import unittest
 from mock import patch, MagicMock
-from collections import namedtuple
+
+import gitlab
 
 from dls_ade.gitlabserver import GitlabServer
 from dls_ade.dls_utilities import GIT_ROOT_DIR
+from dls_ade.repo_cache import RepoListCache
+from dls_ade.blob_cache import BlobCache, blob_sha
 
-FakeProject = namedtuple('FakeProject', ['name', 'namespace'])
 FAKE_PROJECT_LIST = [
-    FakeProject('BL01I-EA-IOC-01', {'full_path': 'controls/ioc'}),
-    FakeProject('support_module', {'full_path': 'controls/support'}),
-    FakeProject('python_module', {'full_path': 'controls/python'})
+    {'name': 'BL01I-EA-IOC-01', 'namespace': {'full_path': 'controls/ioc'}},
+    {'name': 'support_module', 'namespace': {'full_path': 'controls/support'}},
+    {'name': 'python_module', 'namespace': {'full_path': 'controls/python'}}
 ]
 
 
+def fake_page(projects, total_pages=1, next_page=None):
+    """A project listing response as returned by Gitlab.http_request"""
+    response = MagicMock()
+    response.json.return_value = projects
+    response.headers = {}
+    if total_pages is not None:
+        response.headers["X-Total-Pages"] = str(total_pages)
+    if next_page is not None:
+        response.headers["X-Next-Page"] = str(next_page)
+    return response
+
+
 class GetServerRepoList(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = RepoListCache(
+            os.path.join(self.cache_dir, "repo_list.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _server(self):
+        gl = GitlabServer()
+        gl._repo_cache = self.cache
+        gl._anon_gitlab_handle.groups.get.return_value.projects.path = \
+            "/groups/controls/projects"
+        return gl
+
     @patch('dls_ade.gitlabserver.gitlab.Gitlab')
     def test_get_server_repo_list_returns_correct_path(self, mock_gitlab):
-        gl = GitlabServer()
-        group_mock = MagicMock()
-        # Make sure the call to handle.groups.get() returns the correct mock.
-        gl._anon_gitlab_handle.groups.get.return_value = group_mock
-        group_mock.projects.list.return_value = FAKE_PROJECT_LIST
+        gl = self._server()
+        gl._anon_gitlab_handle.http_request.return_value = \
+            fake_page(FAKE_PROJECT_LIST)
+
         projects = gl.get_server_repo_list()
+
+        gl._anon_gitlab_handle.groups.get.assert_called_once_with(
+            GIT_ROOT_DIR, lazy=True)
         self.assertIn('controls/ioc/BL01I-EA-IOC-01.git', projects)
         self.assertIn('controls/support/support_module.git', projects)
         self.assertIn('controls/python/python_module.git', projects)
 
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_given_many_pages_then_all_fetched_and_yielded_in_order(
+            self, mock_gitlab):
+        gl = self._server()
+        pages = {1: fake_page(FAKE_PROJECT_LIST[:1], total_pages=3),
+                 2: fake_page(FAKE_PROJECT_LIST[1:2], total_pages=3),
+                 3: fake_page(FAKE_PROJECT_LIST[2:], total_pages=3)}
+        gl._anon_gitlab_handle.http_request.side_effect = \
+            lambda verb, url, query_data: pages[query_data["page"]]
+
+        projects = list(gl.iter_server_repo_list())
+
+        self.assertEqual(projects, ['controls/ioc/BL01I-EA-IOC-01.git',
+                                    'controls/support/support_module.git',
+                                    'controls/python/python_module.git'])
+        query_data = [call[1]["query_data"] for call in
+                      gl._anon_gitlab_handle.http_request.call_args_list]
+        self.assertEqual(sorted(query["page"] for query in query_data),
+                         [1, 2, 3])
+        self.assertTrue(all(query["include_subgroups"] and
+                            query["per_page"] == 100
+                            for query in query_data))
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_given_no_total_pages_then_next_pages_followed(self, mock_gitlab):
+        gl = self._server()
+        gl._anon_gitlab_handle.http_request.side_effect = [
+            fake_page(FAKE_PROJECT_LIST[:2], total_pages=None, next_page=2),
+            fake_page(FAKE_PROJECT_LIST[2:], total_pages=None)]
+
+        projects = gl.get_server_repo_list()
+
+        self.assertEqual(gl._anon_gitlab_handle.http_request.call_count, 2)
+        self.assertEqual(len(projects), 3)
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_fresh_cached_listing_is_not_fetched_again(self, mock_gitlab):
+        gl = self._server()
+        request_mock = gl._anon_gitlab_handle.http_request
+        request_mock.return_value = fake_page(FAKE_PROJECT_LIST)
+
+        first = gl.get_server_repo_list()
+        second = gl.get_server_repo_list()
+
+        self.assertEqual(first, second)
+        request_mock.assert_called_once_with(
+            "get", "/groups/controls/projects",
+            query_data={"include_subgroups": True, "per_page": 100,
+                        "page": 1})
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_stale_cached_listing_fetches_only_active_projects(self,
+                                                               mock_gitlab):
+        gl = self._server()
+        self.cache.ttl = -1
+        request_mock = gl._anon_gitlab_handle.http_request
+        request_mock.return_value = fake_page(FAKE_PROJECT_LIST[:1])
+        gl.get_server_repo_list()
+
+        request_mock.reset_mock()
+        request_mock.return_value = fake_page(FAKE_PROJECT_LIST[1:])
+        projects = gl.get_server_repo_list()
+
+        request_mock.assert_called_once()
+        self.assertRegex(
+            request_mock.call_args[1]['query_data']['last_activity_after'],
+            r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$")
+        self.assertEqual(len(projects), 3)
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_refresh_fetches_full_listing(self, mock_gitlab):
+        gl = self._server()
+        request_mock = gl._anon_gitlab_handle.http_request
+        request_mock.return_value = fake_page(FAKE_PROJECT_LIST)
+        gl.get_server_repo_list()
+
+        request_mock.return_value = fake_page(FAKE_PROJECT_LIST[:1])
+        projects = gl.get_server_repo_list(refresh=True)
+
+        self.assertEqual(request_mock.call_count, 2)
+        self.assertEqual(projects, ['controls/ioc/BL01I-EA-IOC-01.git'])
+
+
+class ReadFileTest(unittest.TestCase):
+
+    SHA = "3dd2a3ab9c9cd5bf6a3cab4a3f8e1d1c5fb0a612"
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _server(self):
+        gl = GitlabServer()
+        gl.blob_cache = BlobCache(self.cache_dir)
+        gl._anon_gitlab_handle.http_request.return_value.headers = {
+            "X-Gitlab-Blob-Id": self.SHA}
+        return gl
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_given_file_then_blob_contents_returned(self, mock_gitlab):
+        gl = self._server()
+        project = gl._anon_gitlab_handle.projects.get.return_value
+        project.files.path = "/projects/controls%2Fsupport%2Fsupport_module" \
+                             "/repository/files"
+        project.repository_raw_blob.return_value = \
+            b"* module-contact=abc12345\n"
+
+        contents = gl.read_file("controls/support/support_module.git",
+                                "HEAD", ".gitattributes")
+
+        gl._anon_gitlab_handle.projects.get.assert_called_once_with(
+            "controls/support/support_module", lazy=True)
+        gl._anon_gitlab_handle.http_request.assert_called_once_with(
+            "head", "/projects/controls%2Fsupport%2Fsupport_module"
+                    "/repository/files/%2Egitattributes",
+            query_data={"ref": "HEAD"})
+        project.repository_raw_blob.assert_called_once_with(self.SHA)
+        self.assertEqual(contents, "* module-contact=abc12345\n")
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_given_blob_read_before_then_not_fetched_again(self, mock_gitlab):
+        contents = b"* module-contact=abc12345\n"
+        self.SHA = blob_sha(contents)
+        gl = self._server()
+        project = gl._anon_gitlab_handle.projects.get.return_value
+        project.repository_raw_blob.return_value = contents
+
+        first = gl.read_file("controls/support/support_module", "1-0",
+                             ".gitattributes")
+        second = gl.read_file("controls/support/support_module", "1-1",
+                              ".gitattributes")
+
+        self.assertEqual(first, second)
+        project.repository_raw_blob.assert_called_once_with(self.SHA)
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_given_missing_file_then_none_returned(self, mock_gitlab):
+        gl = self._server()
+        gl._anon_gitlab_handle.http_request.side_effect = \
+            gitlab.exceptions.GitlabHttpError("", 404)
+        project = gl._anon_gitlab_handle.projects.get.return_value
+        project.files.raw.side_effect = gitlab.exceptions.GitlabGetError(
+            "404 File Not Found", 404)
+
+        self.assertIsNone(gl.read_file("controls/support/support_module",
+                                       "HEAD", ".gitattributes"))
+
+    @patch('dls_ade.gitlabserver.gitlab.Gitlab')
+    def test_given_missing_project_then_error_raised(self, mock_gitlab):
+        gl = self._server()
+        gl._anon_gitlab_handle.http_request.side_effect = \
+            gitlab.exceptions.GitlabHttpError("", 404)
+        project = gl._anon_gitlab_handle.projects.get.return_value
+        project.files.raw.side_effect = gitlab.exceptions.GitlabGetError(
+            "404 Project Not Found", 404)
+
+        with self.assertRaises(ValueError):
+            gl.read_file("controls/support/not_a_module", "HEAD",
+                         ".gitattributes")
+
 
 class CreateRemoteRepoTest(unittest.TestCase):
     @patch('dls_ade.gitlabserver.gitlab.Gitlab')
@@ -66,6 +262,97 @@ class CreateRemoteRepoTest(unittest.TestCase):
             gl.create_remote_repo('controls/support/support_module')
 
 
+class CreateGroupsInPathTest(unittest.TestCase):
+
+    def _server(self, groups, descendants):
+        # groups: path of each group looked up directly to its id
+        gl = GitlabServer()
+        gl._private_gitlab_handle = MagicMock()
+
+        def get_group(path):
+            if path not in groups:
+                raise gitlab.exceptions.GitlabGetError(
+                    "404 Group Not Found", 404)
+            return MagicMock(id=groups[path])
+
+        gl._private_gitlab_handle.groups.get.side_effect = get_group
+        gl._private_gitlab_handle.http_request.return_value = \
+            fake_page(descendants)
+        created = iter(range(100, 200))
+        gl._private_gitlab_handle.groups.create.side_effect = \
+            lambda data: MagicMock(id=next(created))
+        return gl
+
+    def _created(self, gl):
+        return [(call[0][0]['path'], call[0][0]['parent_id']) for call in
+                gl._private_gitlab_handle.groups.create.call_args_list]
+
+    def test_given_existing_path_then_no_groups_created(self):
+        gl = self._server({"controls/ioc": 2},
+                          [{'full_path': 'controls/ioc/BL01I', 'id': 3}])
+
+        group_id = gl._create_groups_in_path("controls/ioc/BL01I")
+
+        self.assertEqual(group_id, 3)
+        gl._private_gitlab_handle.groups.get.assert_called_once_with(
+            "controls/ioc")
+        gl._private_gitlab_handle.http_request.assert_called_once_with(
+            "get", "/groups/2/descendant_groups",
+            query_data={"per_page": 100, "page": 1})
+        gl._private_gitlab_handle.groups.create.assert_not_called()
+
+    def test_given_path_in_other_case_then_existing_group_used(self):
+        gl = self._server({"controls/ioc": 2},
+                          [{'full_path': 'controls/ioc/bl01i', 'id': 3}])
+
+        group_id = gl._create_groups_in_path("controls/ioc/BL01I/EA")
+
+        self.assertEqual(self._created(gl), [('EA', 3)])
+        self.assertEqual(group_id, 100)
+
+    def test_given_deep_path_then_missing_groups_created_in_order(self):
+        gl = self._server({"controls/ioc": 2}, [])
+
+        group_id = gl._create_groups_in_path("controls/ioc/BL01I/EA/IOC")
+
+        self.assertEqual(self._created(gl),
+                         [('BL01I', 2), ('EA', 100), ('IOC', 101)])
+        self.assertEqual(group_id, 102)
+        self.assertEqual(gl._private_gitlab_handle.groups.get.call_count, 1)
+
+    def test_given_second_path_then_groups_not_fetched_again(self):
+        gl = self._server({"controls/ioc": 2}, [])
+
+        gl._create_groups_in_path("controls/ioc/BL01I")
+        group_id = gl._create_groups_in_path("controls/ioc/BL01I")
+
+        self.assertEqual(group_id, 100)
+        self.assertEqual(gl._private_gitlab_handle.groups.get.call_count, 1)
+        self.assertEqual(gl._private_gitlab_handle.http_request.call_count, 1)
+        self.assertEqual(gl._private_gitlab_handle.groups.create.call_count,
+                         1)
+
+    def test_given_no_area_group_then_created_below_top_level(self):
+        gl = self._server({"controls": 1}, [])
+
+        group_id = gl._create_groups_in_path("controls/newarea/module")
+
+        self.assertEqual(self._created(gl),
+                         [('newarea', 1), ('module', 100)])
+        self.assertEqual(group_id, 101)
+        gl._private_gitlab_handle.http_request.assert_not_called()
+
+    def test_given_no_top_level_group_then_whole_path_created(self):
+        gl = self._server({}, [])
+
+        group_id = gl._create_groups_in_path("controls/support")
+
+        self.assertEqual(self._created(gl),
+                         [('controls', None), ('support', 100)])
+        self.assertEqual(group_id, 101)
+        gl._private_gitlab_handle.http_request.assert_not_called()
+
+
 class DevAreaPathTest(unittest.TestCase):
 
     def test_returns_correct_paths(self):
@@ -38,10 +38,14 @@ class GitoliteServer(GitServer):
         cmd_output = bytes_to_string(cmd_output)
         return server_repo_path in cmd_output
 
-    def get_server_repo_list(self, area=""):
+    def get_server_repo_list(self, area="", refresh=False):
         """
         Return list of module repository paths from the git server.
 
+        Args:
+            area(str): Not used; every repository is listed
+            refresh(bool): Not used; gitolite listings are not cached
+
         Returns:
             list[str]: Repository paths on the server.
         """
@@ -49,7 +53,7 @@ class GitoliteServer(GitServer):
         log.debug("Command: \"{sshcmd}\"".format(sshcmd=list_cmd))
         list_cmd_output = subprocess.check_output(list_cmd.split())
         list_cmd_output = bytes_to_string(list_cmd_output)
-        log.debug("\"gitolite response\": \"{}\"".format(list_cmd_output))
+        log.debug("\"gitolite response\": \"%s\"", list_cmd_output)
 
         # list_cmd_output is a '\n' separated list of every repo on Gitolite:
         #   controls/epics/base
@@ -1,15 +1,73 @@
+import io
 import os
+import time
+import shutil
+import tarfile
 import tempfile
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from dls_ade.dls_utilities import remove_git_at_end
+from dls_ade.mirror_store import default_mirror_store
+from dls_ade.blob_cache import default_blob_cache
 from dls_ade.vcs_git import Git, git
 
 from dls_ade import dls_utilities as dls_util
+from dls_ade import bytes_to_string
+from dls_ade.exceptions import VCSGitError
 
 log = logging.getLogger(__name__)
 usermsg = logging.getLogger("usermessages")
 
+# Default number of repositories cloned at once by clone_multi
+CLONE_JOBS = 4
+# Extra attempts for a clone that fails with a transient connection error
+CLONE_RETRIES = 2
+CLONE_RETRY_DELAY = 2
+TRANSIENT_CLONE_ERRORS = (
+    "Connection reset",
+    "Connection timed out",
+    "Connection closed by",
+    "Connection refused",
+    "exchange_identification",
+    "The remote end hung up unexpectedly",
+    "early EOF",
+)
+
+# Clone profiles for temp_clone, named after what the caller reads from the
+# clone. Each maps to the extra 'git clone' options it needs.
+FULL_CLONE = "full"
+# Commits and tags only: history, release and branch checks
+REFS_ONLY_CLONE = "refs-only"
+# All commits and trees, file contents fetched when first read
+BLOBLESS_CLONE = "blobless"
+# All commits, trees and file contents fetched for the checkout only
+TREELESS_CLONE = "treeless"
+# Only the given paths are checked out, e.g. configure/RELEASE
+SPARSE_CLONE = "sparse"
+CLONE_PROFILES = {
+    FULL_CLONE: {},
+    REFS_ONLY_CLONE: {"filter": "tree:0", "no_checkout": True},
+    BLOBLESS_CLONE: {"filter": "blob:none"},
+    TREELESS_CLONE: {"filter": "tree:0"},
+    SPARSE_CLONE: {"filter": "blob:none", "no_checkout": True},
+}
+
+
+def is_transient_clone_error(error):
+    """
+    Check whether a failed clone is worth retrying.
+
+    Args:
+        error(:class:`~git.exc.GitCommandError`): Error raised by the clone
+
+    Returns:
+        bool: True if the error looks like a dropped or refused connection
+    """
+    stderr = str(error.stderr)
+    return any(message in stderr for message in TRANSIENT_CLONE_ERRORS)
+
 
 class GitServer(object):
 
@@ -22,6 +80,10 @@ class GitServer(object):
         self.release_url = release_url
         # url used for everything else e.g: for starting a new module
         self.url = url
+        # local bare mirrors that temporary clones borrow objects from
+        self.mirror_store = default_mirror_store()
+        # file contents read from the server, by blob SHA
+        self.blob_cache = default_blob_cache()
 
     def is_server_repo(self, server_repo_path):
         """
@@ -37,16 +99,35 @@ class GitServer(object):
         repo_list = self.get_server_repo_list()
         return server_repo_path in repo_list
 
-    def get_server_repo_list(self, area=None):
+    def get_server_repo_list(self, area=None, refresh=False):
         """
         Returns list of module repository paths from the git server.
 
+        Args:
+            area(str): Server path to list repositories below
+            refresh(bool): Ignore any cached listing and fetch it again
+
         Returns:
             List[str]: Repository paths on the server.
         """
 
         raise NotImplementedError("Must be implemented in child classes")
 
+    def iter_server_repo_list(self, area=None, refresh=False):
+        """
+        Yields module repository paths from the git server as they are found.
+        Servers that can list repositories incrementally override this.
+
+        Args:
+            area(str): Server path to list repositories below
+            refresh(bool): Ignore any cached listing and fetch it again
+
+        Yields:
+            str: Repository path on the server
+        """
+        for repo in self.get_server_repo_list(area, refresh=refresh):
+            yield repo
+
     def create_new_local_repo(self, module, area, path):
         """
         Create a new Git instance from a git.Repo instance
@@ -113,20 +194,55 @@ class GitServer(object):
 
         return git_inst
 
-    def temp_clone(self, source, depth=None):
+    def temp_clone(self, source, depth=None, profile=FULL_CLONE, paths=None,
+                   check_exists=True):
         """
         Clones repo to /tmp directory and returns the relevant git.Repo object.
 
+        Full clones borrow objects from a local mirror of the repository (see
+        :mod:`dls_ade.mirror_store`), which is brought up to date first, so
+        only new objects are transferred from the server. The other profiles
+        only borrow from a mirror that already exists; otherwise they make a
+        partial clone that leaves out what the caller does not read:
+
+        * refs-only: commits and tags, nothing checked out
+        * blobless: commits and trees, file contents fetched when first read
+        * treeless: commits, with trees and file contents fetched for the
+          checkout only
+        * sparse: as blobless, with only `paths` checked out
+
+        Partial clones need the server to allow filters
+        (uploadpack.allowFilter) and sparse checkouts need git 2.35 or later
+        on this machine. If a profile's clone fails, the module is cloned in
+        full instead.
+
         Args:
             source(str): server repository path to clone
+            depth(int): Create a shallow clone with this many commits instead
+                of using the mirror
+            profile(str): One of :data:`CLONE_PROFILES`
+            paths(list[str]): Paths to check out for a sparse clone
+            check_exists(bool): Check the repository exists on the server
+                first; False if the caller has already done so
 
         Returns:
             :class:`~git.repo.base.Repo`: Repository instance
+
+        Raises:
+            ValueError: Repository does not contain <source>
+            ValueError: Unknown clone profile, or sparse clone without paths
         """
 
+        if profile not in CLONE_PROFILES:
+            raise ValueError("Unknown clone profile '{}', expected one of: "
+                             "{}".format(profile,
+                                         ", ".join(sorted(CLONE_PROFILES))))
+        if profile == SPARSE_CLONE and not paths:
+            raise ValueError("A sparse clone needs paths to check out")
+
         dls_util.remove_end_slash(source)
 
-        if not self.is_server_repo(source):
+        if check_exists and not self.is_server_repo(source):
             raise ValueError("Repository does not contain " + source)
 
         # Area is second section of path
@@ -138,49 +254,212 @@ class GitServer(object):
 
         repo_dir = tempfile.mkdtemp(suffix="_" + module.replace("/", "_"))
 
+        clone_url = os.path.join(self.clone_url, self.get_clone_path(source))
+
         # Build keyword arguments
-        clone_kwargs = {}
+        clone_kwargs = dict(CLONE_PROFILES[profile])
         if depth is not None:
-            clone_kwargs = {"depth": depth}
-
-        repo = git.Repo.clone_from(os.path.join(self.clone_url,
-                                                self.get_clone_path(source)),
-                                   repo_dir, **clone_kwargs)
+            clone_kwargs["depth"] = depth
+        elif self.mirror_store is not None and (
+                profile == FULL_CLONE or self.mirror_store.has_mirror(source)):
+            try:
+                clone_kwargs["reference"] = self.mirror_store.update(
+                    clone_url, source)
+                # Every object is available locally
+                clone_kwargs.pop("filter", None)
+            except (git.GitCommandError, OSError) as e:
+                log.warning("Cloning {} without local mirror: {}".format(
+                    source, e))
+
+        log.debug("Cloning {} ({} profile)".format(source, profile))
+        try:
+            repo = git.Repo.clone_from(clone_url, repo_dir, **clone_kwargs)
+            if profile == SPARSE_CLONE:
+                repo.git.sparse_checkout("set", "--no-cone", *paths)
+                repo.git.checkout()
+        except git.GitCommandError as e:
+            if profile == FULL_CLONE:
+                raise
+            log.warning("Cloning {} in full, {} profile failed: {}".format(
+                source, profile, e))
+            # The clone recreates the directory
+            shutil.rmtree(repo_dir, ignore_errors=True)
+            for option in CLONE_PROFILES[profile]:
+                clone_kwargs.pop(option, None)
+            repo = git.Repo.clone_from(clone_url, repo_dir, **clone_kwargs)
 
         git_inst = Git(module, area, self, repo)
 
         return git_inst
 
-    def clone_multi(self, source):
+    def list_remote_refs(self, server_repo_path, check_exists=True):
+        """
+        Lists the branches and tags of a server repository with a single
+        'git ls-remote', without cloning it.
+
+        Args:
+            server_repo_path(str): Server repository path
+            check_exists(bool): Check the repository exists on the server
+                first; False if the caller has already done so
+
+        Returns:
+            dict: "HEAD" maps to the SHA of the default branch (None for an
+                empty repository); "branches" and "tags" map to
+                :class:`~collections.OrderedDict` of name to commit SHA in
+                refname order. Annotated tags are peeled to their commits.
+
+        Raises:
+            ValueError: Repository does not contain <server_repo_path>
+        """
+
+        server_repo_path = dls_util.remove_end_slash(server_repo_path)
+
+        if check_exists and not self.is_server_repo(server_repo_path):
+            raise ValueError("Repository does not contain " +
+                             server_repo_path)
+
+        url = os.path.join(self.clone_url,
+                           self.get_clone_path(server_repo_path))
+        ls_remote_output = git.cmd.Git().ls_remote(url)
+
+        refs = {"HEAD": None, "branches": OrderedDict(),
+                "tags": OrderedDict()}
+        for line in ls_remote_output.splitlines():
+            sha, ref = line.split("\t", 1)
+            if ref == "HEAD":
+                refs["HEAD"] = sha
+            elif ref.startswith("refs/heads/"):
+                refs["branches"][ref[len("refs/heads/"):]] = sha
+            elif ref.startswith("refs/tags/"):
+                name = ref[len("refs/tags/"):]
+                if name.endswith("^{}"):
+                    # Peeled annotated tag, listed after the tag object
+                    refs["tags"][name[:-3]] = sha
+                else:
+                    refs["tags"].setdefault(name, sha)
+
+        return refs
+
+    def read_file(self, server_repo_path, ref, path):
+        """
+        Read one file from a server repository without cloning it, using
+        'git archive --remote'.
+
+        Args:
+            server_repo_path(str): Server repository path
+            ref(str): Branch, tag or commit to read the file at
+            path(str): Path of the file within the repository
+
+        Returns:
+            str: Contents of the file, or None if it does not exist at `ref`
+
+        Raises:
+            :class:`~git.exc.GitCommandError`: If the archive could not be
+                fetched, e.g. the repository or `ref` does not exist
+        """
+
+        url = os.path.join(self.clone_url,
+                           self.get_clone_path(server_repo_path))
+        try:
+            archive = git.cmd.Git().archive(
+                "--remote=" + url, ref, path, stdout_as_string=False)
+        except git.GitCommandError as e:
+            if "did not match any files" in str(e.stderr):
+                return None
+            raise
+
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            return bytes_to_string(tar.extractfile(path).read())
+
+    def clone_multi(self, source, refresh=False, jobs=CLONE_JOBS,
+                    retries=CLONE_RETRIES):
         """
         Checks if source is valid, then clones all repositories in source
 
+        Up to `jobs` repositories are cloned at once. Clones failing with a
+        transient connection error are retried; other failures are reported
+        once every clone has finished.
+
         Args:
             source(str): Suffix of URL for remote repo area to clone
+            refresh(bool): Ignore any cached repository listing
+            jobs(int): Maximum number of concurrent clones
+            retries(int): Extra attempts for each clone after a transient
+                error
 
         Raises:
-            :class:`~dls_ade.exceptions.VCSGitError`: Repository does not
-                contain <source>
+            :class:`~dls_ade.exceptions.VCSGitError`: If any repository could
+                not be cloned
         """
 
-        split_list = self.get_server_repo_list()
+        split_list = self.get_server_repo_list(refresh=refresh)
+        existing = os.listdir("./")
+
+        to_clone = []
         for path in split_list:
             if path.startswith(source):
 
                 # Remove controls/<area>/ from front of save path
                 module = remove_git_at_end(path.split('/', 2)[-1])
 
-                log.debug("Module: {}".format(module))
+                log.debug("Module: %s", module)
 
-                if module not in os.listdir("./"):
-                    usermsg.info("Cloning: {}".format(path))
-                    git.Repo.clone_from(
-                        os.path.join(self.clone_url,
-                                     self.get_clone_path(path)),
-                        os.path.join("./", module))
+                if module not in existing:
+                    to_clone.append((path, module))
                 else:
                     usermsg.info(module + " already exists in current directory")
 
+        if not to_clone:
+            return
+
+        total = len(to_clone)
+        usermsg.info("Cloning {} repositories, {} at a time".format(
+            total, jobs))
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {}
+            for path, module in to_clone:
+                future = executor.submit(self._clone_with_retries, path,
+                                         module, retries)
+                futures[future] = path
+            for count, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    future.result()
+                except git.GitCommandError as e:
+                    failed.append(path)
+                    usermsg.error("[{}/{}] Failed to clone {}: {}".format(
+                        count, total, path, str(e.stderr).strip()))
+                else:
+                    usermsg.info("[{}/{}] Cloned: {}".format(count, total,
+                                                             path))
+
+        usermsg.info("Cloned {} of {} repositories".format(
+            total - len(failed), total))
+        if failed:
+            raise VCSGitError("Failed to clone: {}".format(
+                ", ".join(sorted(failed))))
+
+    def _clone_with_retries(self, path, module, retries):
+        url = os.path.join(self.clone_url, self.get_clone_path(path))
+        local_path = os.path.join("./", module)
+
+        attempt = 0
+        while True:
+            log.debug("Cloning: {}".format(path))
+            try:
+                return git.Repo.clone_from(url, local_path)
+            except git.GitCommandError as e:
+                if attempt >= retries or not is_transient_clone_error(e):
+                    raise
+                attempt += 1
+                log.warning("Retrying clone of {} ({}/{}): {}".format(
+                    path, attempt, retries, str(e.stderr).strip()))
+                if os.path.isdir(local_path):
+                    shutil.rmtree(local_path)
+                time.sleep(CLONE_RETRY_DELAY * attempt)
+
     def create_remote_repo(self, dest):
         """
         Create a git repository on the given server path.
@@ -1,7 +1,12 @@
+import io
+import tarfile
 import unittest
 from mock import ANY, patch, MagicMock  # @UnresolvedImport
 
+import git
+
 from dls_ade.gitserver import GitServer
+from dls_ade.exceptions import VCSGitError
 
 
 class IsServerRepoTest(unittest.TestCase):
@@ -133,12 +138,13 @@ class TempCloneTest(unittest.TestCase):
 
         self.assertFalse(mock_clone_from.call_count)
 
+    @patch('dls_ade.mirror_store.MirrorStore.update', return_value="mirror")
     @patch('dls_ade.gitserver.GitServer.get_clone_path',
            return_value="controls/area/test_module")
     @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
     @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
     @patch('git.Repo.clone_from')
-    def test_given_valid_inputs_then_clone_from_called(self, mock_clone_from, _1, _2, _3, mock_mkdtemp):
+    def test_given_valid_inputs_then_clone_from_called(self, mock_clone_from, _1, _2, _3, mock_update, mock_mkdtemp):
         source = "controls/area/test_module"
 
         server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
@@ -152,6 +158,7 @@ class TempCloneTest(unittest.TestCase):
             depth=1
         )
         mock_mkdtemp.assert_called_once_with(suffix="_test_module")
+        self.assertFalse(mock_update.call_count)
 
         # Reset mocks
         mock_clone_from.reset_mock()
@@ -159,18 +166,39 @@ class TempCloneTest(unittest.TestCase):
 
         # Do a normal clone
         server.temp_clone(source)
+        mock_update.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", source)
         mock_clone_from.assert_called_once_with(
-            "test@clone-url.ac.uk/controls/area/test_module", "tempdir")
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir",
+            reference="mirror")
 
         mock_mkdtemp.assert_called_once_with(suffix="_test_module")
 
+    @patch('dls_ade.mirror_store.MirrorStore.update',
+           side_effect=OSError("No space left on device"))
+    @patch('dls_ade.gitserver.GitServer.get_clone_path',
+           return_value="controls/area/test_module")
+    @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
+    @patch('git.Repo.clone_from')
+    def test_given_mirror_update_fails_then_plain_clone(self, mock_clone_from, _1, _2, _3, _4, mock_mkdtemp):
+        source = "controls/area/test_module"
+
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        server.temp_clone(source)
+
+        mock_clone_from.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir")
 
+    @patch('dls_ade.mirror_store.MirrorStore.update', return_value="mirror")
     @patch('dls_ade.gitserver.GitServer.get_clone_path',
            return_value="controls/ioc/domain/test_module")
     @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
     @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
     @patch('git.Repo.clone_from')
-    def test_given_repo_with_domain_code_then_tempdir_arg_has_forwardslash_removed(self, mock_clone_from, _1, _2, _3, mock_mkdtemp):
+    def test_given_repo_with_domain_code_then_tempdir_arg_has_forwardslash_removed(self, mock_clone_from, _1, _2, _3, _4, mock_mkdtemp):
 
         source = "controls/ioc/domain/test_module"
 
@@ -181,7 +209,217 @@ class TempCloneTest(unittest.TestCase):
 
         mock_mkdtemp.assert_called_once_with(suffix="_domain_test_module")
         mock_clone_from.assert_called_once_with(
-            "test@clone-url.ac.uk/controls/ioc/domain/test_module", "tempdir")
+            "test@clone-url.ac.uk/controls/ioc/domain/test_module", "tempdir",
+            reference="mirror")
+
+    @patch('dls_ade.mirror_store.MirrorStore.has_mirror', return_value=False)
+    @patch('dls_ade.mirror_store.MirrorStore.update', return_value="mirror")
+    @patch('dls_ade.gitserver.GitServer.get_clone_path',
+           return_value="controls/area/test_module")
+    @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
+    @patch('git.Repo.clone_from')
+    def test_given_profile_without_mirror_then_partial_clone(self, mock_clone_from, _1, _2, _3, mock_update, _4, mock_mkdtemp):
+        source = "controls/area/test_module"
+
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        server.temp_clone(source, profile="refs-only")
+        mock_clone_from.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir",
+            filter="tree:0", no_checkout=True)
+
+        mock_clone_from.reset_mock()
+        server.temp_clone(source, profile="blobless")
+        mock_clone_from.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir",
+            filter="blob:none")
+
+        mock_clone_from.reset_mock()
+        server.temp_clone(source, profile="treeless")
+        mock_clone_from.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir",
+            filter="tree:0")
+
+        self.assertFalse(mock_update.call_count)
+
+    @patch('dls_ade.mirror_store.MirrorStore.has_mirror', return_value=True)
+    @patch('dls_ade.mirror_store.MirrorStore.update', return_value="mirror")
+    @patch('dls_ade.gitserver.GitServer.get_clone_path',
+           return_value="controls/area/test_module")
+    @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
+    @patch('git.Repo.clone_from')
+    def test_given_profile_with_mirror_then_mirror_used(self, mock_clone_from, _1, _2, _3, mock_update, _4, mock_mkdtemp):
+        source = "controls/area/test_module"
+
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        server.temp_clone(source, profile="refs-only")
+
+        mock_update.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", source)
+        mock_clone_from.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir",
+            no_checkout=True, reference="mirror")
+
+    @patch('dls_ade.mirror_store.MirrorStore.has_mirror', return_value=False)
+    @patch('dls_ade.gitserver.GitServer.get_clone_path',
+           return_value="controls/area/test_module")
+    @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
+    @patch('git.Repo.clone_from')
+    def test_given_sparse_profile_then_only_paths_checked_out(self, mock_clone_from, _1, _2, _3, _4, mock_mkdtemp):
+        source = "controls/area/test_module"
+
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        server.temp_clone(source, profile="sparse",
+                          paths=["/configure/RELEASE"])
+
+        mock_clone_from.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir",
+            filter="blob:none", no_checkout=True)
+        repo = mock_clone_from.return_value
+        repo.git.sparse_checkout.assert_called_once_with(
+            "set", "--no-cone", "/configure/RELEASE")
+        repo.git.checkout.assert_called_once_with()
+
+    @patch('dls_ade.mirror_store.MirrorStore.has_mirror', return_value=False)
+    @patch('dls_ade.gitserver.GitServer.get_clone_path',
+           return_value="controls/area/test_module")
+    @patch('dls_ade.gitserver.GitServer.dev_area_path', return_value='dummy')
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
+    @patch('git.Repo.clone_from')
+    def test_given_profile_not_supported_then_full_clone(self, mock_clone_from, _1, _2, _3, _4, mock_mkdtemp):
+        source = "controls/area/test_module"
+        repo = MagicMock()
+        # e.g. git older than 2.35 has no 'sparse-checkout set --no-cone'
+        repo.git.sparse_checkout.side_effect = git.GitCommandError(
+            "sparse-checkout", 129)
+        full_repo = MagicMock()
+        mock_clone_from.side_effect = [repo, full_repo]
+
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        vcs = server.temp_clone(source, profile="sparse",
+                                paths=["/configure/RELEASE"])
+
+        self.assertEqual(mock_clone_from.call_count, 2)
+        mock_clone_from.assert_called_with(
+            "test@clone-url.ac.uk/controls/area/test_module", "tempdir")
+        self.assertIs(vcs.repo, full_repo)
+
+    @patch('git.Repo.clone_from')
+    def test_given_bad_profile_or_sparse_without_paths_then_error_raised(self, mock_clone_from, mock_mkdtemp):
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        with self.assertRaises(ValueError):
+            server.temp_clone("controls/area/test_module", profile="shallow")
+        with self.assertRaises(ValueError):
+            server.temp_clone("controls/area/test_module", profile="sparse")
+
+        self.assertFalse(mock_clone_from.call_count)
+
+
+LS_REMOTE_OUTPUT = (
+    "1111111111111111111111111111111111111111\tHEAD\n"
+    "2222222222222222222222222222222222222222\trefs/heads/feature\n"
+    "1111111111111111111111111111111111111111\trefs/heads/master\n"
+    "3333333333333333333333333333333333333333\trefs/merge-requests/1/head\n"
+    "4444444444444444444444444444444444444444\trefs/tags/0-1\n"
+    "5555555555555555555555555555555555555555\trefs/tags/0-2\n"
+    "1111111111111111111111111111111111111111\trefs/tags/0-2^{}"
+)
+
+
+class ListRemoteRefsTest(unittest.TestCase):
+
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=False)
+    @patch('dls_ade.gitserver.git.cmd.Git.ls_remote')
+    def test_given_invalid_source_then_error_raised(self, mock_ls_remote, _):
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        with self.assertRaises(ValueError):
+            server.list_remote_refs("does/not/exist")
+
+        self.assertFalse(mock_ls_remote.call_count)
+
+    @patch('dls_ade.gitserver.GitServer.get_clone_path',
+           return_value="controls/area/test_module")
+    @patch('dls_ade.gitserver.GitServer.is_server_repo', return_value=True)
+    @patch('dls_ade.gitserver.git.cmd.Git.ls_remote',
+           return_value=LS_REMOTE_OUTPUT)
+    def test_given_valid_source_then_refs_parsed(self, mock_ls_remote, _1, _2):
+        server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                           "test@url.ac.uk")
+
+        refs = server.list_remote_refs("controls/area/test_module")
+
+        mock_ls_remote.assert_called_once_with(
+            "test@clone-url.ac.uk/controls/area/test_module")
+        self.assertEqual(refs["HEAD"], "1" * 40)
+        self.assertEqual(list(refs["branches"]), ["feature", "master"])
+        self.assertEqual(list(refs["tags"]), ["0-1", "0-2"])
+        self.assertEqual(refs["tags"]["0-1"], "4" * 40)
+        # Annotated tags resolve to the tagged commit
+        self.assertEqual(refs["tags"]["0-2"], "1" * 40)
+
+
+def make_archive(path, contents):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode="w") as tar:
+        info = tarfile.TarInfo(path)
+        info.size = len(contents)
+        tar.addfile(info, io.BytesIO(contents))
+    return data.getvalue()
+
+
+class ReadFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                                "test@url.ac.uk")
+        patch('dls_ade.gitserver.GitServer.get_clone_path',
+              side_effect=lambda path: path).start()
+        self.addCleanup(patch.stopall)
+
+    @patch('dls_ade.gitserver.git.cmd.Git.archive', create=True)
+    def test_given_file_then_contents_returned(self, mock_archive):
+        mock_archive.return_value = make_archive(
+            ".gitattributes", b"* module-contact=abc12345\n")
+
+        contents = self.server.read_file("controls/area/test_module",
+                                         "HEAD", ".gitattributes")
+
+        mock_archive.assert_called_once_with(
+            "--remote=test@clone-url.ac.uk/controls/area/test_module",
+            "HEAD", ".gitattributes", stdout_as_string=False)
+        self.assertEqual(contents, "* module-contact=abc12345\n")
+
+    @patch('dls_ade.gitserver.git.cmd.Git.archive', create=True)
+    def test_given_missing_file_then_none_returned(self, mock_archive):
+        mock_archive.side_effect = git.GitCommandError(
+            "git archive", 128,
+            "fatal: pathspec '.gitattributes' did not match any files")
+
+        self.assertIsNone(self.server.read_file(
+            "controls/area/test_module", "HEAD", ".gitattributes"))
+
+    @patch('dls_ade.gitserver.git.cmd.Git.archive', create=True)
+    def test_given_missing_repo_then_error_raised(self, mock_archive):
+        mock_archive.side_effect = git.GitCommandError(
+            "git archive", 128, "fatal: the remote end hung up unexpectedly")
+
+        with self.assertRaises(git.GitCommandError):
+            self.server.read_file("controls/area/test_module", "HEAD",
+                                  ".gitattributes")
 
 
 class CloneMultiTest(unittest.TestCase):
@@ -251,3 +489,59 @@ class CloneMultiTest(unittest.TestCase):
 
         mock_clone_from.assert_called_once_with(
             "test@clone-url.ac.uk/controls/ioc/BL/module", "./BL/module")
+
+
+@patch('dls_ade.gitserver.time.sleep')
+@patch('dls_ade.gitserver.GitServer.get_clone_path',
+       side_effect=lambda path: path)
+@patch('os.listdir', return_value=[])
+class CloneMultiRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = GitServer("test@url.ac.uk", "test@clone-url.ac.uk",
+                                "test@url.ac.uk")
+        self.server.get_server_repo_list = MagicMock(return_value=[
+            "controls/area/module1", "controls/area/module2"])
+
+    @patch('dls_ade.gitserver.git.Repo.clone_from')
+    def test_given_transient_error_then_clone_retried(self, mock_clone_from,
+                                                      _1, _2, mock_sleep):
+        error = git.GitCommandError(
+            "clone", 128, stderr="ssh_exchange_identification: "
+                                 "Connection closed by remote host")
+        mock_clone_from.side_effect = [error, None, None]
+
+        self.server.clone_multi("controls/area", jobs=1)
+
+        self.assertEqual(mock_clone_from.call_count, 3)
+        mock_sleep.assert_called_once()
+
+    @patch('dls_ade.gitserver.git.Repo.clone_from')
+    def test_given_permanent_error_then_others_cloned_and_error_raised(
+            self, mock_clone_from, _1, _2, mock_sleep):
+        def clone(url, path):
+            if path.endswith("module1"):
+                raise git.GitCommandError(
+                    "clone", 128, stderr="Repository not found")
+
+        mock_clone_from.side_effect = clone
+
+        with self.assertRaises(VCSGitError) as context:
+            self.server.clone_multi("controls/area", jobs=2)
+
+        self.assertEqual(mock_clone_from.call_count, 2)
+        self.assertFalse(mock_sleep.call_count)
+        self.assertIn("controls/area/module1", str(context.exception))
+        self.assertNotIn("controls/area/module2", str(context.exception))
+
+    @patch('dls_ade.gitserver.git.Repo.clone_from')
+    def test_given_retries_exhausted_then_error_raised(
+            self, mock_clone_from, _1, _2, mock_sleep):
+        mock_clone_from.side_effect = git.GitCommandError(
+            "clone", 128, stderr="fatal: early EOF")
+
+        with self.assertRaises(VCSGitError):
+            self.server.clone_multi("controls/area", jobs=1, retries=1)
+
+        # Two repositories, two attempts each
+        self.assertEqual(mock_clone_from.call_count, 4)
@@ -0,0 +1,98 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+# Modules run by the dls-* console scripts, see setup.py
+ENTRY_POINT_MODULES = [
+    "dls_changes_since_release", "dls_checkout_module", "dls_last_release",
+    "dls_list_branches", "dls_list_modules", "dls_list_releases",
+    "dls_logs_since_release", "dls_module_contacts", "dls_queue",
+    "dls_release", "dls_release_batch", "dls_start_new_module",
+    "dls_tar_module", "dls_gitlab_ci_validate"]
+
+# Third party modules that must only be imported when they are used
+HEAVY_MODULES = ["git", "gitlab", "requests", "ldap", "cookiecutter",
+                 "distro", "packaging"]
+
+# Time allowed to import a script's module, with its bytecode compiled. Only
+# checked when DLS_ADE_BENCHMARK is set, as it depends on the machine's load.
+IMPORT_TIME_BUDGET_MS = 100
+RUN_BENCHMARKS = os.environ.get("DLS_ADE_BENCHMARK")
+
+
+def import_times(module, pycache_dir):
+    """
+    Import a module in a new interpreter and return the import time of each
+    module imported, from ``python -X importtime``.
+
+    Args:
+        module(str): Name of the module to import
+        pycache_dir(str): Directory to keep compiled bytecode in
+
+    Returns:
+        dict: Module name to cumulative import time in microseconds
+    """
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache_dir)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    process = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c",
+         "import " + module],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class HeavyImportTest(unittest.TestCase):
+
+    def test_heavy_modules_not_imported_at_startup(self):
+        pycache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pycache_dir)
+        for name in ENTRY_POINT_MODULES:
+            times = import_times("dls_ade." + name, pycache_dir)
+            imported = [module for module in HEAVY_MODULES if module in times]
+            self.assertEqual(imported, [], "{} imports {}".format(
+                name, ", ".join(imported)))
+
+
+@unittest.skipUnless(RUN_BENCHMARKS, "set DLS_ADE_BENCHMARK to run")
+class ImportTimeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pycache_dir = tempfile.mkdtemp()
+        cls.times = {}
+        for name in ENTRY_POINT_MODULES:
+            module = "dls_ade." + name
+            # The first import compiles the bytecode, as installing does
+            import_times(module, cls.pycache_dir)
+            cls.times[name] = min(
+                [import_times(module, cls.pycache_dir) for _ in range(2)],
+                key=lambda times: times[module])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.pycache_dir)
+
+    def test_scripts_import_within_budget(self):
+        for name, times in self.times.items():
+            milliseconds = times["dls_ade." + name] / 1000.0
+            self.assertLess(
+                milliseconds, IMPORT_TIME_BUDGET_MS,
+                "dls_ade.{} took {:.1f}ms to import".format(name,
+                                                            milliseconds))
+
+
+if __name__ == '__main__':
+
+    # buffer option suppresses stdout generated from tested code
+    unittest.main(buffer=True)
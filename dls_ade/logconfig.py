@@ -7,13 +7,36 @@ the project or site requirements.
 
 import os
 import os.path
+import copy
+import gzip
 import json
+import queue
+import shutil
 import logging
 import logging.config
+import logging.handlers
 import getpass
 import threading
+from dls_ade import lazy_import
 from dls_ade.constants import GELFLOG_SERVER, GELFLOG_SERVER_PORT
 
+pygelf = lazy_import("pygelf")
+
+# Records waiting to be sent to graylog before new ones are spilled to disk
+GELF_QUEUE_CAPACITY = 1000
+# Records sent to graylog in one write
+GELF_BATCH_SIZE = 100
+# Seconds to wait at exit for queued records to be sent
+GELF_FLUSH_TIMEOUT = 1.0
+# Records that could not be sent, sent again by the next script to log
+GELF_SPILL_FILE = os.path.join(os.getenv('HOME', '~'), ".dls_ade_gelf_spill")
+# Size above which the spill file is not added to, so records are dropped
+GELF_SPILL_MAX_BYTES = 10 * 1048576
+# Records waiting to be written to the debug log before logging blocks
+LOG_FILE_QUEUE_CAPACITY = 10000
+# Types of logged objects copied before they are queued, see AsyncFileHandler
+MUTABLE_PAYLOADS = (list, dict, set)
+
 default_config = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -45,8 +68,8 @@ default_config = {
         },
 
         "local_file_handler": {
-            "class": "logging.handlers.RotatingFileHandler",
-            #  "class": "logging.handlers.FileHandler",
+            # Formats and writes from a background thread, gzipping old logs
+            "class": "dls_ade.logconfig.AsyncFileHandler",
             "level": "DEBUG",
             "formatter": "extended",
             "filename": os.path.join(os.getenv('HOME', '~'), ".dls_ade_debug.log"),
@@ -57,12 +80,17 @@ default_config = {
         },
 
         "graylog_gelf": {
-            "class": "pygelf.GelfTcpHandler",
+            # Sends from a background thread, so logging never waits for graylog
+            "class": "dls_ade.logconfig.GelfQueueHandler",
             "level": "INFO",
             # Obviously a DLS-specific configuration: the graylog server address and port
             # Graylog2 cluster. Input: "Load-Balanced GELF TCP"
             "host": GELFLOG_SERVER,
             "port": int(GELFLOG_SERVER_PORT),
+            "capacity": GELF_QUEUE_CAPACITY,
+            "batch_size": GELF_BATCH_SIZE,
+            "flush_timeout": GELF_FLUSH_TIMEOUT,
+            "spill_file": GELF_SPILL_FILE,
             "debug": True,
             #  The following custom fields will be disabled if setting this False
             "include_extra_fields": True,
@@ -106,6 +134,250 @@ default_config = {
 }
 
 
+class GelfQueueHandler(logging.handlers.QueueHandler):
+    """A GELF TCP handler that sends records in batches from a background
+    thread.
+
+    Records are converted to GELF messages when they are logged and put on a
+    bounded queue, so logging a record never waits for the graylog server. A
+    sender thread takes the messages off the queue and writes as many as are
+    waiting, up to `batch_size`, to the server at once. Messages that do not
+    fit on the queue, or that could not be sent, are appended to `spill_file`
+    (or dropped if it is None or has grown too large); the next handler to
+    start sends them first. When the handler is closed at exit it waits at
+    most `flush_timeout` seconds for the queue to be sent, then spills what
+    is left.
+
+    Args:
+        host (str): GELF TCP input host
+        port (int): GELF TCP input port
+        capacity (int): Number of messages the queue holds
+        batch_size (int): Largest number of messages sent in one write
+        flush_timeout (float): Seconds to wait for the queue to be sent when
+            the handler is closed
+        spill_file (Optional[str]): File to keep messages that were not sent
+        spill_max_bytes (int): Size above which the spill file is not added to
+        **kwargs: Arguments for :class:`pygelf.GelfTcpHandler`, e.g. extra
+            fields
+    """
+
+    _STOP = None
+
+    def __init__(self, host, port, capacity=GELF_QUEUE_CAPACITY,
+                 batch_size=GELF_BATCH_SIZE, flush_timeout=GELF_FLUSH_TIMEOUT,
+                 spill_file=None, spill_max_bytes=GELF_SPILL_MAX_BYTES,
+                 **kwargs):
+        super(GelfQueueHandler, self).__init__(queue.Queue(capacity))
+        self.gelf = pygelf.GelfTcpHandler(host, port, **kwargs)
+        self.batch_size = batch_size
+        self.flush_timeout = flush_timeout
+        self.spill_file = spill_file
+        self.spill_max_bytes = spill_max_bytes
+        self.dropped = 0
+        self._spill_lock = threading.Lock()
+        # Spilled messages being sent again, see _resend_spilled
+        self._backlog = []
+        self._backlog_lock = threading.Lock()
+        self._sender = threading.Thread(target=self._send_queue,
+                                        name="GelfQueueHandler")
+        self._sender.daemon = True
+        self._sender.start()
+
+    def prepare(self, record):
+        """Convert a record to a null terminated GELF message"""
+        return self.gelf.convert_record_to_gelf(record) + b'\x00'
+
+    def enqueue(self, message):
+        """Queue a message to be sent, spilling it if the queue is full"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.spill([message])
+
+    def spill(self, messages):
+        """Append messages that could not be sent to the spill file
+
+        Args:
+            messages (list[bytes]): GELF messages
+        """
+        if not messages:
+            return
+        with self._spill_lock:
+            try:
+                if self.spill_file is None or (
+                        os.path.exists(self.spill_file) and
+                        os.path.getsize(self.spill_file) >=
+                        self.spill_max_bytes):
+                    self.dropped += len(messages)
+                    return
+                with open(self.spill_file, "ab") as f:
+                    f.write(b"".join(messages))
+            except (IOError, OSError):
+                self.dropped += len(messages)
+
+    def _send(self, messages):
+        self.gelf.send(b"".join(messages))
+        # SocketHandler drops what it cannot send and closes its socket
+        if self.gelf.sock is None:
+            self.spill(messages)
+
+    def _resend_spilled(self):
+        if self.spill_file is None:
+            return
+        # Take the file, so another script starting now does not send it too
+        sending = "{}.{}".format(self.spill_file, os.getpid())
+        try:
+            os.rename(self.spill_file, sending)
+            with open(sending, "rb") as f:
+                data = f.read()
+            os.remove(sending)
+        except (IOError, OSError):
+            return
+        with self._backlog_lock:
+            self._backlog = [message + b'\x00'
+                             for message in data.split(b'\x00') if message]
+
+        while True:
+            with self._backlog_lock:
+                batch = self._backlog[:self.batch_size]
+                del self._backlog[:self.batch_size]
+            if not batch:
+                break
+            self._send(batch)
+
+    def _send_queue(self):
+        self._resend_spilled()
+        while True:
+            batch = [self.queue.get()]
+            while batch[-1] is not self._STOP and \
+                    len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self._send(batch)
+            if stop:
+                break
+
+    def close(self):
+        """Send the queued messages, waiting at most `flush_timeout` seconds,
+        and spill any that are left"""
+        self.acquire()
+        try:
+            sender, self._sender = self._sender, None
+        finally:
+            self.release()
+
+        if sender is not None:
+            try:
+                self.queue.put(self._STOP, timeout=self.flush_timeout)
+            except queue.Full:
+                pass
+            sender.join(self.flush_timeout)
+            if sender.is_alive():
+                # Still waiting for the server: keep what it has not sent
+                with self._backlog_lock:
+                    left, self._backlog = self._backlog, []
+                while True:
+                    try:
+                        message = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if message is not self._STOP:
+                        left.append(message)
+                self.spill(left)
+            self.gelf.close()
+
+        super(GelfQueueHandler, self).close()
+
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """A RotatingFileHandler that gzips each log file it rotates out, naming
+    them ``<filename>.<n>.gz``."""
+
+    def __init__(self, *args, **kwargs):
+        super(CompressedRotatingFileHandler, self).__init__(*args, **kwargs)
+        self.namer = self._gz_name
+        self.rotator = self._gz_rotate
+
+    @staticmethod
+    def _gz_name(name):
+        return name + ".gz"
+
+    @staticmethod
+    def _gz_rotate(source, dest):
+        with open(source, "rb") as f_in:
+            with gzip.open(dest, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+class AsyncFileHandler(logging.handlers.QueueHandler):
+    """Log to a rotating file from a background thread.
+
+    Records are queued as they are logged and formatted, written and rotated
+    by a :class:`logging.handlers.QueueListener` thread, so debug logging
+    costs the caller no more than putting the record on the queue. Log with
+    %-style arguments (``log.debug("Releases: %s", releases)``) rather than
+    formatting the message first, so large payloads are only turned into
+    strings by the writer thread. Lists, dicts and sets logged are copied
+    (shallowly), so changing them afterwards does not change what is
+    written. Logging blocks if `capacity` records are
+    waiting to be written. Closing the handler writes every queued record.
+
+    Args:
+        filename (str): Path of the log file
+        capacity (int): Number of records the queue holds
+        **kwargs: Arguments for :class:`CompressedRotatingFileHandler`, e.g.
+            maxBytes and backupCount
+    """
+
+    def __init__(self, filename, capacity=LOG_FILE_QUEUE_CAPACITY, **kwargs):
+        super(AsyncFileHandler, self).__init__(queue.Queue(capacity))
+        self.file_handler = CompressedRotatingFileHandler(filename, **kwargs)
+        self._listener = logging.handlers.QueueListener(self.queue,
+                                                        self.file_handler)
+        self._listener.start()
+
+    def setFormatter(self, fmt):
+        """Set the formatter used by the writer thread"""
+        super(AsyncFileHandler, self).setFormatter(fmt)
+        self.file_handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Copy mutable payloads of the record, leaving the writer thread to
+        format it"""
+        if isinstance(record.msg, MUTABLE_PAYLOADS):
+            record.msg = copy.copy(record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                copy.copy(arg) if isinstance(arg, MUTABLE_PAYLOADS) else arg
+                for arg in record.args)
+        return record
+
+    def enqueue(self, record):
+        """Queue a record, waiting for room if the queue is full"""
+        self.queue.put(record)
+
+    def close(self):
+        """Write the queued records and close the file"""
+        self.acquire()
+        try:
+            listener, self._listener = self._listener, None
+        finally:
+            self.release()
+
+        if listener is not None:
+            listener.stop()
+            self.file_handler.close()
+
+        super(AsyncFileHandler, self).close()
+
+
 class ThreadContextFilter(logging.Filter):
     """A logging context filter to add thread name and ID."""
     def filter(self, record):
@@ -0,0 +1,172 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+import unittest
+
+from dls_ade.logconfig import GelfQueueHandler, AsyncFileHandler
+
+
+class GelfServer(object):
+    """A GELF TCP input that keeps the messages it receives"""
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.listen(5)
+        self.port = self.socket.getsockname()[1]
+        self.data = b""
+        self.thread = threading.Thread(target=self._receive)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _receive(self):
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                self.data += data
+            connection.close()
+
+    def messages(self):
+        return [json.loads(message.decode("utf-8"))
+                for message in self.data.split(b"\x00") if message]
+
+    def close(self):
+        self.socket.close()
+
+
+def make_record(message):
+    return logging.LogRecord("dls_ade", logging.INFO, __file__, 1, message,
+                             None, None)
+
+
+class GelfQueueHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.spill_file = os.path.join(self.tmp_dir, "spill")
+        self.server = GelfServer()
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _handler(self, port=None, **kwargs):
+        kwargs.setdefault("spill_file", self.spill_file)
+        return GelfQueueHandler("127.0.0.1", port or self.server.port,
+                                application="test", **kwargs)
+
+    def _wait_for_messages(self, count):
+        deadline = time.time() + 5
+        while len(self.server.messages()) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.server.messages()
+
+    def test_given_records_then_sent_in_order_with_fields(self):
+        handler = self._handler()
+
+        for i in range(5):
+            handler.handle(make_record("message {}".format(i)))
+        handler.close()
+        messages = self._wait_for_messages(5)
+
+        self.assertEqual([message["short_message"] for message in messages],
+                         ["message {}".format(i) for i in range(5)])
+        self.assertEqual(messages[0]["application"], "test")
+        self.assertFalse(os.path.exists(self.spill_file))
+
+    def test_given_queue_full_then_records_spilled_and_sent_next_time(self):
+        handler = self._handler(capacity=1)
+        handler.gelf.send = lambda data: time.sleep(0.2)
+
+        for i in range(5):
+            handler.handle(make_record("message {}".format(i)))
+        handler.close()
+
+        self.assertTrue(os.path.exists(self.spill_file))
+
+        self._handler().close()
+        messages = self._wait_for_messages(3)
+
+        self.assertGreaterEqual(len(messages), 3)
+        self.assertFalse(os.path.exists(self.spill_file))
+
+    def test_given_server_unreachable_then_close_returns_and_records_kept(self):
+        self.server.close()
+        handler = self._handler(port=self.server.port, flush_timeout=0.5)
+
+        handler.handle(make_record("message"))
+        start = time.time()
+        handler.close()
+
+        self.assertLess(time.time() - start, 2)
+        with open(self.spill_file, "rb") as f:
+            spilled = [json.loads(message.decode("utf-8"))
+                       for message in f.read().split(b"\x00") if message]
+        self.assertEqual([message["short_message"] for message in spilled],
+                         ["message"])
+
+    def test_given_no_spill_file_then_records_dropped(self):
+        handler = self._handler(capacity=1, spill_file=None)
+        handler.gelf.send = lambda data: time.sleep(0.2)
+
+        for i in range(5):
+            handler.handle(make_record("message {}".format(i)))
+        handler.close()
+
+        self.assertGreater(handler.dropped, 0)
+
+
+class AsyncFileHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "debug.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_given_records_then_written_formatted_when_closed(self):
+        handler = AsyncFileHandler(self.filename, maxBytes=1048576,
+                                   backupCount=2, encoding="utf8")
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        releases = ["1-0", "1-1"]
+
+        record = make_record("Releases: %s")
+        record.args = (releases,)
+        handler.handle(record)
+        releases.append("1-2")
+        handler.close()
+
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "INFO Releases: ['1-0', '1-1']\n")
+
+    def test_given_file_full_then_rotated_logs_compressed(self):
+        handler = AsyncFileHandler(self.filename, maxBytes=100,
+                                   backupCount=2)
+
+        for i in range(10):
+            handler.handle(make_record("{} {}".format(i, "x" * 40)))
+        handler.close()
+
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ["debug.log", "debug.log.1.gz", "debug.log.2.gz"])
+        with gzip.open(self.filename + ".1.gz", "rt") as f:
+            self.assertEqual(f.read(), "6 {0}\n7 {0}\n".format("x" * 40))
+
+
+if __name__ == '__main__':
+
+    # buffer option suppresses stdout generated from tested code
+    unittest.main(buffer=True)
@@ -0,0 +1,136 @@
+"""
+Local store of bare mirrors of server repositories.
+
+Each server repository gets one bare mirror below
+:data:`~dls_ade.constants.ADE_CACHE_DIR`. It is cloned in full the first time
+it is needed and afterwards only brought up to date with ``git fetch``.
+Temporary clones then borrow its objects with ``git clone --reference``, so
+they transfer nothing but the ref advertisement from the server.
+"""
+
+import os
+import fcntl
+import shutil
+import tempfile
+import logging
+from contextlib import contextmanager
+
+from dls_ade import lazy_import
+from dls_ade.constants import ADE_CACHE_DIR
+from dls_ade.dls_utilities import remove_git_at_end
+
+git = lazy_import("git")
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+log = logging.getLogger(__name__)
+
+# Branches and tags only; GitLab also advertises merge request refs that the
+# scripts never use.
+MIRROR_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+MIRROR_ROOT = os.path.join(ADE_CACHE_DIR, "mirrors")
+
+
+class MirrorStore(object):
+    """
+    A directory of bare repositories, one per server repository path.
+
+    Args:
+        root(str): Directory to keep the mirrors in
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def mirror_path(self, server_repo_path):
+        """
+        Return the local path of the mirror of a server repository.
+
+        Args:
+            server_repo_path(str): Server repository path
+                e.g. controls/support/zebra.git
+
+        Returns:
+            str: Path of the bare mirror
+        """
+        return os.path.join(
+            self.root, remove_git_at_end(server_repo_path.strip("/")) + ".git")
+
+    def has_mirror(self, server_repo_path):
+        """
+        Check whether a server repository has already been mirrored.
+
+        Args:
+            server_repo_path(str): Server repository path
+
+        Returns:
+            bool: True if the mirror exists
+        """
+        return os.path.isdir(self.mirror_path(server_repo_path))
+
+    @contextmanager
+    def _locked(self, path):
+        # Serialise scripts updating the same mirror at the same time
+        lock_file = open(path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def update(self, url, server_repo_path):
+        """
+        Create or fetch into the mirror of a server repository.
+
+        Args:
+            url(str): URL to fetch the repository from
+            server_repo_path(str): Server repository path
+
+        Returns:
+            str: Path of the up to date bare mirror
+        """
+        path = self.mirror_path(server_repo_path)
+        parent = os.path.dirname(path)
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+
+        with self._locked(path):
+            if os.path.isdir(path):
+                repo = git.Repo(path)
+                if repo.remotes.origin.url != url:
+                    repo.git.remote("set-url", "origin", url)
+                log.debug("Fetching into mirror {}".format(path))
+                repo.git.fetch("--prune", "origin")
+            else:
+                log.debug("Creating mirror {} of {}".format(path, url))
+                self._create(url, path)
+
+        return path
+
+    @staticmethod
+    def _create(url, path):
+        # Build the mirror to one side so an interrupted fetch never leaves a
+        # half populated mirror in place
+        tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path),
+                                    suffix=".partial")
+        try:
+            repo = git.Repo.init(tmp_path, bare=True)
+            repo.create_remote("origin", url)
+            repo.git.config("--unset-all", "remote.origin.fetch")
+            for refspec in MIRROR_REFSPECS:
+                repo.git.config("--add", "remote.origin.fetch", refspec)
+            repo.git.fetch("--prune", "origin")
+            os.rename(tmp_path, path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+
+def default_mirror_store():
+    """
+    Return a :class:`MirrorStore` kept in the default cache directory.
+
+    Returns:
+        :class:`MirrorStore`: Mirror store instance
+    """
+    return MirrorStore(MIRROR_ROOT)
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import git
+
+from dls_ade.mirror_store import MirrorStore
+
+
+class MirrorPathTest(unittest.TestCase):
+
+    def test_given_path_with_git_suffix_then_single_suffix(self):
+        store = MirrorStore("/cache/mirrors")
+
+        path = store.mirror_path("controls/support/zebra.git")
+
+        self.assertEqual(path, "/cache/mirrors/controls/support/zebra.git")
+
+    def test_given_ioc_path_then_domain_kept(self):
+        store = MirrorStore("/cache/mirrors")
+
+        path = store.mirror_path("controls/ioc/BL01I/BL01I-EA-IOC-01/")
+
+        self.assertEqual(
+            path, "/cache/mirrors/controls/ioc/BL01I/BL01I-EA-IOC-01.git")
+
+
+class UpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.upstream_dir = os.path.join(self.tmp_dir, "upstream")
+        self.upstream = git.Repo.init(self.upstream_dir)
+        with self.upstream.config_writer() as config:
+            config.set_value("user", "name", "Test User")
+            config.set_value("user", "email", "test@example.com")
+        self._commit("first")
+        self.upstream.create_tag("0-1")
+        self.store = MirrorStore(os.path.join(self.tmp_dir, "mirrors"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _commit(self, name):
+        with open(os.path.join(self.upstream_dir, name), "w") as f:
+            f.write(name)
+        self.upstream.index.add([name])
+        return self.upstream.index.commit(name)
+
+    def test_given_no_mirror_then_bare_mirror_created(self):
+        self.assertFalse(self.store.has_mirror("controls/support/mod"))
+
+        path = self.store.update(self.upstream_dir, "controls/support/mod")
+
+        mirror = git.Repo(path)
+        self.assertTrue(self.store.has_mirror("controls/support/mod"))
+        self.assertTrue(mirror.bare)
+        self.assertIn("0-1", [tag.name for tag in mirror.tags])
+        self.assertEqual(mirror.heads[0].commit,
+                         self.upstream.head.commit)
+
+    def test_given_existing_mirror_then_new_commits_fetched(self):
+        self.store.update(self.upstream_dir, "controls/support/mod")
+        commit = self._commit("second")
+        self.upstream.create_tag("0-2")
+
+        path = self.store.update(self.upstream_dir, "controls/support/mod")
+
+        mirror = git.Repo(path)
+        self.assertIn("0-2", [tag.name for tag in mirror.tags])
+        self.assertEqual(mirror.heads[0].commit, commit)
+
+    def test_clone_with_reference_uses_mirror_objects(self):
+        path = self.store.update(self.upstream_dir, "controls/support/mod")
+        clone_dir = os.path.join(self.tmp_dir, "clone")
+
+        clone = git.Repo.clone_from(self.upstream_dir, clone_dir,
+                                    reference=path)
+
+        alternates = os.path.join(clone.git_dir, "objects", "info",
+                                  "alternates")
+        with open(alternates) as f:
+            self.assertIn(path, f.read())
+        self.assertEqual(clone.remotes.origin.url, self.upstream_dir)
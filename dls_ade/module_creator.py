@@ -4,6 +4,7 @@ import logging
 from getpass import getuser
 
 from dls_ade import vcs_git, Server
+from dls_ade.gitserver import TREELESS_CLONE
 from dls_ade.exceptions import (
     RemoteRepoError, VerificationError, ArgumentError
 )
@@ -402,7 +403,8 @@ class ModuleCreatorAddAppToModule(ModuleCreatorWithApps):
         temp_dir = ""
         exists = False
         try:
-            repo = self.server.temp_clone(remote_repo_path).repo
+            repo = self.server.temp_clone(remote_repo_path,
+                                          profile=TREELESS_CLONE).repo
             temp_dir = repo.working_tree_dir
 
             if os.path.exists(os.path.join(temp_dir, self._app_name + "App")):
@@ -524,7 +524,8 @@ class ModuleCreatorAddAppToModuleCheckIfRemoteRepoHasApp(ModuleCreatorTest):
         except:
             pass
 
-        self.mock_server.temp_clone.assert_called_once_with("test_repo_path")
+        self.mock_server.temp_clone.assert_called_once_with(
+            "test_repo_path", profile="treeless")
 
     def test_given_app_exists_then_return_value_is_true(self):
 
@@ -4,8 +4,6 @@ import logging
 
 from dls_ade.exceptions import ArgumentError, TemplateFolderError
 
-from cookiecutter.main import cookiecutter
-
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 log = logging.getLogger(__name__)
 
@@ -13,6 +11,13 @@ TEMPLATES_FOLDER = "module_templates"
 COOKIECUTTER_BASE_URL = "https://gitlab.diamond.ac.uk/controls/templates"
 
 
+def cookiecutter(*args, **kwargs):
+    """Run :func:`cookiecutter.main.cookiecutter`, which is only imported when
+    a module is created from a cookiecutter template."""
+    from cookiecutter.main import cookiecutter as run_cookiecutter
+    return run_cookiecutter(*args, **kwargs)
+
+
 class ModuleTemplate(object):
     """Class for the creation of new module contents.
 
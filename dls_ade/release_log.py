@@ -0,0 +1,177 @@
+"""
+The user's log of the build requests they have submitted.
+
+Every build request appends one tab separated line to the log::
+
+    <build_dir>\t<module>\t<version>\t<build_name>\t<server>
+
+Appends hold an exclusive lock on the log, so release scripts running at the
+same time cannot interleave their lines. A JSON index kept next to the log
+maps each module to the byte offsets of its lines, so the past submissions of
+a module are found without reading the whole log. The index records how much
+of the log it covers; lines added without updating it (e.g. by an older
+version of the scripts) are indexed the next time the log is used.
+"""
+
+import os
+import json
+import fcntl
+import tempfile
+import logging
+from collections import namedtuple
+from contextlib import contextmanager
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+log = logging.getLogger(__name__)
+
+RELEASE_LOG_FILE = os.path.expanduser(os.path.join("~", ".dls-release-log"))
+
+ReleaseLogEntry = namedtuple(
+    "ReleaseLogEntry", ["build_dir", "module", "version", "build_name",
+                        "server"])
+
+
+def format_entry(entry):
+    """
+    Return the log line for an entry.
+
+    Args:
+        entry(:class:`ReleaseLogEntry`): Build request
+
+    Returns:
+        str: Tab separated line
+    """
+    return "\t".join(entry) + "\n"
+
+
+def parse_entry(line):
+    """
+    Parse a log line.
+
+    Args:
+        line(str): Tab separated line
+
+    Returns:
+        :class:`ReleaseLogEntry`: Build request, or None if the line is not a
+            complete entry
+    """
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) != len(ReleaseLogEntry._fields):
+        return None
+    return ReleaseLogEntry(*fields)
+
+
+class ReleaseLog(object):
+    """
+    An append-only log of build requests with an index by module.
+
+    Args:
+        filename(str): Path of the log
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.index_filename = filename + ".idx"
+
+    @contextmanager
+    def _locked(self):
+        with open(self.filename, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        try:
+            with open(self.index_filename, "r") as f:
+                index = json.load(f)
+            if isinstance(index.get("size"), int) and \
+                    isinstance(index.get("modules"), dict):
+                return index
+        except (IOError, OSError, ValueError) as e:
+            log.debug("Rebuilding release log index {}: {}".format(
+                self.index_filename, e))
+        return {"size": 0, "modules": {}}
+
+    def _save_index(self, index):
+        dirname = os.path.dirname(self.index_filename) or "."
+        try:
+            # Write then rename so concurrent readers never see half a file
+            fd, tmp_name = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f, separators=(",", ":"))
+            os.rename(tmp_name, self.index_filename)
+        except (IOError, OSError) as e:
+            log.debug("Could not write release log index {}: {}".format(
+                self.index_filename, e))
+
+    def _update_index(self, f):
+        # Index any lines the index does not cover yet. Called with the lock
+        # held.
+        index = self._load_index()
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == index["size"]:
+            return index
+        if size < index["size"]:
+            # The log has been truncated or replaced
+            index = {"size": 0, "modules": {}}
+
+        f.seek(index["size"])
+        offset = index["size"]
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Still being written by something not taking the lock
+                break
+            entry = parse_entry(line.decode("utf-8", "replace"))
+            if entry is not None:
+                index["modules"].setdefault(entry.module, []).append(offset)
+            offset += len(line)
+        index["size"] = offset
+
+        self._save_index(index)
+        return index
+
+    def append(self, entries):
+        """
+        Append entries to the log.
+
+        Args:
+            entries(list[:class:`ReleaseLogEntry`]): Build requests
+        """
+        data = "".join(format_entry(entry) for entry in entries)
+        with self._locked() as f:
+            f.write(data.encode("utf-8"))
+            f.flush()
+            self._update_index(f)
+
+    def find(self, module):
+        """
+        Return the logged build requests of a module.
+
+        Args:
+            module(str): Module name, e.g. BL01I/BL01I-EA-IOC-01
+
+        Returns:
+            list[:class:`ReleaseLogEntry`]: Build requests, oldest first
+        """
+        entries = []
+        with self._locked() as f:
+            index = self._update_index(f)
+            for offset in index["modules"].get(module, []):
+                f.seek(offset)
+                entry = parse_entry(f.readline().decode("utf-8", "replace"))
+                if entry is not None:
+                    entries.append(entry)
+        return entries
+
+
+def default_release_log():
+    """
+    Return the :class:`ReleaseLog` in the user's home directory.
+
+    Returns:
+        :class:`ReleaseLog`: Release log instance
+    """
+    return ReleaseLog(RELEASE_LOG_FILE)
@@ -0,0 +1,67 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from dls_ade.release_log import ReleaseLog, ReleaseLogEntry
+
+ENTRY_1 = ReleaseLogEntry("/dls_sw/prod/R3.14.12.7/support/asyn", "asyn",
+                          "4-34", "build_20260101-120000_abc12345_support_"
+                                  "asyn_4-34", "redhat7-x86_64")
+ENTRY_2 = ReleaseLogEntry("/dls_sw/prod/R3.14.12.7/ioc/BL01I", "BL01I/IOC-01",
+                          "1-2", "build_20260101-120100_abc12345_ioc_"
+                                 "BL01I_IOC-01_1-2", "redhat7-x86_64")
+ENTRY_3 = ENTRY_1._replace(version="4-35")
+
+
+class ReleaseLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, ".dls-release-log")
+        self.release_log = ReleaseLog(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_given_entries_then_found_by_module(self):
+        self.release_log.append([ENTRY_1, ENTRY_2])
+        self.release_log.append([ENTRY_3])
+
+        self.assertEqual(self.release_log.find("asyn"), [ENTRY_1, ENTRY_3])
+        self.assertEqual(self.release_log.find("BL01I/IOC-01"), [ENTRY_2])
+        self.assertEqual(self.release_log.find("motor"), [])
+
+    def test_given_entries_then_log_has_one_line_each(self):
+        self.release_log.append([ENTRY_1, ENTRY_2])
+
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "\t".join(ENTRY_1) + "\n" +
+                                       "\t".join(ENTRY_2) + "\n")
+
+    def test_given_lines_appended_without_index_then_indexed_on_find(self):
+        self.release_log.append([ENTRY_1])
+        # e.g. an older version of the scripts
+        with open(self.filename, "a") as f:
+            f.write("\t".join(ENTRY_3) + "\n")
+
+        self.assertEqual(self.release_log.find("asyn"), [ENTRY_1, ENTRY_3])
+        with open(self.release_log.index_filename) as f:
+            self.assertEqual(json.load(f)["size"],
+                             os.path.getsize(self.filename))
+
+    def test_given_damaged_index_then_rebuilt(self):
+        self.release_log.append([ENTRY_1, ENTRY_2])
+        with open(self.release_log.index_filename, "w") as f:
+            f.write("{not json")
+
+        self.assertEqual(self.release_log.find("BL01I/IOC-01"), [ENTRY_2])
+
+    def test_given_log_replaced_then_index_rebuilt(self):
+        self.release_log.append([ENTRY_1, ENTRY_2])
+        os.remove(self.filename)
+
+        self.release_log.append([ENTRY_3])
+
+        self.assertEqual(self.release_log.find("asyn"), [ENTRY_3])
@@ -0,0 +1,172 @@
+"""
+On-disk cache of the repository listings returned by the git server.
+
+Listing every project below a group on the server can take tens of seconds, so
+the result is kept in a JSON file under
+:data:`~dls_ade.constants.ADE_CACHE_DIR`, keyed by group path. An entry is
+returned as-is while it is younger than the TTL. Once it goes stale only the
+projects with activity since the last fetch need to be requested, and the
+whole entry is rebuilt when it reaches its maximum age (to pick up removed
+projects).
+"""
+
+import os
+import json
+import time
+import tempfile
+import logging
+
+from dls_ade.constants import ADE_CACHE_DIR, REPO_LIST_CACHE_TTL, \
+    REPO_LIST_CACHE_MAX_AGE
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+log = logging.getLogger(__name__)
+
+# Allowance for clock differences between this machine and the server when
+# asking for projects changed since the last fetch.
+CLOCK_SKEW_MARGIN = 300
+
+
+class RepoListCache(object):
+    """
+    A JSON file mapping group paths to the repositories found below them.
+
+    Each entry has the form::
+
+        {"fetched": <unix time of last fetch>,
+         "created": <unix time of last full fetch>,
+         "repos": {<repo path>: <last activity timestamp>, ...}}
+
+    """
+
+    def __init__(self, filename, ttl=REPO_LIST_CACHE_TTL,
+                 max_age=REPO_LIST_CACHE_MAX_AGE):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_age = max_age
+
+    def _load(self):
+        try:
+            with open(self.filename, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            log.debug("Ignoring repository list cache {}: {}".format(
+                self.filename, e))
+            return {}
+
+    def _save(self, entries):
+        dirname = os.path.dirname(self.filename)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            # Write then rename so concurrent readers never see half a file
+            fd, tmp_name = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.rename(tmp_name, self.filename)
+        except (IOError, OSError) as e:
+            log.debug("Could not write repository list cache {}: {}".format(
+                self.filename, e))
+
+    def get(self, path):
+        """
+        Return the cache entry for `path`.
+
+        Args:
+            path(str): Group path on the server
+
+        Returns:
+            dict: Cache entry, or None if `path` has not been cached or the
+                entry is older than the maximum age.
+        """
+        entry = self._load().get(path)
+        if entry is None or time.time() - entry["created"] > self.max_age:
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """
+        Check whether an entry can be used without asking the server.
+
+        Args:
+            entry(dict): Cache entry returned by :meth:`get`
+
+        Returns:
+            bool: True if the entry was fetched within the TTL
+        """
+        return time.time() - entry["fetched"] <= self.ttl
+
+    @staticmethod
+    def changed_since(entry):
+        """
+        Return the time from which changed projects must be fetched to bring
+        `entry` up to date.
+
+        Args:
+            entry(dict): Cache entry returned by :meth:`get`
+
+        Returns:
+            str: ISO 8601 UTC timestamp
+        """
+        return time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ",
+            time.gmtime(entry["fetched"] - CLOCK_SKEW_MARGIN))
+
+    def update(self, path, repos, entry=None, fetched=None):
+        """
+        Store fetched repositories for `path`.
+
+        Args:
+            path(str): Group path on the server
+            repos(dict): Repository path to last activity timestamp
+            entry(dict): Entry that `repos` was fetched incrementally from, or
+                None if `repos` is a complete listing
+            fetched(float): Time the fetch started, defaults to now
+
+        Returns:
+            dict: The new cache entry
+        """
+        if fetched is None:
+            fetched = time.time()
+
+        if entry is None:
+            new_entry = {"created": fetched, "repos": dict(repos)}
+        else:
+            new_entry = {"created": entry["created"],
+                         "repos": dict(entry["repos"])}
+            new_entry["repos"].update(repos)
+        new_entry["fetched"] = fetched
+
+        entries = self._load()
+        entries[path] = new_entry
+        self._save(entries)
+
+        return new_entry
+
+    def clear(self, path=None):
+        """
+        Remove the entry for `path`, or every entry if `path` is None.
+
+        Args:
+            path(str): Group path on the server
+        """
+        entries = self._load()
+        if path is None:
+            entries = {}
+        else:
+            entries.pop(path, None)
+        self._save(entries)
+
+
+def default_repo_list_cache(name):
+    """
+    Return a :class:`RepoListCache` stored in the default cache directory.
+
+    Args:
+        name(str): Name of the server the listings come from
+
+    Returns:
+        :class:`RepoListCache`: Cache instance
+    """
+    return RepoListCache(
+        os.path.join(ADE_CACHE_DIR, "{}_repo_list.json".format(name)))
@@ -0,0 +1,77 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from mock import patch
+
+from dls_ade.repo_cache import RepoListCache
+
+
+class RepoListCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.cache_dir, "sub", "repos.json")
+        self.cache = RepoListCache(self.filename, ttl=10, max_age=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_given_no_cache_file_then_get_returns_none(self):
+        self.assertIsNone(self.cache.get("controls/support"))
+
+    def test_given_corrupt_cache_file_then_get_returns_none(self):
+        os.makedirs(os.path.dirname(self.filename))
+        with open(self.filename, "w") as f:
+            f.write("{not json")
+
+        self.assertIsNone(self.cache.get("controls/support"))
+
+    @patch('dls_ade.repo_cache.time.time', return_value=1000.0)
+    def test_update_then_get_returns_entry(self, _):
+        self.cache.update("controls/support", {"controls/support/a.git": None})
+
+        entry = self.cache.get("controls/support")
+
+        self.assertEqual(entry["repos"], {"controls/support/a.git": None})
+        self.assertEqual(entry["fetched"], 1000.0)
+        self.assertTrue(self.cache.is_fresh(entry))
+        with open(self.filename) as f:
+            self.assertIn("controls/support", json.load(f))
+
+    def test_incremental_update_merges_with_entry(self):
+        entry = self.cache.update("controls/ioc", {"controls/ioc/a.git": "1"},
+                                  fetched=50.0)
+
+        with patch('dls_ade.repo_cache.time.time', return_value=70.0):
+            new_entry = self.cache.update(
+                "controls/ioc", {"controls/ioc/b.git": "2"}, entry)
+            self.assertFalse(self.cache.is_fresh(entry))
+            self.assertTrue(self.cache.is_fresh(new_entry))
+
+        self.assertEqual(new_entry["created"], 50.0)
+        self.assertEqual(sorted(new_entry["repos"]),
+                         ["controls/ioc/a.git", "controls/ioc/b.git"])
+
+    def test_entry_older_than_max_age_is_discarded(self):
+        self.cache.update("controls/ioc", {"controls/ioc/a.git": "1"},
+                          fetched=50.0)
+
+        with patch('dls_ade.repo_cache.time.time', return_value=151.0):
+            self.assertIsNone(self.cache.get("controls/ioc"))
+
+    def test_changed_since_allows_for_clock_skew(self):
+        entry = {"fetched": 3600.0, "created": 0.0, "repos": {}}
+
+        self.assertEqual(RepoListCache.changed_since(entry),
+                         "1970-01-01T00:55:00Z")
+
+    def test_clear_removes_entry(self):
+        self.cache.update("controls/ioc", {})
+        self.cache.update("controls/support", {})
+
+        self.cache.clear("controls/ioc")
+
+        self.assertIsNone(self.cache.get("controls/ioc"))
+        self.assertIsNotNone(self.cache.get("controls/support"))
@@ -1,15 +1,22 @@
 import os
+import re
+from collections import OrderedDict
 
-import git
 import logging
 
+from dls_ade import lazy_import
 from dls_ade.vcs import BaseVCS
 from dls_ade.exceptions import VCSGitError
 
+git = lazy_import("git")
+
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 log = logging.getLogger(__name__)
 usermsg = logging.getLogger("usermessages")
 
+# Full or abbreviated commit SHA, as accepted by Git.check_commit_exists
+COMMIT_SHA_RE = re.compile(r"^[0-9a-fA-F]{4,40}$")
+
 
 def is_in_local_repo(path="./"):
     """
@@ -339,6 +346,8 @@ class Git(BaseVCS):
         self.parent = parent
         self.repo = repo
         self._version = None
+        # Snapshot of tags and branches, see get_refs
+        self._refs = None
 
         if self.parent is None: # required for tar-module
             self._remote_repo = ""
@@ -408,6 +417,45 @@ class Git(BaseVCS):
 
         return commits
 
+    def get_refs(self):
+        """
+        Return the tags and branches of the repository.
+
+        They are read with a single 'git for-each-ref' on the first call and
+        kept until this object creates a tag or branch.
+
+        Returns:
+            dict: "tags" and "branches" map to
+                :class:`~collections.OrderedDict` of name to commit SHA in
+                refname order. Annotated tags are peeled to their commits.
+        """
+
+        if self._refs is None:
+            refs = {"tags": OrderedDict(), "branches": OrderedDict()}
+            if self.repo is not None:
+                output = self.repo.git.for_each_ref(
+                    "--format=%(refname)\t%(objectname)\t%(*objectname)",
+                    "refs/heads", "refs/tags")
+                for line in output.splitlines():
+                    refname, sha, peeled_sha = line.split("\t")
+                    if refname.startswith("refs/tags/"):
+                        name = refname[len("refs/tags/"):]
+                        refs["tags"][name] = peeled_sha or sha
+                    else:
+                        name = refname[len("refs/heads/"):]
+                        refs["branches"][name] = sha
+            self._refs = refs
+
+        return self._refs
+
+    def invalidate_refs(self):
+        """
+        Discard the snapshot of tags and branches, so that it is read again
+        by the next call to :meth:`get_refs`.
+        """
+
+        self._refs = None
+
     def list_releases(self):
         """
         Return list of release tags of module.
@@ -416,12 +464,7 @@ class Git(BaseVCS):
             list[str]: Release tags of module
         """
 
-        releases = []
-        if self.repo is not None:
-            for tag in self.repo.tags:
-                releases.append(tag.name)
-
-        return releases
+        return list(self.get_refs()["tags"])
 
     def set_log_message(self, message):
         """
@@ -440,17 +483,29 @@ class Git(BaseVCS):
         """
         Check if commit corresponds to a repository commit.
 
+        The SHA is looked up directly in the object database, so the cost
+        does not depend on the length of the history.
+
         Args:
-            commit(str): Commit to check for
+            commit(str): Full or abbreviated (at least 4 characters) SHA of
+                the commit to check for
 
         Returns:
             bool: True or False for whether the commit exists or not
         """
-        commit_list = self.list_commits()
         commit_exist = False
-        for full_commit in commit_list:
-            if commit in full_commit:
-                commit_exist = True
+        if self.repo is not None and COMMIT_SHA_RE.match(commit):
+            try:
+                sha = self.repo.git.rev_parse("--verify", "--quiet",
+                                              commit + "^{commit}")
+            except git.GitCommandError as e:
+                # Also raised by git if an abbreviated SHA is ambiguous
+                log.debug("rev-parse of {} failed: {}".format(
+                    commit, str(e.stderr).strip()))
+            else:
+                # Make sure a tag or branch that looks like a SHA was not
+                # resolved instead
+                commit_exist = sha.startswith(commit.lower())
         if not commit_exist:
             log.warning("Commit \'{}\' not found".format(commit))
         return commit_exist
@@ -475,6 +530,7 @@ class Git(BaseVCS):
         origin = get_origin(self.repo)
         remote = origin.refs[branch]
         remote.checkout(b=branch)
+        self.invalidate_refs()
 
     def set_version(self, version):
         """
@@ -575,6 +631,8 @@ class Git(BaseVCS):
         except git.exc.GitCommandError as e:
             err_message = ("Failed to create tag {}.".format(e))
             raise VCSGitError(err_message)
+        finally:
+            self.invalidate_refs()
 
         self.push_to_remote(remote, tag)
 
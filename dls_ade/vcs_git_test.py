@@ -4,6 +4,14 @@ from mock import patch, ANY, MagicMock, PropertyMock, call  # @UnresolvedImport
 from dls_ade import vcs_git, gitserver, Server
 
 
+FOR_EACH_REF_OUTPUT = "\n".join([
+    "refs/heads/master\t" + "a" * 40 + "\t",
+    "refs/tags/1-0\t" + "b" * 40 + "\t",
+    "refs/tags/1-0-1\t" + "c" * 40 + "\t" + "d" * 40,
+    "refs/tags/2-0\t" + "e" * 40 + "\t",
+])
+
+
 class FakeCommit(str):
     def __init__(self, name):
         pass
@@ -1002,11 +1010,11 @@ class GitListReleasesTest(unittest.TestCase):
         server_mock.dev_module_path.return_value = 'dummy-string'
         repo_mock = MagicMock()
         self.vcs = vcs_git.Git(self.module, self.area, server_mock, repo_mock)
-        self.vcs.repo.tags = [FakeTag("1-0"), FakeTag("1-0-1"), FakeTag("2-0")]
+        self.vcs.repo.git.for_each_ref.return_value = FOR_EACH_REF_OUTPUT
 
     def test_given_repo_with_no_tags_then_return_empty_list(self):
 
-        self.vcs.repo.tags = []
+        self.vcs.repo.git.for_each_ref.return_value = ""
         releases = self.vcs.list_releases()
 
         self.assertListEqual([], releases)
@@ -1024,6 +1032,31 @@ class GitListReleasesTest(unittest.TestCase):
         self.assertListEqual(['1-0', '1-0-1', '2-0'], releases)
 
 
+    def test_given_repeated_calls_then_refs_read_once(self):
+
+        self.vcs.list_releases()
+        self.vcs.check_version_exists("1-0")
+
+        self.assertEqual(self.vcs.repo.git.for_each_ref.call_count, 1)
+
+    def test_given_tag_created_then_refs_read_again(self):
+
+        self.vcs.list_releases()
+        self.vcs.push_to_remote = MagicMock()
+        self.vcs.create_new_tag_and_push("2-1", "abcd")
+        self.vcs.list_releases()
+
+        self.assertEqual(self.vcs.repo.git.for_each_ref.call_count, 2)
+
+    def test_annotated_tags_peeled_and_branches_listed(self):
+
+        refs = self.vcs.get_refs()
+
+        self.assertEqual(refs["branches"], {"master": "a" * 40})
+        self.assertEqual(refs["tags"]["1-0"], "b" * 40)
+        self.assertEqual(refs["tags"]["1-0-1"], "d" * 40)
+
+
 class GitListCommitsTest(unittest.TestCase):
 
     @patch('dls_ade.vcs_git.git.Repo.clone_from')
@@ -1122,22 +1155,40 @@ class GitCheckVersionTest(unittest.TestCase):
 
         self.assertFalse(self.vcs.check_version_exists(version))
 
-    @patch('dls_ade.vcs_git.Git.list_commits')
-    def test_given_commit_in_list_of_commits_then_return_true(self, mlist):
+    def test_given_commit_in_repo_then_return_true(self):
 
         commit = '8ffb4'
-        mlist.return_value = ['8ffb4130','432bdsa','1234bc']
+        self.vcs.repo = MagicMock()
+        self.vcs.repo.git.rev_parse.return_value = '8ffb4130' + '0' * 32
 
         self.assertTrue(self.vcs.check_commit_exists(commit))
+        self.vcs.repo.git.rev_parse.assert_called_once_with(
+            "--verify", "--quiet", "8ffb4^{commit}")
 
-    @patch('dls_ade.vcs_git.Git.list_commits')
-    def test_given_version_not_in_list_of_releases_then_return_false(self, mlist):
+    def test_given_commit_not_in_repo_then_return_false(self):
 
         commit = '8ff4b4'
-        mlist.return_value = ['8fab4130','432bdsa','1234bc']
+        self.vcs.repo = MagicMock()
+        self.vcs.repo.git.rev_parse.side_effect = \
+            vcs_git.git.GitCommandError("rev-parse", 1)
+
+        self.assertFalse(self.vcs.check_commit_exists(commit))
+
+    def test_given_ref_resolving_to_other_commit_then_return_false(self):
+
+        commit = '1234'
+        self.vcs.repo = MagicMock()
+        self.vcs.repo.git.rev_parse.return_value = '8ffb4130' + '0' * 32
 
         self.assertFalse(self.vcs.check_commit_exists(commit))
 
+    def test_given_non_sha_then_return_false_without_lookup(self):
+
+        self.vcs.repo = MagicMock()
+
+        self.assertFalse(self.vcs.check_commit_exists('master'))
+        self.assertFalse(self.vcs.repo.git.rev_parse.call_count)
+
 class ApiInterrogateTest(unittest.TestCase):
 
     @patch('dls_ade.vcs_git.git.Repo.clone_from')
@@ -72,7 +72,9 @@ setup(
                    'dls-list-releases.py = dls_ade.dls_list_releases:main',
                    'dls-logs-since-release.py = dls_ade.dls_logs_since_release:main',
                    'dls-module-contacts.py = dls_ade.dls_module_contacts:main',
+                   'dls-queue.py = dls_ade.dls_queue:main',
                    'dls-release.py = dls_ade.dls_release:main',
+                   'dls-release-batch.py = dls_ade.dls_release_batch:main',
                    'dls-start-new-module.py = dls_ade.dls_start_new_module:main',
                    'dls-tar-module.py = dls_ade.dls_tar_module:main',
                    'dls-gitlab-ci-validate.py = dls_ade.dls_gitlab_ci_validate:main']},